@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Время разбора одной страницы разными HTML-бэкендами
+Запуск из корня проекта: python benchmarks/bench_html_parsing.py
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+
+from benchmarks.fixtures import habr_article_page, telegram_channel_page
+from parsers.html_backend import HABR_ARTICLE, TELEGRAM_MESSAGES, make_soup
+from parsers.telegram_parser import extract_post_data
+
+ROUNDS = 50
+
+
+def bench(label: str, func, baseline: float = None) -> float:
+    seconds = min(timeit.repeat(func, number=ROUNDS, repeat=3)) / ROUNDS
+    speedup = f"  x{baseline / seconds:.1f}" if baseline else ""
+    print(f"  {label:<32} {seconds * 1000:8.2f} мс/страница{speedup}")
+    return seconds
+
+
+def main():
+    channel_html = telegram_channel_page(count=20)
+    article_html = habr_article_page().encode('utf-8')
+
+    def extract(soup):
+        return [extract_post_data(post, 'rbc_news') for post in soup.select('.tgme_widget_message')]
+
+    print(f"t.me/s/<channel>, 20 постов ({len(channel_html) // 1024} КБ): только разбор")
+    base = bench("html.parser, вся страница", lambda: BeautifulSoup(channel_html, 'html.parser'))
+    bench("lxml, вся страница", lambda: make_soup(channel_html, backend='lxml'), base)
+    bench("lxml + SoupStrainer", lambda: make_soup(channel_html, only=TELEGRAM_MESSAGES, backend='lxml'), base)
+
+    print("t.me/s/<channel>, 20 постов: разбор + извлечение постов")
+    base = bench("html.parser, вся страница", lambda: extract(BeautifulSoup(channel_html, 'html.parser')))
+    bench("lxml, вся страница", lambda: extract(make_soup(channel_html, backend='lxml')), base)
+    bench("lxml + SoupStrainer", lambda: extract(make_soup(channel_html, only=TELEGRAM_MESSAGES, backend='lxml')), base)
+
+    print(f"Статья Habr ({len(article_html) // 1024} КБ): разбор + поиск тела")
+    select = '.article-formatted-body, .post__text, .tm-article-body, .tm-article-content'
+    base = bench("html.parser, вся страница", lambda: BeautifulSoup(article_html, 'html.parser').select_one(select))
+    bench("lxml, вся страница", lambda: make_soup(article_html, backend='lxml').select_one(select), base)
+    bench("lxml + SoupStrainer", lambda: make_soup(article_html, only=HABR_ARTICLE, backend='lxml').select_one(select), base)
+
+
+if __name__ == "__main__":
+    main()
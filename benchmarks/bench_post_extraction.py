@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Сравнение извлечения полей поста: отдельные CSS-запросы vs один обход поддерева
+Запуск из корня проекта: python benchmarks/bench_post_extraction.py
+"""
+
+import logging
+import os
+import re
+import sys
+import timeit
+from typing import Any, Dict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fixtures import telegram_channel_page
+from parsers.html_backend import TELEGRAM_MESSAGES, make_soup
+from parsers.telegram_parser import _parse_date, _parse_views, extract_post_data
+
+logger = logging.getLogger(__name__)
+
+ROUNDS = 50
+
+
+def legacy_extract_post_data(post_element, channel_name: str) -> Dict[str, Any]:
+    """Прежний вариант extract_post_data: отдельный CSS-запрос на каждое поле"""
+    try:
+        # Извлекаем текст поста
+        text_element = post_element.select_one('.tgme_widget_message_text')
+        if not text_element:
+            return None
+        
+        text = text_element.get_text(strip=True)
+        if not text or len(text) < 10:  # Минимальная длина текста
+            return None
+        
+        # Извлекаем заголовок (первые 100 символов)
+        title = text[:100] + "..." if len(text) > 100 else text
+        
+        # Извлекаем ссылку на пост
+        message_link = post_element.select_one('.tgme_widget_message_date a')
+        if not message_link:
+            # Альтернативный способ поиска ссылки
+            all_links = post_element.select('a')
+            message_link = None
+            for link_elem in all_links:
+                href = link_elem.get('href', '')
+                if href and '/' in href and href.split('/')[-1].isdigit():
+                    message_link = link_elem
+                    break
+            if not message_link:
+                return None
+        
+        link = message_link.get('href', '')
+        if not link:
+            return None
+        
+        # Извлекаем дату (пытаемся взять явный datetime)
+        date_str = ""
+        time_el = post_element.select_one('.tgme_widget_message_date time')
+        if time_el and time_el.get('datetime'):
+            try:
+                iso = time_el.get('datetime')
+                # 2024-08-13T11:24:00+00:00 -> 2024-08-13
+                date_str = iso.split('T', 1)[0]
+            except Exception:
+                date_str = ""
+        if not date_str:
+            date_element = post_element.select_one('.tgme_widget_message_date')
+            if date_element:
+                date_text = date_element.get_text(strip=True)
+                date_str = _parse_date(date_text)
+        
+        # Извлекаем количество просмотров
+        views_element = post_element.select_one('.tgme_widget_message_views')
+        views = 0
+        if views_element:
+            views_text = views_element.get_text(strip=True)
+            views = _parse_views(views_text)
+
+        # Извлекаем превью-изображение/видео/гиф, если есть
+        image_url = ''
+        video_url = ''
+        animation_url = ''
+        
+        # Сначала проверяем специальные классы для медиафайлов поста
+        photo_wrap = post_element.select_one('.tgme_widget_message_photo_wrap')
+        if photo_wrap:
+            style = photo_wrap.get('style', '')
+            # Возможные варианты: url('...'), url("..."), url(...)
+            m = re.search(r'''background-image:\s*url\(['"]?([^'")]+)['"]?\)''', style)
+            if m:
+                image_url = m.group(1)
+        
+        # Если не нашли через photo_wrap, ищем через photo класс
+        if not image_url:
+            photo_elem = post_element.select_one('.tgme_widget_message_photo')
+            if photo_elem:
+                # Ищем img внутри photo
+                img_tag = photo_elem.select_one('img')
+                if img_tag and img_tag.get('src'):
+                    image_url = img_tag.get('src')
+                else:
+                    # Проверяем style у photo элемента
+                    style = photo_elem.get('style', '')
+                    if 'background-image' in style:
+                        m = re.search(r'''background-image:\s*url\(['"]?([^'")]+)['"]?\)''', style)
+                        if m:
+                            image_url = m.group(1)
+        
+        # Если все еще не нашли, ищем все img теги и фильтруем аватары
+        if not image_url:
+            all_images = post_element.select('img')
+            
+            for img in all_images:
+                src = img.get('src', '')
+                
+                # Пропускаем аватары (они обычно содержат 'avatar' или имеют определенный размер)
+                if 'avatar' in src.lower() or 'emoji' in src.lower():
+                    continue
+                
+                # Проверяем, что это медиафайл поста
+                if src and ('cdn4.telesco.pe' in src or 'cdn5.telesco.pe' in src):
+                    # Это может быть медиафайл поста
+                    image_url = src
+                    break
+
+        # Пытаемся извлечь видео (mp4)
+        try:
+            src_tag = post_element.select_one('video source') or post_element.select_one('video')
+            if src_tag and src_tag.get('src'):
+                video_url = src_tag.get('src')
+        except Exception:
+            pass
+        if not video_url:
+            a_mp4 = post_element.select_one('a[href$=".mp4"]')
+            if a_mp4 and a_mp4.get('href'):
+                video_url = a_mp4.get('href')
+        if not video_url:
+            any_data_video = post_element.select_one('[data-video]')
+            if any_data_video and any_data_video.get('data-video'):
+                video_url = any_data_video.get('data-video')
+
+        # Пытаемся извлечь анимацию/GIF
+        a_gif = post_element.select_one('a[href$=".gif"]')
+        if a_gif and a_gif.get('href'):
+            animation_url = a_gif.get('href')
+        if not animation_url:
+            img_gif = post_element.select_one('img[src$=".gif"]')
+            if img_gif and img_gif.get('src'):
+                animation_url = img_gif.get('src')
+        
+        return {
+            'title': title,
+            'text': text,
+            'link': link,
+            'source': channel_name,  # Изменено с 'channel' на 'source'
+            'date': date_str,
+            'views': views,
+            'channel_url': f"https://t.me/{channel_name}",
+            'image_url': image_url,
+            'video_url': video_url,
+            'animation_url': animation_url,
+        }
+        
+    except Exception as e:
+        logger.debug(f"Ошибка при извлечении данных поста: {e}")
+        return None
+
+
+def main():
+    pages = [telegram_channel_page(channel, first_id=1000 + i * 20) for i, channel in enumerate(("rbc_news", "tproger", "lenta_ru"))]
+    soups = [make_soup(html, only=TELEGRAM_MESSAGES) for html in pages]
+    posts = [post for soup in soups for post in soup.select('.tgme_widget_message')]
+
+    legacy = [legacy_extract_post_data(post, 'rbc_news') for post in posts]
+    single_pass = [extract_post_data(post, 'rbc_news') for post in posts]
+    # Post дополнительно содержит пустое поле summary, поэтому сравниваются поля прежнего словаря
+    assert legacy == [post and {key: post[key] for key in legacy_post} for legacy_post, post in zip(legacy, single_pass)], \
+        "результаты извлечения различаются"
+
+    print(f"Извлечение полей из {len(posts)} постов ({len(pages)} страницы каналов, результаты совпадают)")
+    base = min(timeit.repeat(lambda: [legacy_extract_post_data(p, 'rbc_news') for p in posts], number=ROUNDS, repeat=3))
+    fast = min(timeit.repeat(lambda: [extract_post_data(p, 'rbc_news') for p in posts], number=ROUNDS, repeat=3))
+    per_post = 1_000_000 / ROUNDS / len(posts)
+    print(f"  CSS-запросы на каждое поле     {base * per_post:8.1f} мкс/пост")
+    print(f"  один обход поддерева           {fast * per_post:8.1f} мкс/пост  x{base / fast:.1f}")
+
+
+if __name__ == "__main__":
+    main()
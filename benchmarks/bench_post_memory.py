@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Память на один пост: словарь из 10 ключей (прежний extract_post_data) против Post со __slots__
+Запуск из корня проекта: python benchmarks/bench_post_memory.py
+Считается память, которая остается занятой постами после разбора страниц (tracemalloc),
+отдельно - без текстов постов, которые одинаковы в обоих вариантах
+"""
+
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_post_extraction import legacy_extract_post_data
+from benchmarks.fixtures import telegram_channel_page
+from parsers.html_backend import TELEGRAM_MESSAGES, make_soup
+from parsers.telegram_parser import extract_post_data
+
+CHANNELS = ("rbc_news", "vedomosti", "mk_ru", "izvestia_ru", "rbcrostov")
+PAGES_PER_CHANNEL = 10
+
+
+def retained_bytes(extract, pages) -> tuple:
+    """(байт на пост, байт на пост без текста, число постов)"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    posts = []
+    for channel_url, html in pages:
+        # Как в TelegramParser.parse_channel: имя канала - новая строка для каждой страницы
+        channel_name = channel_url.rstrip('/').split('/')[-1]
+        soup = make_soup(html, only=TELEGRAM_MESSAGES)
+        posts.extend(p for p in (extract(post, channel_name) for post in soup.select('.tgme_widget_message')) if p)
+        del soup
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    texts = sum(sys.getsizeof(post['text']) for post in posts)
+    return used / len(posts), (used - texts) / len(posts), len(posts)
+
+
+def main():
+    pages = [
+        (f"https://t.me/{channel}", telegram_channel_page(channel, first_id=1000 + page * 20, count=20))
+        for channel in CHANNELS for page in range(PAGES_PER_CHANNEL)
+    ]
+    legacy = retained_bytes(legacy_extract_post_data, pages)
+    current = retained_bytes(extract_post_data, pages)
+    print(f"Посты Telegram: {len(CHANNELS)} каналов x {PAGES_PER_CHANNEL} страниц, {current[2]} постов")
+    print(f"  {'':<28} {'байт/пост':>10} {'без текста':>12}")
+    print(f"  {'dict (10 ключей)':<28} {legacy[0]:10.0f} {legacy[1]:12.0f}")
+    print(f"  {'Post (__slots__)':<28} {current[0]:10.0f} {current[1]:12.0f}"
+          f"  -{(1 - current[0] / legacy[0]) * 100:.0f}% / -{(1 - current[1] / legacy[1]) * 100:.0f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Разбор RSS-ленты Habr: feedparser + BeautifulSoup против потокового parsers.rss
+Запуск из корня проекта: python benchmarks/bench_rss.py
+feedparser больше не входит в зависимости бота и замеряется, только если установлен
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fixtures import habr_rss_feed
+from parsers.html_backend import make_soup
+from parsers.rss import parse_feed
+
+ROUNDS = 50
+
+
+def bench(label: str, func, baseline: float = None) -> float:
+    seconds = min(timeit.repeat(func, number=ROUNDS, repeat=3)) / ROUNDS
+    speedup = f"  x{baseline / seconds:.1f}" if baseline else ""
+    print(f"  {label:<32} {seconds * 1000:8.2f} мс/лента{speedup}")
+    return seconds
+
+
+def legacy_entries(feedparser, feed: bytes, limit: int) -> list:
+    """Прежний путь HabrParser: feedparser и два прохода BeautifulSoup по описанию каждой записи"""
+    entries = []
+    for entry in feedparser.parse(feed).entries[:limit]:
+        summary = entry.get('summary', '')
+        img_tag = make_soup(summary).find('img')
+        entries.append({
+            'title': entry.get('title', ''),
+            'image_url': img_tag.get('src') if img_tag else '',
+            'summary': make_soup(summary).get_text(separator=' ', strip=True),
+        })
+    return entries
+
+
+def main():
+    feed = habr_rss_feed(count=40)
+    try:
+        import feedparser
+    except ImportError:
+        feedparser = None
+
+    for limit in (40, 10):
+        print(f"Лента Habr, 40 записей ({len(feed) // 1024} КБ), нужно {limit}")
+        base = None
+        if feedparser is not None:
+            legacy = legacy_entries(feedparser, feed, limit)
+            current = parse_feed(feed, limit)
+            # Заголовки не сравниваем: parsers.rss дополнительно раскрывает HTML-сущности внутри CDATA
+            assert [(e['image_url'], e['summary']) for e in legacy] == \
+                [(e['image_url'], e['summary']) for e in current]
+            base = bench("feedparser + BeautifulSoup", lambda: legacy_entries(feedparser, feed, limit))
+        bench("parsers.rss (iterparse)", lambda: parse_feed(feed, limit), base)
+
+
+if __name__ == "__main__":
+    main()
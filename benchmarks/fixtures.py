@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Синтетические страницы для бенчмарков парсеров
+Разметка повторяет структуру t.me/s/<channel> и статей Habr, чтобы замеры не зависели от сети
+"""
+
+
+def telegram_post_html(channel: str, message_id: int, views: str = "1.2K",
+                       photo: bool = True, video: bool = False, gif: bool = False) -> str:
+    media = ""
+    if photo:
+        media += (
+            f'<a class="tgme_widget_message_photo_wrap" href="https://t.me/{channel}/{message_id}" '
+            f'style="width:800px;background-image:url(\'https://cdn4.telesco.pe/file/p{message_id}.jpg\')"></a>'
+        )
+    if video:
+        media += (
+            f'<a class="tgme_widget_message_video_player" href="https://t.me/{channel}/{message_id}">'
+            f'<i class="tgme_widget_message_video_thumb" style="background-image:url(\'https://cdn4.telesco.pe/file/t{message_id}.jpg\')"></i>'
+            f'<div class="tgme_widget_message_video_wrap"><video src="https://cdn4.telesco.pe/file/v{message_id}.mp4" '
+            f'class="tgme_widget_message_video" width="100%"></video></div></a>'
+        )
+    if gif:
+        media += f'<img src="https://cdn4.telesco.pe/file/g{message_id}.gif">'
+    return f'''
+<div class="tgme_widget_message_wrap js-widget_message_wrap"><div class="tgme_widget_message text_not_supported_wrap js-widget_message" data-post="{channel}/{message_id}" data-view="x">
+<div class="tgme_widget_message_user"><a href="https://t.me/{channel}"><i class="tgme_widget_message_user_photo bgcolor0" data-content="R"><img src="https://cdn4.telesco.pe/file/avatar{message_id}.jpg"></i></a></div>
+<div class="tgme_widget_message_bubble">
+<div class="tgme_widget_message_author accent_color"><a class="tgme_widget_message_owner_name" href="https://t.me/{channel}"><span dir="auto">Channel {channel}</span></a></div>
+{media}
+<div class="tgme_widget_message_text js-message_text" dir="auto">Новость номер {message_id} канала {channel}: правительство обсудило важные вопросы <b>экономики</b> и бюджета на следующий год. <a href="https://example.com/{message_id}">Подробнее</a><i class="emoji" style="background-image:url('//telegram.org/img/emoji/40/F09F9388.png')"><b>📈</b></i></div>
+<div class="tgme_widget_message_footer compact js-message_footer"><div class="tgme_widget_message_info short js-message_info"><span class="tgme_widget_message_views">{views}</span><span class="copyonly"> views</span><span class="tgme_widget_message_meta"><a class="tgme_widget_message_date" href="https://t.me/{channel}/{message_id}"><time datetime="2024-08-13T0{message_id % 10}:00:00+00:00" class="time">0{message_id % 10}:00</time></a></span></div></div>
+</div></div></div>'''
+
+
+def telegram_channel_page(channel: str = "rbc_news", first_id: int = 1000, count: int = 20) -> str:
+    """Страница канала с count постами, часть с фото, видео и GIF"""
+    posts = "".join(
+        telegram_post_html(channel, m, views=f"{m % 97}.{m % 10}K", photo=m % 3 != 0, video=m % 5 == 0, gif=m % 7 == 0)
+        for m in range(first_id, first_id + count)
+    )
+    scripts = "".join(f"<script>var widget{i} = {{id: {i}, lazy: true}};</script>" for i in range(30))
+    return f'''<!DOCTYPE html><html><head><meta charset="utf-8"><title>{channel} – Telegram</title>
+<link rel="stylesheet" href="//telegram.org/css/widget-frame.css">{scripts}</head>
+<body class="widget_frame_base tgme_webpreview"><header class="tgme_header"><div class="tgme_header_info"><div class="tgme_channel_info_header_title">{channel}</div></div></header>
+<main class="tgme_main"><section class="tgme_channel_history js-message_history">{posts}</section></main>
+<div class="tgme_channel_info"><div class="tgme_channel_info_description">Описание канала</div></div><script>more();</script></body></html>'''
+
+
+def habr_article_page(paragraphs: int = 60) -> str:
+    """Страница статьи Habr: шапка, меню, тело статьи и комментарии"""
+    menu = "".join(f'<li class="tm-main-menu__item"><a href="/ru/hub/{i}/">Хаб {i}</a></li>' for i in range(80))
+    body = "".join(
+        f"<p>Абзац {i}: описание архитектуры, <code>asyncio</code> и <a href='/ru/articles/{i}/'>ссылки</a> на материалы.</p>"
+        for i in range(paragraphs)
+    )
+    comments = "".join(
+        f'<div class="tm-comment"><span class="tm-user-info__username">user{i}</span><p>Комментарий {i}</p></div>'
+        for i in range(120)
+    )
+    return f'''<!DOCTYPE html><html><head><meta charset="utf-8"><title>Статья на Habr</title></head>
+<body><header class="tm-header"><ul class="tm-main-menu">{menu}</ul></header>
+<main><div class="tm-article-presenter"><h1 class="tm-title"><span>Как мы ускорили парсинг</span></h1>
+<div class="tm-article-body"><div class="article-formatted-body">{body}</div></div>
+<section class="tm-article-comments">{comments}</section></div></main>
+<footer class="tm-footer">Футер</footer></body></html>'''
+
+
+def habr_rss_feed(count: int = 40) -> bytes:
+    """RSS-лента Habr: описание записи - HTML с картинкой-обложкой и несколькими абзацами"""
+    items = "".join(f'''
+<item><title><![CDATA[Статья {i}: asyncio &amp; производительность]]></title>
+<guid isPermaLink="true">https://habr.com/ru/articles/{800000 + i}/</guid>
+<link>https://habr.com/ru/articles/{800000 + i}/?utm_campaign={800000 + i}&amp;utm_source=habrahabr&amp;utm_medium=rss</link>
+<description><![CDATA[<img src="https://habrastorage.org/r/w780q1/getpro/habr/upload_files/{i}.png" /><p>Краткое описание статьи {i}: разбор <b>event loop</b>, пулов процессов и <a href="https://habr.com/ru/articles/{i}/">кэшей</a>.</p><p>Второй абзац анонса со ссылками и <code>кодом</code>.</p><a href="https://habr.com/ru/articles/{800000 + i}/?utm_campaign={800000 + i}#habracut">Читать далее</a>]]></description>
+<pubDate>Tue, 13 Aug 2024 {i % 24:02d}:00:00 GMT</pubDate><dc:creator><![CDATA[author{i}]]></dc:creator>
+<category><![CDATA[Python]]></category><category><![CDATA[Высокая производительность]]></category>
+</item>''' for i in range(count))
+    return f'''<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0" xmlns:dc="http://purl.org/dc/elements/1.1/" xmlns:media="http://search.yahoo.com/mrss/">
+<channel><title>Все статьи подряд / Хабр</title><link>https://habr.com/ru/articles/</link>
+<description><![CDATA[Все статьи подряд на Хабре]]></description><language>ru</language>{items}
+</channel></rss>'''.encode('utf-8')
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Кэш загруженных статей для режимов "Кратко" и "Полная"
+Два уровня: LRU в памяти и таблица article_cache в SQLite, которая переживает перезапуск бота.
+Ключ - канонический URL, значение - заголовок, текст статьи и готовое краткое содержание.
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from database.db import get_cached_article, save_cached_article
+from parsers.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Параметры ссылок, которые не влияют на содержимое страницы
+_TRACKING_PARAMS = {'fbclid', 'gclid', 'yclid', 'ref', 'from'}
+
+
+def canonical_url(url: str) -> str:
+    """
+    Приводит ссылку к единому виду, чтобы одна статья не кэшировалась под разными ключами:
+    https://www.Habr.com/ru/articles/1/?utm_source=tg#comments -> https://habr.com/ru/articles/1
+    https://t.me/s/rbc_news/123 -> https://t.me/rbc_news/123
+    """
+    parts = urlsplit(url.strip())
+    host = (parts.hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+
+    path = parts.path.rstrip('/') or '/'
+    if host == 't.me' and path.startswith('/s/'):
+        path = path[2:]
+
+    query = urlencode(sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.startswith('utm_') and key not in _TRACKING_PARAMS
+    ))
+    scheme = 'https' if parts.scheme in ('http', 'https', '') else parts.scheme
+    return urlunsplit((scheme, host, path, query, ''))
+
+
+class ArticleCache:
+    def __init__(self, memory_ttl: float = 6 * 3600, max_memory_bytes: int = 32 * 1024 * 1024,
+                 max_rows: int = 5000):
+        self.memory = TTLCache(ttl=memory_ttl, max_bytes=max_memory_bytes)
+        self.max_rows = max_rows
+
+    async def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """Возвращает статью из памяти или из базы. None, если статья еще не загружалась"""
+        key = canonical_url(url)
+        article = self.memory.get(key)
+        if article is not None:
+            return article
+
+        stored = await asyncio.to_thread(get_cached_article, key)
+        if stored is None:
+            return None
+        article = {'success': True, **stored}
+        self.memory.set(key, article)
+        return article
+
+    async def put(self, url: str, title: str, content: str, summary: str) -> Dict[str, Any]:
+        """Сохраняет успешно загруженную статью в оба уровня кэша"""
+        key = canonical_url(url)
+        article = {'success': True, 'title': title, 'content': content, 'summary': summary}
+        self.memory.set(key, article)
+        await asyncio.to_thread(save_cached_article, key, title, content, summary, self.max_rows)
+        return article
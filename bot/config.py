@@ -5,6 +5,56 @@ load_dotenv()
 
 BOT_TOKEN = os.getenv("BOT_TOKEN")
 
+# Кэш снимков страниц каналов (общий для всех пользователей)
+CHANNEL_CACHE_TTL = int(os.getenv("CHANNEL_CACHE_TTL", "120"))  # секунды
+CHANNEL_CACHE_MAX_MB = int(os.getenv("CHANNEL_CACHE_MAX_MB", "16"))
+
+# Фоновый сборщик постов в локальную базу (интервалы опроса в секундах)
+INGEST_TELEGRAM_INTERVAL = int(os.getenv("INGEST_TELEGRAM_INTERVAL", "300"))
+INGEST_HABR_INTERVAL = int(os.getenv("INGEST_HABR_INTERVAL", "600"))
+
+# Кэш результатов поиска Habr по нормализованному запросу и фоновое обновление популярных запросов
+SEARCH_CACHE_TTL = int(os.getenv("SEARCH_CACHE_TTL", "900"))  # секунды
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "500"))  # запросов
+SEARCH_REFRESH_INTERVAL = int(os.getenv("SEARCH_REFRESH_INTERVAL", "600"))  # секунды
+SEARCH_REFRESH_TOP = int(os.getenv("SEARCH_REFRESH_TOP", "20"))  # сколько популярных запросов обновлять (0 - выключено)
+
+# Кэш статей для режимов "Кратко" / "Полная": память + SQLite
+ARTICLE_CACHE_MEMORY_MB = int(os.getenv("ARTICLE_CACHE_MEMORY_MB", "32"))
+ARTICLE_CACHE_MAX_ROWS = int(os.getenv("ARTICLE_CACHE_MAX_ROWS", "5000"))
+
+# Фоновая подгрузка статей для следующих постов в навигации
+PREFETCH_AHEAD = int(os.getenv("PREFETCH_AHEAD", "3"))            # сколько постов вперед
+PREFETCH_CONCURRENCY = int(os.getenv("PREFETCH_CONCURRENCY", "4"))  # одновременных загрузок на процесс
+
+# Сессии навигации по новостям: простой в памяти (секунды), бюджет памяти и срок хранения в базе
+SESSION_IDLE_TTL = int(os.getenv("SESSION_IDLE_TTL", "1800"))
+SESSION_MEMORY_MB = int(os.getenv("SESSION_MEMORY_MB", "64"))
+SESSION_KEEP_DAYS = int(os.getenv("SESSION_KEEP_DAYS", "7"))
+
+# Сколько секунд ждать следующих нажатий "вперед"/"назад", чтобы применить их одним редактированием сообщения
+NAVIGATION_COALESCE_DELAY = float(os.getenv("NAVIGATION_COALESCE_DELAY", "0.3"))
+
+# Ограничение частоты действий пользователя: токенов в секунду и допустимый всплеск
+THROTTLE_NAVIGATION_RATE = float(os.getenv("THROTTLE_NAVIGATION_RATE", "5"))  # листание ленты (нажатия объединяются)
+THROTTLE_NAVIGATION_BURST = int(os.getenv("THROTTLE_NAVIGATION_BURST", "10"))
+THROTTLE_ARTICLE_RATE = float(os.getenv("THROTTLE_ARTICLE_RATE", "0.5"))  # "Кратко" / "Полная"
+THROTTLE_ARTICLE_BURST = int(os.getenv("THROTTLE_ARTICLE_BURST", "3"))
+THROTTLE_SEARCH_RATE = float(os.getenv("THROTTLE_SEARCH_RATE", "0.2"))  # поиск
+THROTTLE_SEARCH_BURST = int(os.getenv("THROTTLE_SEARCH_BURST", "3"))
+THROTTLE_FEED_RATE = float(os.getenv("THROTTLE_FEED_RATE", "0.2"))  # /top, последние новости, дайджест
+THROTTLE_FEED_BURST = int(os.getenv("THROTTLE_FEED_BURST", "3"))
+
+# Дисковый кэш медиа, которые бот скачивает и загружает в Telegram сам
+MEDIA_CACHE_DIR = os.getenv("MEDIA_CACHE_DIR", "media_cache")
+MEDIA_CACHE_MAX_MB = int(os.getenv("MEDIA_CACHE_MAX_MB", "200"))
+MEDIA_MAX_FILE_MB = int(os.getenv("MEDIA_MAX_FILE_MB", "20"))
+
+# Парсер HTML для BeautifulSoup: lxml (быстрый, по умолчанию) или html.parser
+HTML_PARSER = os.getenv("HTML_PARSER", "lxml")
+# Процессов для разбора HTML (0 - разбирать в процессе бота)
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", "2"))
+
 # Список Telegram каналов для мониторинга
 TELEGRAM_CHANNELS = [
     "https://t.me/tproger",      # IT новости
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Поиск почти одинаковых новостей из разных каналов (MinHash + LSH)
+РБК, РИА, Лента и другие публикуют одну историю почти одним текстом с разницей в минуты.
+Пост сводится к множеству основ слов и чисел, два поста считаются одной историей,
+если коэффициент Жаккара их множеств не меньше threshold. Кандидаты ищутся по корзинам
+MinHash-подписи (LSH), а не перебором всех постов, поэтому проверка нового поста
+не зависит от размера выборки.
+"""
+
+import hashlib
+import logging
+import re
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+from parsers.cache import TTLCache
+from parsers.post import Post
+
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r'\w+')
+_URL_RE = re.compile(r'https?://\S+|t\.me/\S+')
+# Основа слова: первые символы достаточно устойчивы к окончаниям ("новости"/"новостей")
+_STEM_LENGTH = 5
+# В коротких постах ("Фото", "Видео дня") слишком мало слов, чтобы сравнение было надежным
+MIN_TOKENS = 5
+
+# Подпись из BANDS * ROWS = 16 хэшей: 64-байтный blake2b слова дает сразу 16 независимых 32-битных хэшей.
+# Пары с Жаккаром 0.5 попадают в общую корзину с вероятностью 0.9, с Жаккаром 0.15 - примерно в 15% случаев,
+# и таких кандидатов отсекает точная проверка
+BANDS = 8
+ROWS = 2
+
+Fingerprint = Tuple[FrozenSet[str], Tuple[int, ...]]
+
+# Отпечатки уже виденных постов: ссылка -> (текст, отпечаток)
+_fingerprints = TTLCache(ttl=24 * 3600, max_entries=20000)
+
+
+def _tokens(text: str) -> FrozenSet[str]:
+    text = _URL_RE.sub(' ', text.casefold().replace('ё', 'е'))
+    # Числа (суммы, проценты, даты) хорошо отличают истории, поэтому остаются целиком
+    return frozenset(
+        word if word.isdigit() else word[:_STEM_LENGTH]
+        for word in _WORD_RE.findall(text) if len(word) > 2 or word.isdigit()
+    )
+
+
+@lru_cache(maxsize=65536)
+def _token_hashes(token: str) -> memoryview:
+    # hash() строк случаен между запусками, а подписи должны быть стабильными
+    return memoryview(hashlib.blake2b(token.encode('utf-8'), digest_size=BANDS * ROWS * 4).digest()).cast('I')
+
+
+def fingerprint(text: str) -> Optional[Fingerprint]:
+    """Множество основ и MinHash-подпись текста. None, если слов слишком мало для сравнения"""
+    tokens = _tokens(text)
+    if len(tokens) < MIN_TOKENS:
+        return None
+    # i-й элемент подписи - минимум i-го хэша по всем словам
+    signature = tuple(map(min, zip(*map(_token_hashes, tokens))))
+    return tokens, signature
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    return len(a & b) / len(a | b) if a or b else 0.0
+
+
+def post_fingerprint(post: Dict[str, Any]) -> Optional[Fingerprint]:
+    """Отпечаток поста по заголовку и тексту, с кэшем по ссылке"""
+    text = f"{post.get('title', '')} {post.get('text', '') or post.get('summary', '')}"
+    link = post.get('link')
+    if link:
+        cached = _fingerprints.get(link)
+        if cached is not None and cached[0] == text:
+            return cached[1]
+    result = fingerprint(text)
+    if link:
+        _fingerprints.set(link, (text, result))
+    return result
+
+
+class MinHashIndex:
+    """Индекс отпечатков: корзины по полосам подписи и точная проверка Жаккара для кандидатов"""
+
+    def __init__(self, threshold: float = 0.5):
+        self.threshold = threshold
+        self._buckets: Dict[tuple, List[Tuple[FrozenSet[str], Any]]] = {}  # (полоса, хэши полосы) -> [(основы, ключ)]
+
+    @staticmethod
+    def _keys(signature: Tuple[int, ...]):
+        for band in range(BANDS):
+            yield band, signature[band * ROWS:(band + 1) * ROWS]
+
+    def add(self, fp: Fingerprint, key: Any):
+        tokens, signature = fp
+        for bucket in self._keys(signature):
+            self._buckets.setdefault(bucket, []).append((tokens, key))
+
+    def find(self, fp: Fingerprint) -> Optional[Any]:
+        """Ключ самого похожего поста с Жаккаром не ниже threshold или None"""
+        tokens, signature = fp
+        best_key, best_similarity = None, self.threshold
+        checked = set()
+        for bucket in self._keys(signature):
+            for candidate, key in self._buckets.get(bucket, ()):
+                if key in checked:
+                    continue
+                checked.add(key)
+                similarity = jaccard(tokens, candidate)
+                if similarity >= best_similarity:
+                    best_key, best_similarity = key, similarity
+        return best_key
+
+
+def collapse_duplicates(posts: List[Dict[str, Any]], threshold: float = 0.5) -> List[Dict[str, Any]]:
+    """
+    Схлопывает почти одинаковые посты в один - с наибольшим числом просмотров.
+    Порядок оставшихся постов сохраняется. У оставленного поста в 'duplicate_sources' перечислены
+    каналы, опубликовавшие ту же историю.
+    """
+    index = MinHashIndex(threshold)
+    # Сначала самые просматриваемые: они становятся представителями своих историй
+    order = sorted(range(len(posts)), key=lambda i: int(posts[i].get('views') or 0), reverse=True)
+    kept = set()
+    duplicates: Dict[int, List[str]] = {}
+    for i in order:
+        fp = post_fingerprint(posts[i])
+        if fp is None:
+            kept.add(i)
+            continue
+        original = index.find(fp)
+        if original is None:
+            index.add(fp, i)
+            kept.add(i)
+        else:
+            duplicates.setdefault(original, []).append(posts[i].get('source', ''))
+
+    if duplicates:
+        logger.info(f"Схлопнуто почти одинаковых постов: {len(posts) - len(kept)}")
+    result = []
+    for i, post in enumerate(posts):
+        if i not in kept:
+            continue
+        if i in duplicates:
+            if isinstance(post, Post):
+                post = post.replace(duplicate_sources=duplicates[i])
+            else:
+                post = {**post, 'duplicate_sources': duplicates[i]}
+        result.append(post)
+    return result
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Фоновый сборщик новостей
+Периодически опрашивает Telegram каналы и RSS Habr и сохраняет посты в таблицу posts,
+чтобы команды бота читали новости из локальной базы, а не парсили сайты на каждый запрос.
+Также заранее обновляет кэш результатов самых популярных поисковых запросов
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+from database.db import upsert_posts, delete_old_posts, get_popular_search_queries
+from parsers.telegram_parser import TelegramParser
+from parsers.habr_parser import HabrParser, normalize_query
+
+logger = logging.getLogger(__name__)
+
+
+def channel_name_from_url(channel_url: str) -> str:
+    """https://t.me/rbc_news -> rbc_news"""
+    return channel_url.rstrip('/').split('/')[-1]
+
+
+class NewsIngestor:
+    def __init__(self, telegram_parser: TelegramParser, habr_parser: HabrParser, channels: List[str],
+                 telegram_interval: int = 300, habr_interval: int = 600,
+                 posts_per_channel: int = 60, habr_limit: int = 40, keep_days: int = 7,
+                 search_interval: int = 600, search_top: int = 20):
+        self.telegram_parser = telegram_parser
+        self.habr_parser = habr_parser
+        self.channels = channels
+        self.telegram_interval = telegram_interval
+        self.habr_interval = habr_interval
+        self.posts_per_channel = posts_per_channel
+        self.habr_limit = habr_limit
+        self.keep_days = keep_days
+        self.search_interval = search_interval
+        self.search_top = search_top
+        self._tasks: List[asyncio.Task] = []
+        logger.info("Сборщик новостей инициализирован")
+
+    def start(self):
+        """Запускает циклы опроса источников в фоне"""
+        if self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(self._poll_loop("telegram", self.telegram_interval, self.ingest_telegram)),
+            asyncio.create_task(self._poll_loop("habr", self.habr_interval, self.ingest_habr)),
+        ]
+        if self.search_top > 0:
+            self._tasks.append(
+                asyncio.create_task(self._poll_loop("search", self.search_interval, self.refresh_popular_searches))
+            )
+        logger.info("Сборщик новостей запущен")
+
+    async def stop(self):
+        """Останавливает фоновые циклы"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info("Сборщик новостей остановлен")
+
+    async def ingest_telegram(self) -> int:
+        """Собирает посты со всех каналов и сохраняет их в базу"""
+        results = await asyncio.gather(
+            *(self.telegram_parser.parse_channel(url, limit=self.posts_per_channel) for url in self.channels),
+            return_exceptions=True,
+        )
+        posts = []
+        for channel_url, channel_posts in zip(self.channels, results):
+            if isinstance(channel_posts, Exception):
+                logger.error(f"Ошибка при сборе канала {channel_url}: {channel_posts}")
+                continue
+            # Источник поста - имя канала из channel_url, его проставляет парсер
+            posts.extend(channel_posts)
+        saved = await asyncio.to_thread(upsert_posts, posts, 'telegram')
+        await asyncio.to_thread(delete_old_posts, self.keep_days)
+        return saved
+
+    async def ingest_habr(self) -> int:
+        """Собирает последние статьи Habr и сохраняет их в базу"""
+        posts = await self.habr_parser.get_latest_news(self.habr_limit)
+        return await asyncio.to_thread(upsert_posts, posts, 'habr')
+
+    async def refresh_popular_searches(self) -> int:
+        """Обновляет кэш поиска Habr для самых частых запросов из search_history"""
+        counts: Dict[str, int] = {}
+        # Для каждого нормализованного запроса на Habr уходит самая частая формулировка пользователей
+        originals: Dict[str, Tuple[str, int]] = {}
+        for query, searches in await asyncio.to_thread(get_popular_search_queries, self.keep_days):
+            key = normalize_query(query)
+            if key:
+                counts[key] = counts.get(key, 0) + searches
+                if key not in originals or searches > originals[key][1]:
+                    originals[key] = (query, searches)
+        top = [originals[key][0] for key in sorted(counts, key=counts.get, reverse=True)[:self.search_top]]
+        refreshed = 0
+        # По одному запросу за раз: фоновое обновление не должно занимать лимит запросов к Habr
+        for query in top:
+            try:
+                await self.habr_parser.refresh_search(query)
+                refreshed += 1
+            except Exception as e:
+                logger.error(f"Ошибка при обновлении поиска '{query}': {e}")
+        return refreshed
+
+    async def _poll_loop(self, name: str, interval: int, ingest: Callable[[], Awaitable[int]]):
+        while True:
+            try:
+                saved = await ingest()
+                logger.info(f"Сборщик ({name}): обработано: {saved}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Ошибка сборщика ({name}): {e}")
+            await asyncio.sleep(interval)
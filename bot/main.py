@@ -5,7 +5,6 @@ Telegram News Bot (возвращены: последние новости, по
 
 import asyncio
 import logging
-import time
 from datetime import datetime, timedelta, date
 from typing import List, Dict, Any, Optional
 
@@ -13,10 +12,42 @@ from aiogram import Bot, Dispatcher, F
 from aiogram.filters import Command
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, Message, CallbackQuery, BufferedInputFile
 from aiogram import types
-import aiohttp
+from aiogram.exceptions import TelegramBadRequest
 from bs4 import BeautifulSoup
 
-from .config import BOT_TOKEN, TELEGRAM_CHANNELS
+from .config import (
+    BOT_TOKEN,
+    TELEGRAM_CHANNELS,
+    CHANNEL_CACHE_TTL,
+    CHANNEL_CACHE_MAX_MB,
+    INGEST_TELEGRAM_INTERVAL,
+    INGEST_HABR_INTERVAL,
+    SEARCH_CACHE_TTL,
+    SEARCH_CACHE_SIZE,
+    SEARCH_REFRESH_INTERVAL,
+    SEARCH_REFRESH_TOP,
+    ARTICLE_CACHE_MEMORY_MB,
+    ARTICLE_CACHE_MAX_ROWS,
+    PREFETCH_AHEAD,
+    PREFETCH_CONCURRENCY,
+    MEDIA_CACHE_DIR,
+    MEDIA_CACHE_MAX_MB,
+    MEDIA_MAX_FILE_MB,
+    HTML_PARSER,
+    PARSE_WORKERS,
+    SESSION_IDLE_TTL,
+    SESSION_MEMORY_MB,
+    SESSION_KEEP_DAYS,
+    NAVIGATION_COALESCE_DELAY,
+    THROTTLE_NAVIGATION_RATE,
+    THROTTLE_NAVIGATION_BURST,
+    THROTTLE_ARTICLE_RATE,
+    THROTTLE_ARTICLE_BURST,
+    THROTTLE_SEARCH_RATE,
+    THROTTLE_SEARCH_BURST,
+    THROTTLE_FEED_RATE,
+    THROTTLE_FEED_BURST,
+)
 from .keyboards import (
     get_main_keyboard,
     get_main_menu,
@@ -28,6 +59,13 @@ from .keyboards import (
     get_top_news_buttons,
 )
 from .scheduler import NewsScheduler
+from .ingestion import NewsIngestor, channel_name_from_url
+from .article_cache import ArticleCache, canonical_url
+from .media_cache import MediaCache
+from .dedup import collapse_duplicates
+from .sessions import SessionStore
+from .middlewares import ThrottlingMiddleware
+from .snapshots import FeedSnapshot, SnapshotRegistry
 from .admin import is_admin, get_users_statistics, send_message_to_all_users, send_message_to_user
 
 from database.db import (
@@ -43,17 +81,66 @@ from database.db import (
     get_user_stats,
     add_view_history,
     get_url_by_token,
+    get_top_posts,
+    get_latest_posts,
+    search_posts,
+    upsert_posts,
+    get_media_file_id,
+    save_media_file_id,
+    delete_media_file_id,
 )
 from parsers.telegram_parser import TelegramParser
+from parsers.http_client import get_http_client, close_http_client
+from parsers.html_backend import set_html_backend
+from parsers.parse_service import ParseService
+from parsers.cache import TTLCache, estimate_size
+from parsers.post import Post
+from parsers.singleflight import SingleFlight
 from parsers.base_parser import BaseParser
-from parsers.habr_parser import HabrParser
+from parsers.habr_parser import HabrParser, normalize_query
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 bot = Bot(token=BOT_TOKEN)
 dp = Dispatcher()
-parser = TelegramParser()
+
+# Ограничение частоты действий: вид действия задается флагом "throttle" у обработчика
+throttling = ThrottlingMiddleware({
+    "navigation": (THROTTLE_NAVIGATION_RATE, THROTTLE_NAVIGATION_BURST),
+    "article": (THROTTLE_ARTICLE_RATE, THROTTLE_ARTICLE_BURST),
+    "search": (THROTTLE_SEARCH_RATE, THROTTLE_SEARCH_BURST),
+    "feed": (THROTTLE_FEED_RATE, THROTTLE_FEED_BURST),
+})
+dp.message.middleware(throttling)
+dp.callback_query.middleware(throttling)
+set_html_backend(HTML_PARSER)
+# Один пул HTTP-соединений, один пул процессов разбора HTML и по одному парсеру каждого типа на весь процесс
+http_client = get_http_client()
+parse_service = ParseService(PARSE_WORKERS)
+parser = TelegramParser(
+    http_client,
+    cache=TTLCache(ttl=CHANNEL_CACHE_TTL, max_bytes=CHANNEL_CACHE_MAX_MB * 1024 * 1024),
+    parse_service=parse_service,
+)
+habr_parser = HabrParser(
+    http_client,
+    parse_service,
+    search_cache=TTLCache(ttl=SEARCH_CACHE_TTL, max_entries=SEARCH_CACHE_SIZE),
+)
+article_parser = BaseParser(http_client, parse_service)
+
+# Загруженные статьи (текст + краткое содержание) и объединение одновременных загрузок
+article_cache = ArticleCache(max_memory_bytes=ARTICLE_CACHE_MEMORY_MB * 1024 * 1024, max_rows=ARTICLE_CACHE_MAX_ROWS)
+_article_flight = SingleFlight()
+# Медиа, которые приходится загружать в Telegram самим (Telegram не смог забрать их по URL)
+media_cache = MediaCache(
+    http_client,
+    cache_dir=MEDIA_CACHE_DIR,
+    max_bytes=MEDIA_CACHE_MAX_MB * 1024 * 1024,
+    max_file_bytes=MEDIA_MAX_FILE_MB * 1024 * 1024,
+)
+# Общий лимит фоновых подгрузок статей для всех пользователей
+_prefetch_semaphore = asyncio.Semaphore(PREFETCH_CONCURRENCY)
 
 # Флаги ожидания ввода для рассылки
 from typing import Set
@@ -61,11 +148,11 @@ BROADCAST_ALL_WAITING: Set[int] = set()
 BROADCAST_USER_WAITING: Set[int] = set()
 
 # Навигация по новостям для каждого пользователя
-from typing import Dict, List
-NEWS_NAVIGATION: Dict[int, Dict] = {}  # user_id -> {posts, current_index, message_id, chat_id}
-
-# Добавляем защиту от спама для навигации
-NAVIGATION_COOLDOWN = {}  # user_id -> timestamp
+from typing import Awaitable, Callable, Dict, List
+# Поля поста, которые сохраняются вместе с вытесненной сессией
+_SESSION_POST_FIELDS = ('title', 'link', 'source', 'image_url', 'video_url', 'animation_url')
+# Снимки лент, общие для всех сессий навигации
+FEED_SNAPSHOTS = SnapshotRegistry()
 
 MENU_TEXTS = {
     "📰 Последние новости",
@@ -77,14 +164,56 @@ MENU_TEXTS = {
 }
 
 class NewsNavigator:
-    def __init__(self, posts: List[Dict], start_index: int = 0):
-        self.posts = posts
+    def __init__(self, snapshot: FeedSnapshot, start_index: int = 0):
+        self.snapshot = snapshot            # Общий для всех пользователей снимок ленты, не копируется
         self.current_index = start_index
         self.current_view_mode = "normal"  # normal, tldr, full
         self.post_contents = {}  # Словарь для хранения контента каждого поста: {post_index: {"tldr": "...", "full": "..."}}
         self.message_id = None             # ID сообщения для редактирования
+        self._prefetch_tasks: Dict[int, asyncio.Task] = {}  # post_index -> фоновая подгрузка
+        self._prefetched: Set[int] = set()
+    
+    @property
+    def posts(self):
+        return self.snapshot.posts
+    
+    def extend(self, posts: List[Dict]) -> bool:
+        """Переходит на следующую версию снимка с добавленными постами. Возвращает True, если постов стало больше"""
+        before = len(self.snapshot)
+        self.snapshot = FEED_SNAPSHOTS.extend(self.snapshot, posts)
+        return len(self.snapshot) > before
+    
+    def to_state(self) -> Dict:
+        """
+        Компактное состояние для SessionStore: лента и версия снимка, а также поля постов, нужные для показа
+        (без текстов статей) - по ним снимок восстанавливается, если его версии уже нет в памяти
+        """
+        return {
+            'feed': [self.snapshot.kind, self.snapshot.key, self.snapshot.version],
+            'posts': [{key: post[key] for key in _SESSION_POST_FIELDS if post.get(key)} for post in self.posts],
+            'current_index': self.current_index,
+            'message_id': self.message_id,
+        }
+    
+    @classmethod
+    def from_state(cls, state: Dict) -> "NewsNavigator":
+        # Режим просмотра не сохраняется: "Кратко" / "Полная" быстро загрузятся заново из кэша статей
+        kind, key, version = state.get('feed') or ('session', '', 0)
+        links = tuple(post.get('link') for post in state['posts'])
+        snapshot = FEED_SNAPSHOTS.find(kind, key, version)
+        if snapshot is None or snapshot.links() != links:
+            # В сохраненных постах только поля для показа: такой снимок остается частным для этой сессии
+            snapshot = FEED_SNAPSHOTS.private(kind, key, state['posts'])
+        navigator = cls(snapshot, state['current_index'])
+        navigator.message_id = state.get('message_id')
+        return navigator
+    
+    def session_size(self) -> int:
+        """Память, которую занимает сама сессия: общий снимок в размер сессии не входит, частный - входит"""
+        return estimate_size({name: value for name, value in vars(self).items()
+                              if name != 'snapshot' or self.snapshot.private})
         
-    def get_current_post(self) -> Optional[Dict]:
+    def get_current_post(self) -> Optional[Post]:
         """Возвращает текущий пост"""
         if 0 <= self.current_index < len(self.posts):
             return self.posts[self.current_index]
@@ -98,23 +227,23 @@ class NewsNavigator:
         """Проверяет, есть ли предыдущая новость"""
         return self.current_index > 0
     
+    def move(self, delta: int) -> bool:
+        """Сдвигается на delta новостей в пределах ленты. Возвращает True, если позиция изменилась"""
+        index = max(0, min(len(self.posts) - 1, self.current_index + delta))
+        if index == self.current_index:
+            return False
+        self.current_index = index
+        # Сбрасываем режим просмотра при переходе к новой новости
+        self.current_view_mode = "normal"
+        return True
+    
     def next_post(self):
         """Переходит к следующей новости"""
-        if self.has_next():
-            self.current_index += 1
-            # Сбрасываем режим просмотра при переходе к новой новости
-            self.current_view_mode = "normal"
-            return True
-        return False
+        return self.move(1)
     
     def prev_post(self):
         """Переходит к предыдущей новости"""
-        if self.has_prev():
-            self.current_index -= 1
-            # Сбрасываем режим просмотра при переходе к новой новости
-            self.current_view_mode = "normal"
-            return True
-        return False
+        return self.move(-1)
     
     def set_view_mode(self, mode: str):
         """Устанавливает режим просмотра"""
@@ -276,9 +405,72 @@ class NewsNavigator:
         
         return media
     
-    def needs_more_posts(self) -> bool:
-        """Проверяет, нужно ли загрузить больше новостей"""
-        return self.current_index >= len(self.posts) - 3  # Загружаем когда остается 3 поста
+    def needs_more_posts(self, ahead: int = 0) -> bool:
+        """Проверяет, нужно ли загрузить больше новостей (для позиции на ahead новостей дальше текущей)"""
+        return self.current_index + ahead >= len(self.posts) - 3  # Загружаем когда остается 3 поста
+    
+    def schedule_prefetch(self, prefetch: Callable[[Post], Awaitable[bool]], ahead: int = PREFETCH_AHEAD):
+        """
+        Запускает фоновую подгрузку для ahead постов после текущего,
+        чтобы "Кратко" / "Полная" на них открывались без ожидания сети
+        """
+        end = min(len(self.posts), self.current_index + 1 + ahead)
+        for index in range(self.current_index + 1, end):
+            if index in self._prefetch_tasks or index in self._prefetched:
+                continue
+            task = asyncio.create_task(prefetch(self.posts[index]))
+            self._prefetch_tasks[index] = task
+            task.add_done_callback(lambda t, i=index: self._prefetch_done(i, t))
+    
+    def _prefetch_done(self, index: int, task: asyncio.Task):
+        if self._prefetch_tasks.get(index) is task:
+            del self._prefetch_tasks[index]
+        if not task.cancelled() and task.exception() is None and task.result():
+            self._prefetched.add(index)
+    
+    def cancel_prefetch(self):
+        """Отменяет фоновые подгрузки (сессия навигации завершена или заменена)"""
+        for task in self._prefetch_tasks.values():
+            task.cancel()
+        self._prefetch_tasks.clear()
+
+# Сессии навигации: в памяти - активные в пределах бюджета, остальные в таблице nav_sessions
+NEWS_NAVIGATION: SessionStore[NewsNavigator] = SessionStore(
+    dump=NewsNavigator.to_state,
+    load=NewsNavigator.from_state,
+    idle_ttl=SESSION_IDLE_TTL,
+    max_bytes=SESSION_MEMORY_MB * 1024 * 1024,
+    keep_days=SESSION_KEEP_DAYS,
+    on_evict=NewsNavigator.cancel_prefetch,
+    sizeof=NewsNavigator.session_size,
+)
+
+# Листание, которое сейчас обрабатывается: user_id -> нажатия "вперед"/"назад", еще не примененные к позиции.
+# Хранится отдельно от навигатора: сессию могут выгрузить и восстановить новым объектом посреди обработки
+_PENDING_MOVES: Dict[int, int] = {}
+
+def _set_navigator(user_id: int, navigator: NewsNavigator):
+    """Сохраняет новую сессию навигации, отменяя подгрузки предыдущей"""
+    previous = NEWS_NAVIGATION.get(user_id)
+    if previous is not None and previous is not navigator:
+        previous.cancel_prefetch()
+    NEWS_NAVIGATION[user_id] = navigator
+
+async def _prefetch_post(post: Post) -> bool:
+    """
+    Загружает статью поста в кэш статей. Возвращает True, если статья в кэше.
+    Картинки заранее не скачиваются: обычно они отправляются по ссылке или по сохраненному file_id
+    """
+    link = post.get("link")
+    if not link:
+        return False
+    async with _prefetch_semaphore:
+        try:
+            res = await _fetch_article(link, prefetch=True)
+        except Exception as e:
+            logger.warning(f"Не удалось заранее загрузить статью {link}: {e}")
+            return False
+    return bool(res.get("success"))
 
 async def _try_send_photo(message: Message, image_url: str, caption: str, reply_markup=None) -> bool:
     if not image_url:
@@ -289,13 +481,11 @@ async def _try_send_photo(message: Message, image_url: str, caption: str, reply_
     except Exception:
         pass
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(image_url, timeout=10) as resp:
-                if resp.status == 200:
-                    content = await resp.read()
-                    file = BufferedInputFile(content, filename="image.jpg")
-                    await message.answer_photo(photo=file, caption=caption, parse_mode="HTML", reply_markup=reply_markup)
-                    return True
+        downloaded = await media_cache.get(image_url, accept=("image/",))
+        if downloaded:
+            file = BufferedInputFile(downloaded.data, filename=downloaded.filename)
+            await message.answer_photo(photo=file, caption=caption, parse_mode="HTML", reply_markup=reply_markup)
+            return True
     except Exception:
         return False
     return False
@@ -309,13 +499,11 @@ async def _try_send_video(message: Message, video_url: str, caption: str, reply_
     except Exception:
         pass
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(video_url, timeout=15) as resp:
-                if resp.status == 200:
-                    content = await resp.read()
-                    file = BufferedInputFile(content, filename="video.mp4")
-                    await message.answer_video(video=file, caption=caption, parse_mode="HTML", reply_markup=reply_markup)
-                    return True
+        downloaded = await media_cache.get(video_url, accept=("video/",))
+        if downloaded:
+            file = BufferedInputFile(downloaded.data, filename=downloaded.filename)
+            await message.answer_video(video=file, caption=caption, parse_mode="HTML", reply_markup=reply_markup)
+            return True
     except Exception:
         return False
     return False
@@ -329,13 +517,11 @@ async def _try_send_animation(message: Message, animation_url: str, caption: str
     except Exception:
         pass
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(animation_url, timeout=15) as resp:
-                if resp.status == 200:
-                    content = await resp.read()
-                    file = BufferedInputFile(content, filename="animation.gif")
-                    await message.answer_animation(animation=file, caption=caption, parse_mode="HTML", reply_markup=reply_markup)
-                    return True
+        downloaded = await media_cache.get(animation_url, accept=("image/gif", "video/"))
+        if downloaded:
+            file = BufferedInputFile(downloaded.data, filename=downloaded.filename)
+            await message.answer_animation(animation=file, caption=caption, parse_mode="HTML", reply_markup=reply_markup)
+            return True
     except Exception:
         return False
     return False
@@ -348,17 +534,45 @@ def _to_date(date_str: str) -> date:
     except Exception:
         return date.today()
 
-async def _collect_posts(days: int) -> List[Dict[str, Any]]:
+async def _collect_posts(days: int) -> List[Post]:
+    """Посты с каналов за days дней по популярности: из локальной базы, при пустой базе - с сайтов."""
+    threshold = date.today() - timedelta(days=days - 1)
+    sources = [channel_name_from_url(url) for url in TELEGRAM_CHANNELS]
+    stored = [Post.from_mapping(row) for row in get_top_posts(threshold.isoformat(), limit=500, sources=sources)]
+    if stored:
+        logger.info(f"Посты за {days} дней взяты из локальной базы: {len(stored)}")
+    else:
+        stored = await _scrape_posts(days)
+    # Одна история из нескольких каналов показывается один раз - версией с наибольшим числом просмотров
+    return collapse_duplicates(stored)
+
+async def _index_posts(posts: List[Post], kind: str):
+    """
+    Сохраняет в локальную базу посты, полученные в обход фонового сборщика, чтобы поиск находил и их.
+    Статьи Habr из глубины ленты сохраняются как 'habr_search': даты из ленты неточные,
+    и такие статьи не должны попадать в "Последние новости"
+    """
+    if posts:
+        await asyncio.to_thread(upsert_posts, posts, kind)
+
+async def _scrape_posts(days: int) -> List[Post]:
     """Собирает посты с каналов за days дней, сортирует по популярности (views)."""
     threshold = date.today() - timedelta(days=days - 1)
-    all_posts: List[Dict[str, Any]] = []
+    all_posts: List[Post] = []
     
     logger.info(f"Начинаем сбор постов за {days} дней...")
     
-    for channel_url in TELEGRAM_CHANNELS:
+    # Каналы загружаются параллельно, ошибки отдельных каналов не прерывают сбор
+    results = await asyncio.gather(
+        *(parser.parse_channel(channel_url, limit=60) for channel_url in TELEGRAM_CHANNELS),
+        return_exceptions=True,
+    )
+    
+    for channel_url, posts in zip(TELEGRAM_CHANNELS, results):
+        if isinstance(posts, Exception):
+            logger.error(f"Ошибка при парсинге {channel_url}: {posts}")
+            continue
         try:
-            logger.info(f"Парсим канал: {channel_url}")
-            posts = parser.parse_channel(channel_url, limit=60)
             logger.info(f"Получено {len(posts)} постов с канала {channel_url}")
             
             for p in posts:
@@ -366,17 +580,17 @@ async def _collect_posts(days: int) -> List[Dict[str, Any]]:
                 if p_date >= threshold:
                     # Правильно устанавливаем источник на основе URL канала
                     if "vedomosti" in channel_url:
-                        p['source'] = 'vedomosti'
+                        p = p.replace(source='vedomosti')
                     elif "rbc_news" in channel_url:
-                        p['source'] = 'rbc_news'
+                        p = p.replace(source='rbc_news')
                     elif "mk_ru" in channel_url:
-                        p['source'] = 'mk_ru'
+                        p = p.replace(source='mk_ru')
                     elif "izvestia_ru" in channel_url:
-                        p['source'] = 'izvestia_ru'
+                        p = p.replace(source='izvestia_ru')
                     else:
                         # Извлекаем название канала из URL
                         channel_name = channel_url.split('/')[-1] if channel_url.endswith('/') else channel_url.split('/')[-1]
-                        p['source'] = channel_name
+                        p = p.replace(source=channel_name)
                     
                     # Логируем медиафайлы для отладки
                     if p.get("image_url") or p.get("video_url") or p.get("animation_url"):
@@ -395,6 +609,7 @@ async def _collect_posts(days: int) -> List[Dict[str, Any]]:
             continue
     
     logger.info(f"Всего собрано постов: {len(all_posts)}")
+    await _index_posts(all_posts, 'telegram')
     
     # Сортируем по популярности (views), затем по дате
     all_posts.sort(key=lambda x: (x.get("views", 0), x.get("date", "")), reverse=True)
@@ -434,21 +649,22 @@ async def help_command(message: Message) -> None:
 
 # ===== Text menu (reply keyboard) =====
 
-@dp.message(F.text == "📰 Последние новости")
+@dp.message(F.text == "📰 Последние новости", flags={"throttle": "feed"})
 async def latest_news(message: Message) -> None:
     await message.answer("🔄 Загружаю последние IT новости с Habr...")
     try:
-        from parsers.habr_parser import HabrParser
-        habr_parser = HabrParser()
-        posts = habr_parser.get_latest_news(limit=15)  # Увеличиваем лимит для навигации
+        posts = get_latest_posts('habr', limit=15)  # Увеличиваем лимит для навигации
+        if not posts:
+            posts = await habr_parser.get_latest_news(limit=15)
+            await _index_posts(posts, 'habr')
         
         if not posts:
             await message.answer("❌ Не удалось загрузить новости с Habr")
             return
             
         # Создаем навигатор для пользователя
-        navigator = NewsNavigator(posts, 0) # Start from index 0
-        NEWS_NAVIGATION[message.from_user.id] = navigator
+        navigator = NewsNavigator(FEED_SNAPSHOTS.publish('latest', 'habr', posts), 0) # Start from index 0
+        _set_navigator(message.from_user.id, navigator)
         
         # Отправляем первую новость с медиа
         message_id = await _send_news_with_media(message, navigator)
@@ -461,7 +677,7 @@ async def latest_news(message: Message) -> None:
         logger.error(f"Ошибка при загрузке новостей с Habr: {e}")
         await message.answer("❌ Произошла ошибка при загрузке новостей")
 
-@dp.message(F.text == "📊 Топ за сегодня")
+@dp.message(F.text == "📊 Топ за сегодня", flags={"throttle": "feed"})
 async def top_today(message: Message) -> None:
     await top_command(message)
 
@@ -507,7 +723,7 @@ async def ask_search_query(message: Message) -> None:
     and not m.text.startswith('/')
     and m.text.strip() not in MENU_TEXTS
     and (m.from_user is None or (m.from_user.id not in BROADCAST_ALL_WAITING and m.from_user.id not in BROADCAST_USER_WAITING))
-))
+), flags={"throttle": "search"})
 async def handle_search_query(message: Message) -> None:
     query = message.text.strip()
     add_search_query(message.from_user.id, query)
@@ -515,17 +731,22 @@ async def handle_search_query(message: Message) -> None:
     await message.answer(f"🔍 Ищу IT новости по запросу: <b>{query}</b>", parse_mode="HTML")
     
     try:
-        from parsers.habr_parser import HabrParser
-        habr_parser = HabrParser()
-        found = habr_parser.search_by_query(query, limit=15)
+        # Сначала ищем по локальному индексу постов Telegram и Habr, на сайт Habr идем только при промахе
+        found = await asyncio.to_thread(search_posts, query, 15)
+        if found:
+            logger.info(f"Поиск '{query}': {len(found)} постов из локального индекса")
+        else:
+            found = await habr_parser.search_by_query(query, limit=15)
+            # Найденные на сайте статьи попадают в индекс для следующих поисков
+            await _index_posts(found, 'habr_search')
         
         if not found:
             await message.answer("Ничего не найдено на Habr по вашему запросу")
             return
         
         # Создаем навигатор для результатов поиска
-        navigator = NewsNavigator(found, 0) # Start from index 0
-        NEWS_NAVIGATION[message.from_user.id] = navigator
+        navigator = NewsNavigator(FEED_SNAPSHOTS.publish('search', normalize_query(query), found), 0) # Start from index 0
+        _set_navigator(message.from_user.id, navigator)
         
         # Отправляем первый результат с медиа
         message_id = await _send_news_with_media(message, navigator)
@@ -564,7 +785,7 @@ async def help_callback(call: CallbackQuery) -> None:
     await call.answer()
     await help_command(call.message)
 
-@dp.message(Command("top"))
+@dp.message(Command("top"), flags={"throttle": "feed"})
 async def top_command(message: Message) -> None:
     # Топ: отправляем посты по одному (с фото, если есть), затем кнопка "Еще"
     await message.answer("🔍 Загружаю топ новости...")
@@ -584,8 +805,9 @@ async def top_command(message: Message) -> None:
     posts_to_show = posts[: max(15, user_limit)]  # Увеличиваем лимит для навигации
     
     # Создаем навигатор для топ новостей
-    navigator = NewsNavigator(posts_to_show, 0) # Start from index 0
-    NEWS_NAVIGATION[message.from_user.id] = navigator
+    snapshot = FEED_SNAPSHOTS.publish('top', f"1:{len(posts_to_show)}", posts_to_show)
+    navigator = NewsNavigator(snapshot, 0) # Start from index 0
+    _set_navigator(message.from_user.id, navigator)
     
     # Отправляем первую новость с медиа
     message_id = await _send_news_with_media(message, navigator)
@@ -594,7 +816,7 @@ async def top_command(message: Message) -> None:
     navigator.message_id = message_id
     NEWS_NAVIGATION[message.from_user.id] = navigator
 
-@dp.callback_query(lambda c: c.data.startswith("top_news"))
+@dp.callback_query(lambda c: c.data.startswith("top_news"), flags={"throttle": "feed"})
 async def top_news_callback(call: CallbackQuery) -> None:
     await call.answer()
     await top_command(call.message)
@@ -666,7 +888,7 @@ async def settings_channels_callback(call: CallbackQuery) -> None:
 
 # ===== Digest =====
 
-@dp.callback_query(lambda c: c.data == "digest")
+@dp.callback_query(lambda c: c.data == "digest", flags={"throttle": "feed"})
 async def digest_callback(call: CallbackQuery) -> None:
     await call.answer()
     await send_instant_digest(call.message)
@@ -677,17 +899,26 @@ async def send_instant_digest(message: Message) -> None:
         await message.answer("📅 Подготавливаю дайджест...")
         channels = get_user_channels(uid) or TELEGRAM_CHANNELS
         limit = get_user_news_count(uid)
-        all_posts: List[Dict[str, Any]] = []
-        for ch in channels[:5]:
-            try:
-                all_posts.extend(parser.parse_channel(ch, limit=limit))
-            except Exception as e:
-                logger.error(f"Ошибка парсинга {ch}: {e}")
+        since = (date.today() - timedelta(days=1)).isoformat()
+        # Берем с запасом: часть постов схлопнется как одна история из разных каналов
+        all_posts: List[Dict[str, Any]] = get_top_posts(
+            since, limit=limit * 3, sources=[channel_name_from_url(ch) for ch in channels[:5]]
+        )
+        if not all_posts:
+            results = await asyncio.gather(
+                *(parser.parse_channel(ch, limit=limit) for ch in channels[:5]),
+                return_exceptions=True,
+            )
+            for ch, posts in zip(channels[:5], results):
+                if isinstance(posts, Exception):
+                    logger.error(f"Ошибка парсинга {ch}: {posts}")
+                    continue
+                all_posts.extend(posts)
         if not all_posts:
             await message.answer("❌ Не удалось загрузить новости для дайджеста")
             return
         all_posts.sort(key=lambda x: (x.get("views", 0), x.get("date", "")), reverse=True)
-        posts = all_posts[:limit]
+        posts = collapse_duplicates(all_posts)[:limit]
         text = "📰 <b>Ваш дайджест:</b>\n\n"
         for i, p in enumerate(posts, 1):
             title = p.get("title", "Без заголовка")
@@ -754,14 +985,14 @@ async def save_post(call: CallbackQuery) -> None:
     await call.message.answer("✅ Новость добавлена в избранное!")
 
 # TLDR / FULL handlers (простые варианты)
-@dp.callback_query(lambda c: c.data.startswith("tldr:"))
+@dp.callback_query(lambda c: c.data.startswith("tldr:"), flags={"throttle": "article"})
 async def tldr_handler(call: CallbackQuery) -> None:
     await call.answer()
     token = call.data.split(":",1)[1]
     link = get_url_by_token(token) or token
     await _send_tldr(call.message, link)
 
-@dp.callback_query(lambda c: c.data.startswith("full:"))
+@dp.callback_query(lambda c: c.data.startswith("full:"), flags={"throttle": "article"})
 async def full_handler(call: CallbackQuery) -> None:
     await call.answer()
     token = call.data.split(":",1)[1]
@@ -773,15 +1004,39 @@ async def full_handler(call: CallbackQuery) -> None:
 def _choose_article_parser(url: str):
     u = (url or "").lower()
     if "habr.com" in u:
-        return HabrParser()
+        return habr_parser
     elif "t.me/" in u or "/s/" in u:
         # Для Telegram-ссылок используем BaseParser с улучшенной поддержкой Telegram
         logger.info(f"DEBUG: Выбран BaseParser для Telegram URL: {url}")
-        return BaseParser()
+        return article_parser
     else:
         # Для остальных сайтов используем BaseParser
         logger.info(f"DEBUG: Выбран BaseParser для URL: {url}")
-        return BaseParser()
+        return article_parser
+
+async def _fetch_article(url: str, prefetch: bool = False) -> Dict[str, Any]:
+    """
+    Возвращает статью с кратким содержанием: {'success', 'title', 'content', 'summary'}.
+    Сначала смотрит в кэш статей, иначе загружает ее. Одновременные запросы одной ссылки ждут одну загрузку.
+    Фоновая загрузка (prefetch) прерывается, если ее отменили и статью больше никто не ждет.
+    """
+    cached = await article_cache.get(url)
+    if cached is not None:
+        return cached
+    task = asyncio.current_task()
+    if prefetch and task is not None and task.cancelling():
+        # Подгрузку отменили, пока проверялся кэш: общую загрузку не начинаем
+        raise asyncio.CancelledError()
+    return await _article_flight.do(
+        canonical_url(url), lambda: _download_article(url), cancel_abandoned=prefetch
+    )
+
+async def _download_article(url: str) -> Dict[str, Any]:
+    res = await _choose_article_parser(url).parse_full_article(url)
+    if not res.get("success"):
+        return res
+    content = res.get("content", "")
+    return await article_cache.put(url, res.get("title", ""), content, _summarize_text(content))
 
 def _is_content_relevant(title: str, content: str) -> bool:
     """Проверяет, релевантен ли контент заголовку"""
@@ -869,18 +1124,16 @@ async def _send_long_text(message: Message, text: str, header: str | None = None
         body = body[chunk_limit:]
 
 async def _send_tldr(message: Message, url: str):
-    parser_obj = _choose_article_parser(url)
-    res = parser_obj.parse_full_article(url)
+    res = await _fetch_article(url)
     if not res.get("success"):
         await message.answer(f"❌ Не удалось получить кратко. Откройте ссылку: {url}")
         return
-    summary = _summarize_text(res.get("content", ""))
+    summary = res.get("summary", "")
     title = res.get("title", "Кратко")
     await _send_long_text(message, summary, header=f"📝 {title}")
 
 async def _send_full_article(message: Message, url: str):
-    parser_obj = _choose_article_parser(url)
-    res = parser_obj.parse_full_article(url)
+    res = await _fetch_article(url)
     if not res.get("success"):
         await message.answer(f"❌ Не удалось получить статью. Откройте ссылку: {url}")
         return
@@ -888,8 +1141,61 @@ async def _send_full_article(message: Message, url: str):
     title = res.get("title", "Полная статья")
     await _send_long_text(message, content, header=f"📖 {title}")
 
+def _remember_file_id(url: str, kind: str, sent: Any):
+    """Запоминает file_id медиа из отправленного сообщения, чтобы следующие отправки его не загружали"""
+    if not isinstance(sent, Message):
+        return  # edit_message_media для inline-сообщений возвращает True
+    if kind == "photo":
+        file_id = sent.photo[-1].file_id if sent.photo else None
+    else:
+        attachment = getattr(sent, kind, None)
+        file_id = attachment.file_id if attachment else None
+    if file_id:
+        save_media_file_id(url, kind, file_id)
+
+# Фрагменты текста ошибки Telegram, означающие, что сохраненный file_id больше не годится
+_BAD_FILE_ID_ERRORS = ("wrong file identifier", "wrong remote file", "file_id", "file identifier")
+
+
+def _is_bad_file_id_error(error: TelegramBadRequest) -> bool:
+    text = str(error).lower()
+    return any(fragment in text for fragment in _BAD_FILE_ID_ERRORS)
+
+
+async def _send_by_file_id(message: Message, kind: str, url: str, text: str, keyboard, edit_message_id: int = None) -> Optional[int]:
+    """Отправляет медиа по сохраненному file_id. None, если file_id нет или Telegram его не принял"""
+    file_id = get_media_file_id(url, kind)
+    if not file_id:
+        return None
+    input_media = {"video": types.InputMediaVideo, "animation": types.InputMediaAnimation, "photo": types.InputMediaPhoto}[kind]
+    try:
+        if edit_message_id:
+            await message.bot.edit_message_media(
+                chat_id=message.chat.id,
+                message_id=edit_message_id,
+                media=input_media(media=file_id, caption=text, parse_mode="HTML"),
+                reply_markup=keyboard
+            )
+            return edit_message_id
+        send = getattr(message, f"answer_{kind}")
+        sent = await send(file_id, caption=text, parse_mode="HTML", reply_markup=keyboard)
+        return sent.message_id
+    except TelegramBadRequest as e:
+        if not _is_bad_file_id_error(e):
+            logger.warning(f"Не удалось отправить медиа {url} по file_id: {e}")
+            return None
+        logger.warning(f"Telegram не принял сохраненный file_id для {url}: {e}")
+        delete_media_file_id(url, kind)
+        return None
+    except Exception as e:
+        # Таймауты, flood-wait и прочие временные ошибки: file_id при этом остается рабочим
+        logger.warning(f"Не удалось отправить медиа {url} по file_id: {e}")
+        return None
+
 async def _send_news_with_media(message: Message, navigator: NewsNavigator, edit_message_id: int = None) -> int:
     """Отправляет новость с медиафайлами. Возвращает ID отправленного сообщения."""
+    # Пока пользователь читает текущий пост, подгружаем следующие
+    navigator.schedule_prefetch(_prefetch_post)
     text = navigator.get_navigation_text()
     keyboard = navigator.get_navigation_keyboard()
     media = navigator.get_media_files()
@@ -897,16 +1203,25 @@ async def _send_news_with_media(message: Message, navigator: NewsNavigator, edit
     # Логируем для отладки
     logger.info(f"Отправляем новость с медиа: {media}")
     
+    # Медиа, уже загруженное в Telegram, отправляем по file_id без скачивания
+    for kind in ("video", "animation", "photo"):
+        if media.get(kind):
+            message_id = await _send_by_file_id(message, kind, media[kind], text, keyboard, edit_message_id)
+            if message_id:
+                return message_id
+            break
+    
     # Если есть медиа, отправляем с ним
     if media.get("video"):
         try:
             if edit_message_id:
-                await message.bot.edit_message_media(
+                sent = await message.bot.edit_message_media(
                     chat_id=message.chat.id,
                     message_id=edit_message_id,
                     media=types.InputMediaVideo(media=media["video"], caption=text, parse_mode="HTML"),
                     reply_markup=keyboard
                 )
+                _remember_file_id(media["video"], "video", sent)
                 return edit_message_id
             else:
                 sent = await message.answer_video(
@@ -915,39 +1230,35 @@ async def _send_news_with_media(message: Message, navigator: NewsNavigator, edit
                     parse_mode="HTML",
                     reply_markup=keyboard
                 )
+                _remember_file_id(media["video"], "video", sent)
                 return sent.message_id
         except Exception as e:
             logger.error(f"Ошибка при отправке видео: {e}")
-            # Fallback: скачиваем файл и отправляем как BufferedInputFile
-            try:
-                import requests
-                from aiogram.types import BufferedInputFile
-                
-                # Устанавливаем короткий таймаут для видео
-                response = requests.get(media["video"], timeout=5)
-                if response.status_code == 200:
-                    video_file = BufferedInputFile(response.content, filename="video.mp4")
-                    
+            # Fallback: скачиваем файл (через дисковый кэш медиа) и загружаем его в Telegram
+            downloaded = await media_cache.get(media["video"], accept=("video/",))
+            if downloaded:
+                try:
+                    upload = BufferedInputFile(downloaded.data, filename=downloaded.filename)
                     if edit_message_id:
-                        await message.bot.edit_message_media(
+                        sent = await message.bot.edit_message_media(
                             chat_id=message.chat.id,
                             message_id=edit_message_id,
-                            media=types.InputMediaVideo(media=video_file, caption=text, parse_mode="HTML"),
+                            media=types.InputMediaVideo(media=upload, caption=text, parse_mode="HTML"),
                             reply_markup=keyboard
                         )
+                        _remember_file_id(media["video"], "video", sent)
                         return edit_message_id
                     else:
                         sent = await message.answer_video(
-                            video=video_file,
+                            video=upload,
                             caption=text,
                             parse_mode="HTML",
                             reply_markup=keyboard
                         )
+                        _remember_file_id(media["video"], "video", sent)
                         return sent.message_id
-                else:
-                    logger.error(f"Не удалось скачать видео: {response.status_code}")
-            except Exception as download_error:
-                logger.error(f"Ошибка при скачивании видео: {download_error}")
+                except Exception as upload_error:
+                    logger.error(f"Ошибка при загрузке видео в Telegram: {upload_error}")
             
             # Если все fallback не сработали, отправляем только текст
             logger.info("Fallback к отправке только текста для видео")
@@ -980,12 +1291,13 @@ async def _send_news_with_media(message: Message, navigator: NewsNavigator, edit
     elif media.get("animation"):
         try:
             if edit_message_id:
-                await message.bot.edit_message_media(
+                sent = await message.bot.edit_message_media(
                     chat_id=message.chat.id,
                     message_id=edit_message_id,
                     media=types.InputMediaAnimation(media=media["animation"], caption=text, parse_mode="HTML"),
                     reply_markup=keyboard
                 )
+                _remember_file_id(media["animation"], "animation", sent)
                 return edit_message_id
             else:
                 sent = await message.answer_animation(
@@ -994,9 +1306,36 @@ async def _send_news_with_media(message: Message, navigator: NewsNavigator, edit
                     parse_mode="HTML",
                     reply_markup=keyboard
                 )
+                _remember_file_id(media["animation"], "animation", sent)
                 return sent.message_id
         except Exception as e:
             logger.error(f"Ошибка при отправке анимации: {e}")
+            # Fallback: скачиваем файл (через дисковый кэш медиа) и загружаем его в Telegram
+            downloaded = await media_cache.get(media["animation"], accept=("image/gif", "video/"))
+            if downloaded:
+                try:
+                    upload = BufferedInputFile(downloaded.data, filename=downloaded.filename)
+                    if edit_message_id:
+                        sent = await message.bot.edit_message_media(
+                            chat_id=message.chat.id,
+                            message_id=edit_message_id,
+                            media=types.InputMediaAnimation(media=upload, caption=text, parse_mode="HTML"),
+                            reply_markup=keyboard
+                        )
+                        _remember_file_id(media["animation"], "animation", sent)
+                        return edit_message_id
+                    else:
+                        sent = await message.answer_animation(
+                            animation=upload,
+                            caption=text,
+                            parse_mode="HTML",
+                            reply_markup=keyboard
+                        )
+                        _remember_file_id(media["animation"], "animation", sent)
+                        return sent.message_id
+                except Exception as upload_error:
+                    logger.error(f"Ошибка при загрузке анимации в Telegram: {upload_error}")
+            
             # Fallback к тексту
             logger.info("Fallback к отправке только текста для анимации")
             if edit_message_id:
@@ -1029,12 +1368,13 @@ async def _send_news_with_media(message: Message, navigator: NewsNavigator, edit
         try:
             logger.info(f"Отправляем фото: {media['photo']}")
             if edit_message_id:
-                await message.bot.edit_message_media(
+                sent = await message.bot.edit_message_media(
                     chat_id=message.chat.id,
                     message_id=edit_message_id,
                     media=types.InputMediaPhoto(media=media["photo"], caption=text, parse_mode="HTML"),
                     reply_markup=keyboard
                 )
+                _remember_file_id(media["photo"], "photo", sent)
                 return edit_message_id
             else:
                 sent = await message.answer_photo(
@@ -1043,78 +1383,35 @@ async def _send_news_with_media(message: Message, navigator: NewsNavigator, edit
                     parse_mode="HTML",
                     reply_markup=keyboard
                 )
+                _remember_file_id(media["photo"], "photo", sent)
                 return sent.message_id
         except Exception as e:
             logger.error(f"Ошибка при отправке фото: {e}")
-            # Fallback: скачиваем файл и отправляем как BufferedInputFile
-            try:
-                import requests
-                from aiogram.types import BufferedInputFile
-                
-                # Устанавливаем короткий таймаут
-                response = requests.get(media["photo"], timeout=5)
-                if response.status_code == 200:
-                    # Определяем расширение файла
-                    ext = "jpg"  # По умолчанию
-                    if ".png" in media["photo"].lower():
-                        ext = "png"
-                    elif ".webp" in media["photo"].lower():
-                        ext = "webp"
-                    elif ".gif" in media["photo"].lower():
-                        ext = "gif"
-                    
-                    photo_file = BufferedInputFile(response.content, filename=f"photo.{ext}")
-                    
+            # Fallback: скачиваем файл (через дисковый кэш медиа) и загружаем его в Telegram
+            downloaded = await media_cache.get(media["photo"], accept=("image/",))
+            if downloaded:
+                try:
+                    upload = BufferedInputFile(downloaded.data, filename=downloaded.filename)
                     if edit_message_id:
-                        await message.bot.edit_message_media(
+                        sent = await message.bot.edit_message_media(
                             chat_id=message.chat.id,
                             message_id=edit_message_id,
-                            media=types.InputMediaPhoto(media=photo_file, caption=text, parse_mode="HTML"),
+                            media=types.InputMediaPhoto(media=upload, caption=text, parse_mode="HTML"),
                             reply_markup=keyboard
                         )
+                        _remember_file_id(media["photo"], "photo", sent)
                         return edit_message_id
                     else:
                         sent = await message.answer_photo(
-                            photo=photo_file,
+                            photo=upload,
                             caption=text,
                             parse_mode="HTML",
                             reply_markup=keyboard
                         )
+                        _remember_file_id(media["photo"], "photo", sent)
                         return sent.message_id
-                else:
-                    logger.error(f"Не удалось скачать фото: {response.status_code}")
-            except Exception as download_error:
-                logger.error(f"Ошибка при скачивании фото: {download_error}")
-                
-                # Дополнительный fallback для Telegram медиа
-                if "cdn4.telesco.pe" in media["photo"]:
-                    try:
-                        # Пробуем с другим User-Agent
-                        headers = {
-                            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-                        }
-                        response = requests.get(media["photo"], headers=headers, timeout=10)
-                        if response.status_code == 200:
-                            photo_file = BufferedInputFile(response.content, filename="photo.jpg")
-                            
-                            if edit_message_id:
-                                await message.bot.edit_message_media(
-                                    chat_id=message.chat.id,
-                                    message_id=edit_message_id,
-                                    media=types.InputMediaPhoto(media=photo_file, caption=text, parse_mode="HTML"),
-                                    reply_markup=keyboard
-                                )
-                                return edit_message_id
-                            else:
-                                sent = await message.answer_photo(
-                                    photo=photo_file,
-                                    caption=text,
-                                    parse_mode="HTML",
-                                    reply_markup=keyboard
-                                )
-                                return sent.message_id
-                    except Exception as telegram_fallback_error:
-                        logger.error(f"Telegram fallback тоже не сработал: {telegram_fallback_error}")
+                except Exception as upload_error:
+                    logger.error(f"Ошибка при загрузке фото в Telegram: {upload_error}")
             
             # Если все fallback не сработали, отправляем только текст
             logger.info("Fallback к отправке только текста")
@@ -1159,9 +1456,9 @@ async def _send_news_with_media(message: Message, navigator: NewsNavigator, edit
         sent = await message.answer(text, parse_mode="HTML", reply_markup=keyboard)
         return sent.message_id
 
-async def _load_more_posts_if_needed(navigator: NewsNavigator, user_id: int) -> bool:
+async def _load_more_posts_if_needed(navigator: NewsNavigator, user_id: int, ahead: int = 0) -> bool:
     """Загружает больше новостей если нужно. Возвращает True если загружено."""
-    if not navigator.needs_more_posts():
+    if not navigator.needs_more_posts(ahead):
         return False
     
     try:
@@ -1173,19 +1470,15 @@ async def _load_more_posts_if_needed(navigator: NewsNavigator, user_id: int) ->
         source = current_post.get("source", "")
         
         if source == "habr.com":
-            # Загружаем больше новостей с Habr
-            from parsers.habr_parser import HabrParser
-            habr_parser = HabrParser()
-            current_count = len(navigator.posts)
-            new_posts = habr_parser.get_latest_news(limit=current_count + 10)
-            
-            if len(new_posts) > current_count:
-                # Добавляем только новые новости
-                existing_links = {p.get("link") for p in navigator.posts}
-                for post in new_posts:
-                    if post.get("link") not in existing_links:
-                        navigator.posts.append(post)
-                return True
+            # Загружаем следующую порцию Habr после последней статьи, которая уже есть у пользователя
+            last_link = next(
+                (p.get("link") for p in reversed(navigator.posts) if p.get("source") == "habr.com"), None
+            )
+            new_posts = await habr_parser.get_more_news(limit=10, after=last_link)
+            await _index_posts(new_posts, 'habr_search')
+
+            # Следующая версия снимка получит только новые новости
+            return navigator.extend(new_posts)
                 
         else:
             # Загружаем больше новостей с Telegram
@@ -1193,13 +1486,8 @@ async def _load_more_posts_if_needed(navigator: NewsNavigator, user_id: int) ->
             new_posts = await _collect_posts(days=days)
             
             if new_posts:
-                # Добавляем только новые новости
-                existing_links = {p.get("link") for p in navigator.posts}
-                for post in new_posts:
-                    if post.get("link") not in existing_links:
-                        post['source'] = 'telegram'
-                        navigator.posts.append(post)
-                return True
+                # Следующая версия снимка получит только новые новости; True - только если они нашлись
+                return navigator.extend([post.replace(source='telegram') for post in new_posts])
         
         return False
         
@@ -1209,100 +1497,77 @@ async def _load_more_posts_if_needed(navigator: NewsNavigator, user_id: int) ->
 
 # ===== News Navigation Callbacks =====
 
-@dp.callback_query(lambda c: c.data == "news_next")
-async def news_next_callback(call: CallbackQuery) -> None:
-    await call.answer()
+async def _navigate(call: CallbackQuery, delta: int) -> None:
+    """
+    Листание ленты с объединением нажатий. Нажатия одного пользователя обрабатываются по очереди:
+    пока идет обработка (короткое ожидание и редактирование сообщения), новые нажатия только складываются
+    в _PENDING_MOVES, а затем вся накопленная сумма (например, +3) применяется одним перемещением
+    и одним редактированием сообщения
+    """
     user_id = call.from_user.id
     
-    # Защита от спама - проверяем cooldown
-    current_time = time.time()
-    if user_id in NAVIGATION_COOLDOWN:
-        if current_time - NAVIGATION_COOLDOWN[user_id] < 1.0:  # 1 секунда между нажатиями
-            await call.answer("⏳ Подождите немного перед следующим нажатием", show_alert=False)
-            return
-    
-    NAVIGATION_COOLDOWN[user_id] = current_time
+    if user_id in _PENDING_MOVES:
+        # Нажатие учтет обработка, которая уже идет
+        _PENDING_MOVES[user_id] += delta
+        return
     
     if user_id not in NEWS_NAVIGATION:
         await call.message.answer("❌ Сессия навигации не найдена. Начните заново.")
         return
     
-    navigator = NEWS_NAVIGATION[user_id]
-    
-    # Проверяем, нужно ли загрузить больше новостей
-    await _load_more_posts_if_needed(navigator, user_id)
-    
-    if navigator.next_post():
-        # Обновляем сообщение
-        try:
-            message_id = await _send_news_with_media(call.message, navigator, call.message.message_id)
+    _PENDING_MOVES[user_id] = delta
+    message_id = call.message.message_id
+    try:
+        # Даем дойти остальным быстрым нажатиям
+        await asyncio.sleep(NAVIGATION_COALESCE_DELAY)
+        while _PENDING_MOVES[user_id]:
+            move, _PENDING_MOVES[user_id] = _PENDING_MOVES[user_id], 0
+            # Берем навигатор заново: пока шло редактирование, сессию могли выгрузить и восстановить
+            navigator = NEWS_NAVIGATION.get(user_id)
+            if navigator is None:
+                break
+            if move > 0:
+                # Подгружаем новости, если итоговая позиция близко к концу ленты
+                await _load_more_posts_if_needed(navigator, user_id, ahead=move - 1)
+            if not navigator.move(move):
+                continue
+            # Обновляем сообщение
+            try:
+                message_id = await _send_news_with_media(call.message, navigator, message_id)
+            except Exception as e:
+                logger.error(f"Ошибка при обновлении сообщения: {e}")
+                # Если не удалось отредактировать, отправляем новое и удаляем старое
+                old_message_id = message_id
+                message_id = await _send_news_with_media(call.message, navigator)
+                try:
+                    await bot.delete_message(call.message.chat.id, old_message_id)
+                except Exception as delete_error:
+                    logger.error(f"Не удалось удалить старое сообщение: {delete_error}")
             navigator.message_id = message_id
             NEWS_NAVIGATION[user_id] = navigator
-        except Exception as e:
-            logger.error(f"Ошибка при обновлении сообщения: {e}")
-            # Если не удалось отредактировать, отправляем новое и удаляем старое
-            try:
-                new_message = await _send_news_with_media(call.message, navigator)
-                navigator.message_id = new_message
-                NEWS_NAVIGATION[user_id] = navigator
-                # Удаляем старое сообщение
-                await call.message.delete()
-            except Exception as delete_error:
-                logger.error(f"Не удалось удалить старое сообщение: {delete_error}")
-    else:
-        await call.answer("Это последняя новость")
+    except Exception as e:
+        logger.error(f"Ошибка при навигации по новостям: {e}")
+    finally:
+        del _PENDING_MOVES[user_id]
+
+@dp.callback_query(lambda c: c.data == "news_next", flags={"throttle": "navigation"})
+async def news_next_callback(call: CallbackQuery) -> None:
+    await call.answer()
+    await _navigate(call, 1)
 
-@dp.callback_query(lambda c: c.data == "news_prev")
+@dp.callback_query(lambda c: c.data == "news_prev", flags={"throttle": "navigation"})
 async def news_prev_callback(call: CallbackQuery) -> None:
     await call.answer()
-    user_id = call.from_user.id
-    
-    # Защита от спама - проверяем cooldown
-    current_time = time.time()
-    if user_id in NAVIGATION_COOLDOWN:
-        if current_time - NAVIGATION_COOLDOWN[user_id] < 1.0:  # 1 секунда между нажатиями
-            await call.answer("⏳ Подождите немного перед следующим нажатием", show_alert=False)
-            return
-    
-    NAVIGATION_COOLDOWN[user_id] = current_time
-    
-    if user_id not in NEWS_NAVIGATION:
-        await call.message.answer("❌ Сессия навигации не найдена. Начните заново.")
-        return
-    
-    navigator = NEWS_NAVIGATION[user_id]
-    if navigator.prev_post():
-        # Обновляем сообщение
-        try:
-            message_id = await _send_news_with_media(call.message, navigator, call.message.message_id)
-            navigator.message_id = message_id
-            NEWS_NAVIGATION[user_id] = navigator
-        except Exception as e:
-            logger.error(f"Ошибка при обновлении сообщения: {e}")
-            # Если не удалось отредактировать, отправляем новое
-            message_id = await _send_news_with_media(call.message, navigator)
-            navigator.message_id = message_id
-            NEWS_NAVIGATION[user_id] = navigator
-    else:
-        await call.answer("Это первая новость")
+    await _navigate(call, -1)
 
 # Новые обработчики для встроенного просмотра
-@dp.callback_query(lambda c: c.data == "view_tldr")
+@dp.callback_query(lambda c: c.data == "view_tldr", flags={"throttle": "article"})
 async def view_tldr_callback(call: CallbackQuery) -> None:
     await call.answer()
     user_id = call.from_user.id
     
     logger.info(f"DEBUG: view_tldr_callback вызван для пользователя {user_id}")
     
-    # Защита от спама - проверяем cooldown
-    current_time = time.time()
-    if user_id in NAVIGATION_COOLDOWN:
-        if current_time - NAVIGATION_COOLDOWN[user_id] < 0.5:  # 0.5 секунды между нажатиями
-            await call.answer("⏳ Подождите немного", show_alert=False)
-            return
-    
-    NAVIGATION_COOLDOWN[user_id] = current_time
-    
     if user_id not in NEWS_NAVIGATION:
         logger.error(f"DEBUG: Навигация не найдена для пользователя {user_id}")
         return
@@ -1315,13 +1580,12 @@ async def view_tldr_callback(call: CallbackQuery) -> None:
     
     logger.info(f"DEBUG: Текущий пост: {post.get('title', 'Без заголовка')[:50]}...")
     
-    # ВСЕГДА загружаем контент заново для текущего поста
+    # Контент берется из кэша статей, сеть нужна только при первом открытии статьи
     try:
         logger.info(f"DEBUG: Загружаем контент для поста: {post.get('title', 'Без заголовка')[:50]}...")
         logger.info(f"DEBUG: URL поста: {post.get('link', 'НЕТ')}")
         
-        parser_obj = _choose_article_parser(post.get("link", ""))
-        res = parser_obj.parse_full_article(post.get("link", ""))
+        res = await _fetch_article(post.get("link", ""))
         
         if res.get("success"):
             content = res.get("content", "")
@@ -1334,11 +1598,9 @@ async def view_tldr_callback(call: CallbackQuery) -> None:
             
             # Всегда используем полученный контент (даже если он не идеально релевантен)
             logger.info(f"DEBUG: Используем полученный контент")
-            # Сохраняем полный контент
+            # Сохраняем полный контент и готовое краткое содержание из кэша статей
             navigator.set_post_content("full", content)
-            # Создаем краткое содержание
-            summary = _summarize_text(content)
-            navigator.set_post_content("tldr", summary)
+            navigator.set_post_content("tldr", res.get("summary", ""))
         else:
             logger.error(f"DEBUG: Не удалось получить контент: {res.get('error', 'Неизвестная ошибка')}")
             # Используем заголовок как fallback
@@ -1362,22 +1624,13 @@ async def view_tldr_callback(call: CallbackQuery) -> None:
         logger.error(f"Ошибка при обновлении сообщения: {e}")
         await call.answer("❌ Ошибка при обновлении")
 
-@dp.callback_query(lambda c: c.data == "view_full")
+@dp.callback_query(lambda c: c.data == "view_full", flags={"throttle": "article"})
 async def view_full_callback(call: CallbackQuery) -> None:
     await call.answer()
     user_id = call.from_user.id
     
     logger.info(f"DEBUG: view_full_callback вызван для пользователя {user_id}")
     
-    # Защита от спама - проверяем cooldown
-    current_time = time.time()
-    if user_id in NAVIGATION_COOLDOWN:
-        if current_time - NAVIGATION_COOLDOWN[user_id] < 0.5:  # 0.5 секунды между нажатиями
-            await call.answer("⏳ Подождите немного", show_alert=False)
-            return
-    
-    NAVIGATION_COOLDOWN[user_id] = current_time
-    
     if user_id not in NEWS_NAVIGATION:
         logger.error(f"DEBUG: Навигация не найдена для пользователя {user_id}")
         return
@@ -1390,13 +1643,12 @@ async def view_full_callback(call: CallbackQuery) -> None:
     
     logger.info(f"DEBUG: Текущий пост: {post.get('title', 'Без заголовка')[:50]}...")
     
-    # ВСЕГДА загружаем контент заново для текущего поста
+    # Контент берется из кэша статей, сеть нужна только при первом открытии статьи
     try:
         logger.info(f"DEBUG: Загружаем контент для поста: {post.get('title', 'Без заголовка')[:50]}...")
         logger.info(f"DEBUG: URL поста: {post.get('link', 'НЕТ')}")
         
-        parser_obj = _choose_article_parser(post.get("link", ""))
-        res = parser_obj.parse_full_article(post.get("link", ""))
+        res = await _fetch_article(post.get("link", ""))
         
         if res.get("success"):
             content = res.get("content", "")
@@ -1408,11 +1660,9 @@ async def view_full_callback(call: CallbackQuery) -> None:
             
             # Всегда используем полученный контент (даже если он не идеально релевантен)
             logger.info(f"DEBUG: Используем полученный контент")
-            # Сохраняем полный контент
+            # Сохраняем полный контент и готовое краткое содержание из кэша статей
             navigator.set_post_content("full", content)
-            # Создаем краткое содержание для кнопки "Кратко"
-            summary = _summarize_text(content)
-            navigator.set_post_content("tldr", summary)
+            navigator.set_post_content("tldr", res.get("summary", ""))
         else:
             logger.error(f"DEBUG: Не удалось получить контент: {res.get('error', 'Неизвестная ошибка')}")
             # Используем заголовок как fallback
@@ -1436,20 +1686,11 @@ async def view_full_callback(call: CallbackQuery) -> None:
         logger.error(f"Ошибка при обновлении сообщения: {e}")
         await call.answer("❌ Ошибка при обновлении")
 
-@dp.callback_query(lambda c: c.data == "view_normal")
+@dp.callback_query(lambda c: c.data == "view_normal", flags={"throttle": "navigation"})
 async def view_normal_callback(call: CallbackQuery) -> None:
     await call.answer()
     user_id = call.from_user.id
     
-    # Защита от спама - проверяем cooldown
-    current_time = time.time()
-    if user_id in NAVIGATION_COOLDOWN:
-        if current_time - NAVIGATION_COOLDOWN[user_id] < 0.5:  # 0.5 секунды между нажатиями
-            await call.answer("⏳ Подождите немного", show_alert=False)
-            return
-    
-    NAVIGATION_COOLDOWN[user_id] = current_time
-    
     if user_id not in NEWS_NAVIGATION:
         return
     
@@ -1471,7 +1712,7 @@ async def news_exit_callback(call: CallbackQuery) -> None:
     
     # Удаляем сессию навигации
     if user_id in NEWS_NAVIGATION:
-        del NEWS_NAVIGATION[user_id]
+        NEWS_NAVIGATION.pop(user_id).cancel_prefetch()
     
     # Создаем inline-клавиатуру для главного меню
     from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
@@ -1555,12 +1796,12 @@ async def go_main_menu(call: CallbackQuery) -> None:
 
 # ===== Main menu callbacks =====
 
-@dp.callback_query(lambda c: c.data == "latest_news")
+@dp.callback_query(lambda c: c.data == "latest_news", flags={"throttle": "feed"})
 async def latest_news_callback(call: CallbackQuery) -> None:
     await call.answer()
     await latest_news(call.message)
 
-@dp.callback_query(lambda c: c.data == "top_news")
+@dp.callback_query(lambda c: c.data == "top_news", flags={"throttle": "feed"})
 async def top_news_callback(call: CallbackQuery) -> None:
     await call.answer()
     await top_command(call.message)
@@ -1587,7 +1828,7 @@ async def settings_callback(call: CallbackQuery) -> None:
 
 # ===== Habr "Еще новости" callback =====
 
-@dp.callback_query(lambda c: c.data.startswith("more_habr_news"))
+@dp.callback_query(lambda c: c.data.startswith("more_habr_news"), flags={"throttle": "feed"})
 async def more_habr_news_callback(call: CallbackQuery) -> None:
     await call.answer()
     try:
@@ -1596,23 +1837,23 @@ async def more_habr_news_callback(call: CallbackQuery) -> None:
         
         await call.message.edit_text("🔄 Загружаю дополнительные IT новости с Habr...")
         
-        from parsers.habr_parser import HabrParser
-        habr_parser = HabrParser()
-        posts = habr_parser.get_more_news(offset=offset, limit=15)
+        posts = await habr_parser.get_more_news(offset=offset, limit=15)
+        await _index_posts(posts, 'habr_search')
         
         if not posts:
             await call.message.edit_text("❌ Больше новостей не найдено")
             return
         
         # Создаем новый навигатор для дополнительных новостей
-        navigator = NewsNavigator(posts, 0) # Start from index 0
-        NEWS_NAVIGATION[call.from_user.id] = navigator
+        navigator = NewsNavigator(FEED_SNAPSHOTS.publish('latest', f"habr:{offset}", posts), 0) # Start from index 0
+        _set_navigator(call.from_user.id, navigator)
         
         # Отправляем первую новость из новой порции
         text = navigator.get_navigation_text()
         keyboard = navigator.get_navigation_keyboard()
         
         sent_message = await call.message.answer(text, parse_mode="HTML", reply_markup=keyboard)
+        navigator.schedule_prefetch(_prefetch_post)
         
         # Сохраняем ID сообщения для редактирования
         navigator.message_id = sent_message.message_id
@@ -1640,13 +1881,33 @@ async def handle_all_messages(message: Message) -> None:
     await message.answer("Используйте /start или меню ниже", reply_markup=get_main_keyboard())
 
 async def main() -> None:
+    logging.basicConfig(level=logging.INFO)
     init_db()
     logger.info("База данных инициализирована")
+    NEWS_NAVIGATION.prune()
     scheduler = NewsScheduler()
     scheduler.bot = bot
+    scheduler.parser = parser
     await scheduler.setup_all_schedules()
     logger.info("Планировщик новостей запущен")
-    await dp.start_polling(bot)
+    ingestor = NewsIngestor(
+        parser,
+        habr_parser,
+        TELEGRAM_CHANNELS,
+        telegram_interval=INGEST_TELEGRAM_INTERVAL,
+        habr_interval=INGEST_HABR_INTERVAL,
+        search_interval=SEARCH_REFRESH_INTERVAL,
+        search_top=SEARCH_REFRESH_TOP,
+    )
+    ingestor.start()
+    try:
+        await dp.start_polling(bot)
+    finally:
+        await ingestor.stop()
+        # Активные сессии навигации переживают перезапуск
+        NEWS_NAVIGATION.flush()
+        await close_http_client()
+        parse_service.shutdown()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
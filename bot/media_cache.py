@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Загрузка медиа постов с дисковым кэшем
+Нужна, когда Telegram не смог сам забрать картинку/видео по URL и файл приходится загружать ботом.
+Файлы скачиваются потоково через общий HTTP-клиент с ограничением размера, тип определяется
+по сигнатуре содержимого, а каталог кэша ограничен суммарным объемом (LRU).
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from parsers.http_client import HttpClient, HttpStatusError
+from parsers.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# (сигнатура, смещение, MIME-тип, расширение)
+_SIGNATURES = [
+    (b'\xff\xd8\xff', 0, 'image/jpeg', 'jpg'),
+    (b'\x89PNG\r\n\x1a\n', 0, 'image/png', 'png'),
+    (b'GIF87a', 0, 'image/gif', 'gif'),
+    (b'GIF89a', 0, 'image/gif', 'gif'),
+    (b'WEBP', 8, 'image/webp', 'webp'),
+    (b'ftyp', 4, 'video/mp4', 'mp4'),
+    (b'\x1a\x45\xdf\xa3', 0, 'video/webm', 'webm'),
+]
+_TYPES_BY_EXT = {ext: content_type for _, _, content_type, ext in _SIGNATURES}
+# Недокачанный .part старше этого срока остался от упавшего процесса; более свежий может записываться прямо сейчас
+_STALE_PART_SECONDS = 3600
+
+
+def sniff_content_type(head: bytes) -> Optional[Tuple[str, str]]:
+    """Определяет (MIME-тип, расширение) по первым байтам файла. None для неизвестных форматов"""
+    for signature, offset, content_type, ext in _SIGNATURES:
+        if head[offset:offset + len(signature)] == signature:
+            return content_type, ext
+    return None
+
+
+class MediaTooLargeError(Exception):
+    """Файл больше допустимого размера"""
+
+
+class MediaFile:
+    def __init__(self, data: bytes, content_type: str, ext: str):
+        self.data = data
+        self.content_type = content_type
+        self.ext = ext
+
+    @property
+    def filename(self) -> str:
+        return f"{self.content_type.split('/')[0]}.{self.ext}"
+
+
+class MediaCache:
+    def __init__(self, http_client: HttpClient, cache_dir: str = "media_cache",
+                 max_bytes: int = 200 * 1024 * 1024, max_file_bytes: int = 20 * 1024 * 1024,
+                 timeout: float = 15):
+        self.http = http_client
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_file_bytes = max_file_bytes
+        self.timeout = timeout
+        self._files: "OrderedDict[str, Tuple[str, int]]" = OrderedDict()  # key -> (имя файла, размер)
+        self.total_bytes = 0
+        self._flight = SingleFlight()
+        self._load_index()
+
+    def _load_index(self):
+        """Восстанавливает индекс по содержимому каталога, от давно использованных к недавним"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            key, _, ext = name.partition('.')
+            path = os.path.join(self.cache_dir, name)
+            stat = os.stat(path)
+            if ext.endswith('.part'):
+                # Каталог может делить другой процесс с тем же кэшем: удаляем только заброшенные загрузки
+                if time.time() - stat.st_mtime > _STALE_PART_SECONDS:
+                    os.remove(path)
+                continue
+            if ext not in _TYPES_BY_EXT:
+                os.remove(path)  # посторонние файлы
+                continue
+            entries.append((stat.st_mtime, key, name, stat.st_size))
+        for _, key, name, size in sorted(entries):
+            self._files[key] = (name, size)
+            self.total_bytes += size
+        self._evict()
+
+    async def get(self, url: str, accept: Tuple[str, ...] = ('image/', 'video/')) -> Optional[MediaFile]:
+        """
+        Возвращает файл по URL из кэша или скачивает его.
+        None, если файл не скачался, слишком большой или его тип не начинается ни с одного из accept.
+        """
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        try:
+            media = await self._flight.do(key, lambda: self._load(key, url))
+        except Exception as e:
+            logger.error(f"Не удалось получить медиа {url}: {e}")
+            return None
+        if media is None or not media.content_type.startswith(accept):
+            return None
+        return media
+
+    async def _load(self, key: str, url: str) -> Optional[MediaFile]:
+        cached = self._files.get(key)
+        if cached is not None:
+            name, _ = cached
+            self._files.move_to_end(key)
+            try:
+                data = await asyncio.to_thread(self._read, name)
+            except OSError:
+                self._drop(key)
+            else:
+                ext = name.partition('.')[2]
+                return MediaFile(data, _TYPES_BY_EXT[ext], ext)
+
+        data = await self._download(url)
+        detected = sniff_content_type(data[:16])
+        if detected is None:
+            logger.warning(f"Неизвестный формат медиа {url}")
+            return None
+        content_type, ext = detected
+        await asyncio.to_thread(self._write, f"{key}.{ext}", data)
+        self._files[key] = (f"{key}.{ext}", len(data))
+        self.total_bytes += len(data)
+        self._evict()
+        return MediaFile(data, content_type, ext)
+
+    async def _download(self, url: str) -> bytes:
+        async with self.http.stream(url, timeout=self.timeout) as response:
+            if response.status != 200:
+                raise HttpStatusError(response.status, url)
+            if (response.content_length or 0) > self.max_file_bytes:
+                raise MediaTooLargeError(f"{response.content_length} байт")
+            data = bytearray()
+            async for chunk in response.content.iter_chunked(64 * 1024):
+                data.extend(chunk)
+                if len(data) > self.max_file_bytes:
+                    raise MediaTooLargeError(f"больше {self.max_file_bytes} байт")
+            return bytes(data)
+
+    def _read(self, name: str) -> bytes:
+        path = os.path.join(self.cache_dir, name)
+        with open(path, 'rb') as f:
+            data = f.read()
+        os.utime(path)  # mtime - время последнего использования для LRU после перезапуска
+        return data
+
+    def _write(self, name: str, data: bytes):
+        path = os.path.join(self.cache_dir, name)
+        with open(path + '.part', 'wb') as f:
+            f.write(data)
+        os.replace(path + '.part', path)
+
+    def _drop(self, key: str):
+        name, size = self._files.pop(key)
+        self.total_bytes -= size
+        try:
+            os.remove(os.path.join(self.cache_dir, name))
+        except OSError:
+            pass
+
+    def _evict(self):
+        while self._files and self.total_bytes > self.max_bytes:
+            self._drop(next(iter(self._files)))
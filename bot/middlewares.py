@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Middleware бота
+ThrottlingMiddleware ограничивает частоту действий пользователя: на каждого активного пользователя и вид действия
+заводится token bucket. Вид действия задается флагом обработчика, например
+@dp.callback_query(..., flags={"throttle": "navigation"}); обработчики без флага не ограничиваются.
+"""
+
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.flags import get_flag
+from aiogram.types import CallbackQuery, Message, TelegramObject
+
+from parsers.resilience import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+
+class _UserBucket(TokenBucket):
+    def __init__(self, rate: float, capacity: float):
+        super().__init__(rate, capacity)
+        self.warned = False  # пользователю уже сказали о лимите, повторно не отвечаем
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """
+    Лимиты: вид действия -> (токенов в секунду, допустимый всплеск).
+    Корзины каждого вида хранятся в порядке последнего обращения, и полностью восстановившиеся корзины
+    удаляются с начала при каждом событии - память занимают только недавно активные пользователи
+    """
+
+    def __init__(self, limits: Dict[str, Tuple[float, float]]):
+        self.limits = dict(limits)
+        self._buckets: Dict[str, "OrderedDict[int, _UserBucket]"] = {name: OrderedDict() for name in self.limits}
+
+    async def __call__(self, handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+                       event: TelegramObject, data: Dict[str, Any]) -> Any:
+        name = get_flag(data, "throttle")
+        user = data.get("event_from_user")
+        if name is None or user is None:
+            return await handler(event, data)
+        if name not in self.limits:
+            logger.warning(f"Неизвестный вид действия для ограничения частоты: {name}")
+            return await handler(event, data)
+
+        bucket = self._touch(name, user.id)
+        if bucket.try_acquire():
+            bucket.warned = False
+            return await handler(event, data)
+
+        logger.debug(f"Пользователь {user.id} превысил лимит действий '{name}'")
+        await self._reject(event, bucket)
+        return None
+
+    def _touch(self, name: str, user_id: int) -> _UserBucket:
+        buckets = self._buckets[name]
+        bucket = buckets.pop(user_id, None)
+        if bucket is None:
+            bucket = _UserBucket(*self.limits[name])
+        buckets[user_id] = bucket
+        # С начала идут давно неактивные пользователи: их полные корзины больше не нужны
+        while len(buckets) > 1:
+            oldest_id, oldest = next(iter(buckets.items()))
+            if oldest is bucket or not oldest.is_idle():
+                break
+            del buckets[oldest_id]
+        return bucket
+
+    def active_users(self) -> int:
+        return sum(len(buckets) for buckets in self._buckets.values())
+
+    @staticmethod
+    async def _reject(event: TelegramObject, bucket: _UserBucket):
+        # На нажатие кнопки нужно ответить в любом случае, иначе у пользователя зависнет индикатор загрузки
+        if isinstance(event, CallbackQuery):
+            await event.answer("⏳ Подождите немного", show_alert=False)
+        elif isinstance(event, Message) and not bucket.warned:
+            bucket.warned = True
+            retry_in = max(1, round((1 - bucket.tokens) / bucket.rate))
+            await event.answer(f"⏳ Слишком много запросов. Попробуйте через {retry_in} с")
@@ -4,6 +4,7 @@
 Упрощенная версия
 """
 
+import asyncio
 import logging
 from datetime import datetime, timedelta
 from typing import Optional
@@ -12,9 +13,11 @@ from apscheduler.triggers.cron import CronTrigger
 
 from database.db import (
     get_digest_schedule, set_digest_schedule, get_user_channels,
-    get_user_news_count, get_active_users
+    get_user_news_count, get_active_users, get_latest_posts
 )
 from parsers.telegram_parser import TelegramParser
+from .ingestion import channel_name_from_url
+from .dedup import collapse_duplicates
 
 logger = logging.getLogger(__name__)
 
@@ -79,15 +82,22 @@ class NewsScheduler:
                 logger.warning(f"Нет каналов для дайджеста у пользователя {user_id}")
                 return
             
-            # Парсим новости с каналов
-            all_posts = []
-            for channel_url in channels[:5]:  # Берем первые 5 каналов
-                try:
-                    posts = self.parser.parse_channel(channel_url, news_count)
+            # Берем новости каналов из локальной базы, при пустой базе - парсим каналы
+            channels = channels[:5]  # Берем первые 5 каналов
+            # Берем с запасом: часть постов схлопнется как одна история из разных каналов
+            all_posts = get_latest_posts(
+                'telegram', news_count * 3, sources=[channel_name_from_url(channel_url) for channel_url in channels]
+            )
+            if not all_posts:
+                results = await asyncio.gather(
+                    *(self.parser.parse_channel(channel_url, news_count) for channel_url in channels),
+                    return_exceptions=True,
+                )
+                for channel_url, posts in zip(channels, results):
+                    if isinstance(posts, Exception):
+                        logger.error(f"Ошибка при парсинге канала {channel_url}: {posts}")
+                        continue
                     all_posts.extend(posts)
-                except Exception as e:
-                    logger.error(f"Ошибка при парсинге канала {channel_url}: {e}")
-                    continue
             
             if not all_posts:
                 logger.warning(f"Нет новостей для дайджеста у пользователя {user_id}")
@@ -95,7 +105,7 @@ class NewsScheduler:
             
             # Сортируем по дате
             all_posts.sort(key=lambda x: x.get('date', ''), reverse=True)
-            posts_to_send = all_posts[:news_count]
+            posts_to_send = collapse_duplicates(all_posts)[:news_count]
             
             # Формируем сообщение дайджеста
             message = "📰 <b>Ваш ежедневный дайджест:</b>\n\n"
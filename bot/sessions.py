@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Хранилище сессий навигации по новостям
+В памяти держатся недавно активные сессии в пределах бюджета памяти (LRU) и не дольше idle_ttl без действий.
+Вытесненные сессии сохраняются в таблицу nav_sessions в компактном виде (без текстов статей),
+поэтому пользователь продолжает листать ленту и после вытеснения, и после перезапуска бота.
+"""
+
+import json
+import logging
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Generic, Hashable, Optional, TypeVar
+
+from database.db import delete_nav_session, delete_old_nav_sessions, load_nav_session, save_nav_session
+from parsers.cache import estimate_size
+
+logger = logging.getLogger(__name__)
+
+S = TypeVar('S')
+
+
+class SessionStore(Generic[S]):
+    """
+    Словарь user_id -> сессия с вытеснением.
+    dump превращает сессию в компактный JSON-совместимый словарь, load восстанавливает ее,
+    on_evict вызывается для сессии, которая уходит из памяти (например, чтобы отменить фоновые задачи).
+    """
+
+    def __init__(self, dump: Callable[[S], Dict[str, Any]], load: Callable[[Dict[str, Any]], S],
+                 idle_ttl: float = 1800, max_bytes: int = 64 * 1024 * 1024, keep_days: int = 7,
+                 on_evict: Optional[Callable[[S], None]] = None, sizeof: Callable[[Any], int] = None):
+        self.dump = dump
+        self.load = load
+        self.idle_ttl = idle_ttl
+        self.max_bytes = max_bytes
+        self.keep_days = keep_days
+        self.on_evict = on_evict
+        self.sizeof = sizeof or (lambda session: estimate_size(vars(session)))
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()  # user_id -> (last_used, size, session)
+        self.total_bytes = 0
+
+    def __contains__(self, user_id: Hashable) -> bool:
+        return self.get(user_id) is not None
+
+    def __getitem__(self, user_id: Hashable) -> S:
+        session = self.get(user_id)
+        if session is None:
+            raise KeyError(user_id)
+        return session
+
+    def __setitem__(self, user_id: Hashable, session: S):
+        """Сохраняет сессию и пересчитывает ее размер (сессия могла вырасти с прошлого раза)"""
+        if user_id in self._data:
+            self._remove(user_id)
+        size = self.sizeof(session)
+        self._data[user_id] = (time.monotonic(), size, session)
+        self.total_bytes += size
+        self._evict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, user_id: Hashable, default: Optional[S] = None) -> Optional[S]:
+        """Сессия из памяти, а если ее там нет - из базы (с возвратом в память)"""
+        self._evict()
+        item = self._data.get(user_id)
+        if item is not None:
+            _, size, session = item
+            self._data[user_id] = (time.monotonic(), size, session)
+            self._data.move_to_end(user_id)
+            return session
+
+        blob = load_nav_session(user_id)
+        if blob is None:
+            return default
+        try:
+            session = self.load(json.loads(zlib.decompress(blob)))
+        except Exception as e:
+            logger.error(f"Не удалось восстановить сессию навигации {user_id}: {e}")
+            delete_nav_session(user_id)
+            return default
+        self[user_id] = session
+        return session
+
+    def pop(self, user_id: Hashable, default: Optional[S] = None) -> Optional[S]:
+        """Удаляет сессию из памяти и из базы"""
+        session = self.get(user_id)
+        if user_id in self._data:
+            self._remove(user_id)
+        delete_nav_session(user_id)
+        return session if session is not None else default
+
+    def prune(self) -> int:
+        """Удаляет из базы сессии старше keep_days: сообщения с их кнопками давно неактуальны"""
+        return delete_old_nav_sessions(self.keep_days)
+
+    def flush(self):
+        """Сохраняет все сессии из памяти в базу (при остановке бота)"""
+        while self._data:
+            self._spill(next(iter(self._data)))
+
+    def _remove(self, user_id: Hashable) -> S:
+        _, size, session = self._data.pop(user_id)
+        self.total_bytes -= size
+        return session
+
+    def _spill(self, user_id: Hashable):
+        session = self._remove(user_id)
+        if self.on_evict is not None:
+            self.on_evict(session)
+        try:
+            data = json.dumps(self.dump(session), ensure_ascii=False, separators=(',', ':'))
+            save_nav_session(user_id, zlib.compress(data.encode('utf-8')))
+        except Exception as e:
+            logger.error(f"Не удалось сохранить сессию навигации {user_id}: {e}")
+
+    def _evict(self):
+        """Сбрасывает в базу простаивающие сессии и самые давние сверх бюджета памяти"""
+        idle_before = time.monotonic() - self.idle_ttl
+        while self._data:
+            user_id, (last_used, _, _) = next(iter(self._data.items()))
+            if last_used >= idle_before and self.total_bytes <= self.max_bytes:
+                break
+            self._spill(user_id)
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Общие неизменяемые снимки лент (топ, последние, поиск)
+Снимок - версия ленты: кортеж неизменяемых постов (Post). Все пользователи, открывшие одну и ту же ленту,
+получают один и тот же объект снимка, а сессия навигации хранит только ссылку на него и свой курсор.
+Подгрузка "еще новостей" не меняет снимок, а выпускает следующую версию, которая переиспользует посты предыдущей.
+Снимок, восстановленный из сохраненной сессии, - частный: он не попадает в реестр и не виден другим пользователям.
+"""
+
+import itertools
+import logging
+import weakref
+from typing import Any, Iterable, Mapping, Optional, Tuple
+
+from parsers.cache import TTLCache
+from parsers.post import Post
+
+logger = logging.getLogger(__name__)
+
+
+class FeedSnapshot:
+    """Версия ленты kind/key. Сравнивается по идентичности: одинаковые ленты - один объект"""
+
+    __slots__ = ('kind', 'key', 'version', 'posts', '_links', '__weakref__')
+
+    def __init__(self, kind: str, key: str, version: int, posts: Tuple[Post, ...]):
+        self.kind = kind
+        self.key = key
+        self.version = version
+        self.posts = posts
+        self._links = tuple(post.get('link') for post in posts)
+
+    def __len__(self) -> int:
+        return len(self.posts)
+
+    def __getitem__(self, index: int) -> Post:
+        return self.posts[index]
+
+    def __iter__(self):
+        return iter(self.posts)
+
+    def __repr__(self) -> str:
+        version = f"v{self.version}" if self.version else "частный"
+        return f"FeedSnapshot({self.kind}:{self.key} {version}, {len(self.posts)} постов)"
+
+    @property
+    def private(self) -> bool:
+        """Снимок не из реестра (версия 0): принадлежит одной сессии"""
+        return self.version == 0
+
+    def starts_with(self, posts: Tuple[Post, ...]) -> bool:
+        """Начинается ли снимок с тех же постов (в том же порядке и с тем же содержимым)"""
+        if self._links[:len(posts)] != tuple(post.get('link') for post in posts):
+            return False
+        return all(old is new or old == new for old, new in zip(self.posts, posts))
+
+    def links(self) -> Tuple[Optional[str], ...]:
+        return self._links
+
+
+class SnapshotRegistry:
+    """
+    Реестр снимков: для каждой ленты (kind, key) хранится последняя версия (ttl после последнего обращения),
+    а более старые версии живут, пока на них ссылается хотя бы одна сессия навигации
+    """
+
+    def __init__(self, ttl: float = 3600, max_feeds: int = 2000):
+        self._latest = TTLCache(ttl=ttl, max_entries=max_feeds)  # (kind, key) -> FeedSnapshot
+        self._versions: "weakref.WeakValueDictionary[tuple, FeedSnapshot]" = weakref.WeakValueDictionary()
+        # Номера версий сквозные на весь процесс: версия однозначно задает снимок даже после вытеснения ленты
+        self._version_counter = itertools.count(1)
+
+    def latest(self, kind: str, key: str) -> Optional[FeedSnapshot]:
+        return self._latest.get((kind, key))
+
+    def find(self, kind: str, key: str, version: int) -> Optional[FeedSnapshot]:
+        """Снимок конкретной версии, если он еще в памяти"""
+        return self._versions.get((kind, key, version))
+
+    def publish(self, kind: str, key: str, posts: Iterable[Mapping[str, Any]]) -> FeedSnapshot:
+        """
+        Снимок ленты с постами posts. Если последняя версия уже начинается с тех же постов с тем же содержимым
+        (например, ее продлил другой пользователь), возвращается она, новая версия не создается.
+        Посты сравниваются по всем полям, а не только по ссылкам: обновленные просмотры или заголовок дают новую версию
+        """
+        posts = tuple(Post.from_mapping(post) for post in posts)
+        current = self.latest(kind, key)
+        if current is not None and current.starts_with(posts):
+            return current
+        return self._store(kind, key, posts)
+
+    def private(self, kind: str, key: str, posts: Iterable[Mapping[str, Any]]) -> FeedSnapshot:
+        """
+        Частный снимок, который не регистрируется как последняя версия ленты.
+        Нужен для постов из сохраненной сессии: в них только поля для показа, и делиться ими нельзя
+        """
+        return FeedSnapshot(kind, key, 0, tuple(Post.from_mapping(post) for post in posts))
+
+    def extend(self, snapshot: FeedSnapshot, more: Iterable[Mapping[str, Any]]) -> FeedSnapshot:
+        """
+        Следующая версия снимка с постами more в конце (без повторов по ссылке).
+        Если ленту уже продлили от этой же версии, новые посты добавляются к последней версии.
+        Частный снимок продлевается частным, если общей версии с теми же постами нет
+        """
+        base = snapshot
+        current = self.latest(snapshot.kind, snapshot.key)
+        if current is not None and current is not snapshot and current.starts_with(snapshot.posts):
+            base = current
+        seen = set(base.links())
+        added = []
+        for post in more:
+            link = post.get('link')
+            if link in seen:
+                continue
+            seen.add(link)
+            added.append(Post.from_mapping(post))
+        if not added:
+            return base
+        if base.private:
+            return FeedSnapshot(base.kind, base.key, 0, base.posts + tuple(added))
+        return self._store(base.kind, base.key, base.posts + tuple(added))
+
+    def _store(self, kind: str, key: str, posts: Tuple[Post, ...]) -> FeedSnapshot:
+        version = next(self._version_counter)
+        snapshot = FeedSnapshot(kind, key, version, posts)
+        self._latest.set((kind, key), snapshot)
+        self._versions[(kind, key, version)] = snapshot
+        logger.debug(f"Новый снимок ленты: {snapshot!r}")
+        return snapshot
@@ -5,6 +5,7 @@ import logging
 from typing import List, Tuple, Dict, Any, Optional
 from datetime import datetime, timedelta
 import hashlib
+import re
 
 # Настройка логирования для этого модуля
 logger = logging.getLogger(__name__)
@@ -142,6 +143,7 @@ def init_db():
             FOREIGN KEY (user_id) REFERENCES users (user_id)
         )
     """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_search_history_searched_at ON search_history (searched_at)")
 
     # Комментарии к постам
     cursor.execute("""
@@ -255,11 +257,118 @@ def init_db():
         )
     """)
 
+    # Локальное хранилище постов, которое наполняет фоновый сборщик (bot/ingestion.py)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS posts (
+            link TEXT PRIMARY KEY,
+            kind TEXT,            -- 'telegram', 'habr' или 'habr_search' (найдено поиском на сайте)
+            source TEXT,          -- имя канала или домен
+            title TEXT,
+            text TEXT,
+            summary TEXT,
+            date TEXT,            -- дата в исходном формате парсера
+            published_at TEXT,    -- нормализованная дата (ISO) для сортировки
+            views INTEGER DEFAULT 0,
+            channel_url TEXT,
+            image_url TEXT,
+            video_url TEXT,
+            animation_url TEXT,
+            fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_posts_kind_published ON posts (kind, published_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_posts_source_date ON posts (source, date)")
+    _create_posts_fts(cursor)
+
+    # Кэш загруженных статей для режимов "Кратко" / "Полная" (bot/article_cache.py)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS article_cache (
+            url TEXT PRIMARY KEY,  -- канонический URL
+            title TEXT,
+            content TEXT,
+            summary TEXT,
+            cached_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            accessed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_article_cache_accessed ON article_cache (accessed_at)")
+
+    # file_id медиа, уже загруженных в Telegram: повторная отправка без скачивания и загрузки
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS media_file_ids (
+            url TEXT NOT NULL,
+            media_type TEXT NOT NULL,  -- photo, video, animation
+            file_id TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (url, media_type)
+        )
+    """)
+
+    # Сессии навигации по новостям, вытесненные из памяти (bot/sessions.py)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS nav_sessions (
+            user_id INTEGER PRIMARY KEY,
+            data BLOB NOT NULL,  -- JSON, сжатый zlib
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
     conn.commit()
     conn.close()
     # Пробуем выполнить миграции (добавление недостающих колонок)
     migrate_db()
 
+def _fts_columns(row: str) -> str:
+    """Индексируемые колонки строки row (new / old / posts) для триггеров FTS5"""
+    return ', '.join(
+        f"replace(replace({row}.{column}, 'ё', 'е'), 'Ё', 'Е')" for column in ('title', 'text', 'summary')
+    )
+
+
+def _create_posts_fts(cursor):
+    """
+    Полнотекстовый индекс FTS5 по постам (внешнее содержимое: таблица posts).
+    unicode61 приводит к нижнему регистру и кириллицу, но считает "ё" отдельной буквой,
+    поэтому в индекс текст попадает с "ё" -> "е" (так же нормализуется запрос в _fts_query).
+    Индекс поддерживают триггеры, поэтому сборщику и парсерам достаточно писать в posts.
+    """
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'posts_fts'")
+    exists = cursor.fetchone() is not None
+    try:
+        cursor.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5(
+                title, text, summary,
+                content = 'posts', content_rowid = 'rowid',
+                tokenize = 'unicode61 remove_diacritics 2'
+            )
+        """)
+    except sqlite3.OperationalError as e:
+        # SQLite собран без FTS5: поиск будет идти только через сайт Habr
+        logger.warning(f"Полнотекстовый поиск недоступен: {e}")
+        return
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS posts_fts_insert AFTER INSERT ON posts BEGIN
+            INSERT INTO posts_fts (rowid, title, text, summary) VALUES (new.rowid, {new});
+        END
+    """.format(new=_fts_columns('new')))
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS posts_fts_delete AFTER DELETE ON posts BEGIN
+            INSERT INTO posts_fts (posts_fts, rowid, title, text, summary) VALUES ('delete', old.rowid, {old});
+        END
+    """.format(old=_fts_columns('old')))
+    # Сборщик обновляет посты каждые несколько минут: переиндексируем только изменившийся текст
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS posts_fts_update AFTER UPDATE OF title, text, summary ON posts
+        WHEN old.title IS NOT new.title OR old.text IS NOT new.text OR old.summary IS NOT new.summary
+        BEGIN
+            INSERT INTO posts_fts (posts_fts, rowid, title, text, summary) VALUES ('delete', old.rowid, {old});
+            INSERT INTO posts_fts (rowid, title, text, summary) VALUES (new.rowid, {new});
+        END
+    """.format(old=_fts_columns('old'), new=_fts_columns('new')))
+    if not exists:
+        # Индексируем посты, сохраненные до появления индекса
+        cursor.execute(f"INSERT INTO posts_fts (rowid, title, text, summary) SELECT rowid, {_fts_columns('posts')} FROM posts")
+
 def migrate_db():
     """Добавляет недостающие колонки в таблицы без разрушения данных."""
     conn = sqlite3.connect(DB_NAME)
@@ -848,6 +957,25 @@ def add_search_query(user_id: int, query: str):
     finally:
         conn.close()
 
+def get_popular_search_queries(days: int = 7, limit: int = 200) -> List[Tuple[str, int]]:
+    """Самые частые поисковые запросы за последние days дней: [(запрос, количество)]"""
+    conn = sqlite3.connect(DB_NAME)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            SELECT query, COUNT(*) AS searches FROM search_history
+            WHERE searched_at >= datetime('now', ?)
+            GROUP BY query
+            ORDER BY searches DESC
+            LIMIT ?
+        """, (f'-{days} days', limit))
+        return cursor.fetchall()
+    except sqlite3.Error as e:
+        logger.error(f"Ошибка при получении популярных поисковых запросов: {e}")
+        return []
+    finally:
+        conn.close()
+
 # --- Комментарии и рейтинги ---
 
 def add_comment(user_id: int, post_link: str, text: str):
@@ -1213,4 +1341,318 @@ def set_user_notification_settings(user_id: int, settings: dict):
     finally:
         conn.close()
 
-# --- Конец файла ---
\ No newline at end of file
+# --- Конец файла ---
+
+# --- Локальное хранилище постов ---
+
+_POST_FIELDS = ('title', 'text', 'link', 'source', 'date', 'views', 'channel_url',
+                'image_url', 'video_url', 'animation_url', 'summary')
+
+def _normalize_published(date_str: str) -> str:
+    """Приводит дату поста (YYYY-MM-DD или RFC 822 из RSS) к ISO-строке для сортировки"""
+    if not date_str:
+        return datetime.now().isoformat(timespec='seconds')
+    try:
+        return datetime.strptime(date_str[:10], '%Y-%m-%d').date().isoformat()
+    except ValueError:
+        pass
+    try:
+        from email.utils import parsedate_to_datetime
+        published = parsedate_to_datetime(date_str)
+        if published.tzinfo is not None:
+            published = published.astimezone().replace(tzinfo=None)
+        return published.isoformat(timespec='seconds')
+    except (TypeError, ValueError):
+        return datetime.now().isoformat(timespec='seconds')
+
+def _rows_to_posts(cursor) -> List[Dict[str, Any]]:
+    columns = [description[0] for description in cursor.description]
+    posts = []
+    for row in cursor.fetchall():
+        post = dict(zip(columns, row))
+        posts.append({key: (post.get(key) if post.get(key) is not None else '') for key in _POST_FIELDS})
+    return posts
+
+def upsert_posts(posts: List[Dict[str, Any]], kind: str) -> int:
+    """Добавляет или обновляет посты (по ссылке). Возвращает количество обработанных постов."""
+    rows = []
+    for post in posts:
+        link = post.get('link')
+        if not link:
+            continue
+        rows.append((
+            link, kind, post.get('source', ''), post.get('title', ''), post.get('text', ''),
+            post.get('summary', ''), post.get('date', ''), _normalize_published(post.get('date', '')),
+            int(post.get('views') or 0), post.get('channel_url', ''), post.get('image_url', ''),
+            post.get('video_url', ''), post.get('animation_url', ''),
+        ))
+    if not rows:
+        return 0
+    conn = sqlite3.connect(DB_NAME)
+    cursor = conn.cursor()
+    try:
+        cursor.executemany("""
+            INSERT INTO posts
+            (link, kind, source, title, text, summary, date, published_at, views,
+             channel_url, image_url, video_url, animation_url, fetched_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(link) DO UPDATE SET
+                -- статья из поиска, попавшая в ленту, становится обычным постом ленты
+                kind = CASE WHEN posts.kind = 'habr_search' THEN excluded.kind ELSE posts.kind END,
+                title = excluded.title,
+                text = excluded.text,
+                summary = excluded.summary,
+                views = MAX(posts.views, excluded.views),
+                image_url = excluded.image_url,
+                video_url = excluded.video_url,
+                animation_url = excluded.animation_url,
+                fetched_at = CURRENT_TIMESTAMP
+        """, rows)
+        conn.commit()
+        return len(rows)
+    except sqlite3.Error as e:
+        logger.error(f"Ошибка при сохранении постов ({kind}): {e}")
+        return 0
+    finally:
+        conn.close()
+
+def get_top_posts(since_date: str, limit: int = 100, sources: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """Посты Telegram-каналов начиная с since_date (YYYY-MM-DD), самые популярные сначала"""
+    conn = sqlite3.connect(DB_NAME)
+    cursor = conn.cursor()
+    try:
+        query = "SELECT * FROM posts WHERE kind = 'telegram' AND date >= ?"
+        params: List[Any] = [since_date]
+        if sources:
+            query += f" AND source IN ({','.join('?' for _ in sources)})"
+            params.extend(sources)
+        query += " ORDER BY views DESC, date DESC LIMIT ?"
+        params.append(limit)
+        cursor.execute(query, params)
+        return _rows_to_posts(cursor)
+    except sqlite3.Error as e:
+        logger.error(f"Ошибка при получении топа постов: {e}")
+        return []
+    finally:
+        conn.close()
+
+def get_latest_posts(kind: str, limit: int = 20, sources: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """Последние посты указанного типа ('telegram' или 'habr'), новые сначала"""
+    conn = sqlite3.connect(DB_NAME)
+    cursor = conn.cursor()
+    try:
+        query = "SELECT * FROM posts WHERE kind = ?"
+        params: List[Any] = [kind]
+        if sources:
+            query += f" AND source IN ({','.join('?' for _ in sources)})"
+            params.extend(sources)
+        query += " ORDER BY published_at DESC, fetched_at DESC LIMIT ?"
+        params.append(limit)
+        cursor.execute(query, params)
+        return _rows_to_posts(cursor)
+    except sqlite3.Error as e:
+        logger.error(f"Ошибка при получении последних постов ({kind}): {e}")
+        return []
+    finally:
+        conn.close()
+
+# Частые окончания русских слов: поиск идет по основе, чтобы "новости" находили "новостей"
+_RU_ENDINGS = sorted((
+    'иями', 'ями', 'ами', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими', 'ией', 'иях', 'ях', 'ах', 'ов', 'ев',
+    'ей', 'ой', 'ий', 'ый', 'ая', 'яя', 'ое', 'ее', 'ые', 'ие', 'ом', 'ем', 'ам', 'ям', 'ию', 'ия', 'ть',
+    'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю', 'ь',
+), key=len, reverse=True)
+_CYRILLIC_RE = re.compile('[а-яё]')
+
+
+def _search_stem(token: str) -> str:
+    if not _CYRILLIC_RE.search(token):
+        return token
+    for ending in _RU_ENDINGS:
+        if token.endswith(ending) and len(token) - len(ending) >= 3:
+            return token[:-len(ending)]
+    return token
+
+
+def _fts_query(query: str) -> str:
+    """Запрос пользователя -> выражение FTS5: все слова (по основе, как префикс) должны встретиться"""
+    terms = []
+    for token in re.findall(r'\w+', query.casefold()):
+        stem = _search_stem(token.replace('ё', 'е'))
+        # Слова в кавычках, чтобы пользовательский ввод не разбирался как синтаксис FTS5
+        terms.append(f'"{stem}"*' if len(stem) >= 3 else f'"{stem}"')
+    return ' '.join(terms)
+
+
+def search_posts(query: str, limit: int = 15) -> List[Dict[str, Any]]:
+    """Полнотекстовый поиск по сохраненным постам Telegram и Habr, самые релевантные (BM25) сначала"""
+    match = _fts_query(query)
+    if not match:
+        return []
+    conn = sqlite3.connect(DB_NAME)
+    cursor = conn.cursor()
+    try:
+        # Веса колонок bm25: заголовок важнее краткого описания, описание важнее полного текста
+        cursor.execute("""
+            SELECT posts.* FROM posts_fts
+            JOIN posts ON posts.rowid = posts_fts.rowid
+            WHERE posts_fts MATCH ?
+            ORDER BY bm25(posts_fts, 10.0, 1.0, 3.0)
+            LIMIT ?
+        """, (match, limit))
+        return _rows_to_posts(cursor)
+    except sqlite3.Error as e:
+        logger.error(f"Ошибка полнотекстового поиска '{query}': {e}")
+        return []
+    finally:
+        conn.close()
+
+def delete_old_posts(days: int = 7) -> int:
+    """Удаляет посты, которые не обновлялись дольше days дней"""
+    conn = sqlite3.connect(DB_NAME)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("DELETE FROM posts WHERE fetched_at < datetime('now', ?)", (f'-{int(days)} days',))
+        conn.commit()
+        return cursor.rowcount
+    except sqlite3.Error as e:
+        logger.error(f"Ошибка при очистке старых постов: {e}")
+        return 0
+    finally:
+        conn.close()
+
+# --- Кэш статей ---
+
+def get_cached_article(url: str) -> Optional[Dict[str, Any]]:
+    """Возвращает статью из кэша по каноническому URL и отмечает обращение"""
+    conn = sqlite3.connect(DB_NAME)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT title, content, summary FROM article_cache WHERE url = ?", (url,))
+        row = cursor.fetchone()
+        if not row:
+            return None
+        cursor.execute("UPDATE article_cache SET accessed_at = CURRENT_TIMESTAMP WHERE url = ?", (url,))
+        conn.commit()
+        return {'title': row[0] or '', 'content': row[1] or '', 'summary': row[2] or ''}
+    except sqlite3.Error as e:
+        logger.error(f"Ошибка при чтении кэша статьи {url}: {e}")
+        return None
+    finally:
+        conn.close()
+
+def save_cached_article(url: str, title: str, content: str, summary: str, max_rows: int = 5000):
+    """Сохраняет статью в кэш. Самые давно запрошенные записи сверх max_rows удаляются."""
+    conn = sqlite3.connect(DB_NAME)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            INSERT OR REPLACE INTO article_cache (url, title, content, summary, cached_at, accessed_at)
+            VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+        """, (url, title, content, summary))
+        cursor.execute("""
+            DELETE FROM article_cache WHERE url IN (
+                SELECT url FROM article_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+            )
+        """, (max_rows,))
+        conn.commit()
+    except sqlite3.Error as e:
+        logger.error(f"Ошибка при сохранении кэша статьи {url}: {e}")
+    finally:
+        conn.close()
+
+# --- file_id медиа в Telegram ---
+
+def get_media_file_id(url: str, media_type: str) -> Optional[str]:
+    """Возвращает file_id, под которым медиа по этому URL уже загружено в Telegram"""
+    conn = sqlite3.connect(DB_NAME)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT file_id FROM media_file_ids WHERE url = ? AND media_type = ?", (url, media_type))
+        row = cursor.fetchone()
+        return row[0] if row else None
+    except sqlite3.Error as e:
+        logger.error(f"Ошибка при получении file_id для {url}: {e}")
+        return None
+    finally:
+        conn.close()
+
+def save_media_file_id(url: str, media_type: str, file_id: str):
+    conn = sqlite3.connect(DB_NAME)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            INSERT OR REPLACE INTO media_file_ids (url, media_type, file_id, created_at)
+            VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+        """, (url, media_type, file_id))
+        conn.commit()
+    except sqlite3.Error as e:
+        logger.error(f"Ошибка при сохранении file_id для {url}: {e}")
+    finally:
+        conn.close()
+
+def delete_media_file_id(url: str, media_type: str):
+    """Удаляет file_id, который Telegram больше не принимает"""
+    conn = sqlite3.connect(DB_NAME)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("DELETE FROM media_file_ids WHERE url = ? AND media_type = ?", (url, media_type))
+        conn.commit()
+    except sqlite3.Error as e:
+        logger.error(f"Ошибка при удалении file_id для {url}: {e}")
+    finally:
+        conn.close()
+
+# --- Сессии навигации ---
+
+def save_nav_session(user_id: int, data: bytes):
+    """Сохраняет сессию навигации пользователя (заменяет предыдущую)"""
+    conn = sqlite3.connect(DB_NAME)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            INSERT OR REPLACE INTO nav_sessions (user_id, data, updated_at) VALUES (?, ?, CURRENT_TIMESTAMP)
+        """, (user_id, data))
+        conn.commit()
+    except sqlite3.Error as e:
+        logger.error(f"Ошибка при сохранении сессии навигации {user_id}: {e}")
+    finally:
+        conn.close()
+
+def load_nav_session(user_id: int) -> Optional[bytes]:
+    conn = sqlite3.connect(DB_NAME)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT data FROM nav_sessions WHERE user_id = ?", (user_id,))
+        row = cursor.fetchone()
+        return row[0] if row else None
+    except sqlite3.Error as e:
+        logger.error(f"Ошибка при чтении сессии навигации {user_id}: {e}")
+        return None
+    finally:
+        conn.close()
+
+def delete_nav_session(user_id: int):
+    conn = sqlite3.connect(DB_NAME)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("DELETE FROM nav_sessions WHERE user_id = ?", (user_id,))
+        conn.commit()
+    except sqlite3.Error as e:
+        logger.error(f"Ошибка при удалении сессии навигации {user_id}: {e}")
+    finally:
+        conn.close()
+
+def delete_old_nav_sessions(days: int = 7) -> int:
+    """Удаляет сессии навигации, которые не сохранялись дольше days дней"""
+    conn = sqlite3.connect(DB_NAME)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("DELETE FROM nav_sessions WHERE updated_at < datetime('now', ?)", (f'-{int(days)} days',))
+        conn.commit()
+        return cursor.rowcount
+    except sqlite3.Error as e:
+        logger.error(f"Ошибка при очистке сессий навигации: {e}")
+        return 0
+    finally:
+        conn.close()
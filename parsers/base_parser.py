@@ -1,29 +1,170 @@
-import requests
-from bs4 import BeautifulSoup  # Убедитесь, что это есть
-import feedparser
-from typing import List, Dict
-import re
+from typing import List, Dict, Optional
+
+from .html_backend import ARTICLE_CONTENT, TELEGRAM_POST, make_soup
+from .http_client import HttpClient, get_http_client
+from .parse_service import ParseService
+from .rss import parse_feed
+
+
+def parse_article_page(html: bytes) -> Dict:
+    """Извлекает текст и заголовок произвольной статьи"""
+    # Сначала строим только типичные контейнеры статьи и заголовок
+    soup = make_soup(html, only=ARTICLE_CONTENT)
+
+    # Попытка найти основной контент статьи
+    # Разные сайты имеют разные структуры
+    content_selectors = [
+        'article',           # Общий тег article
+        '.article',          # Класс article
+        '.post',            # Класс post
+        '.content',         # Класс content
+        '.entry-content',   # WordPress
+        '.post-content',    # Часто используемый класс
+        'main',             # Основной контент
+        '.main-content'     # Класс основного контента
+    ]
+
+    content = None
+    for selector in content_selectors:
+        content = soup.select_one(selector)
+        if content:
+            break
+
+    # Если не нашли специфичный контент, разбираем страницу целиком и берем body
+    if not content:
+        soup = make_soup(html)
+        content = soup.find('body')
+
+    if content:
+        # Удаляем скрипты и стили
+        for script in content(["script", "style"]):
+            script.decompose()
+
+        # Получаем текст
+        full_text = content.get_text(strip=False)
+        # Очищаем от лишних пробелов
+        full_text = ' '.join(full_text.split())
+
+        # Ограничиваем длину (Telegram имеет ограничения)
+        if len(full_text) > 3000:
+            full_text = full_text[:3000] + '...\n\n(Продолжение на сайте)'
+
+        return {
+            'success': True,
+            'content': full_text,
+            'title': soup.find('title').get_text() if soup.find('title') else 'Без заголовка'
+        }
+    else:
+        return {
+            'success': False,
+            'error': 'Не удалось найти контент статьи'
+        }
+
+
+def parse_telegram_post_page(html: bytes, url: str) -> Dict:
+    """Извлекает текст поста со страницы t.me/s/<channel>/<id>"""
+    soup = make_soup(html, only=TELEGRAM_POST)
+
+    # Ищем основной контент поста
+    post_content = soup.select_one('.tgme_widget_message_text')
+
+    if post_content:
+        # Удаляем все скрипты, стили и встроенные виджеты
+        for unwanted in post_content(["script", "style", "noscript", "iframe", "embed"]):
+            unwanted.decompose()
+
+        # Получаем чистый текст
+        content = post_content.get_text(strip=False)
+        content = ' '.join(content.split())
+
+        print(f"DEBUG: Извлеченный контент: {content[:200]}...")
+        print(f"DEBUG: Длина контента: {len(content)} символов")
+
+        # Проверяем, что контент не пустой и не слишком короткий
+        if len(content) < 10:
+            print(f"DEBUG: Контент слишком короткий: '{content}'")
+            return {
+                'success': False,
+                'error': 'Контент поста слишком короткий'
+            }
+
+        # Дополнительная проверка: контент должен быть релевантным заголовку
+        # Извлекаем ключевые слова из URL для проверки
+        url_channel = url.split('/')[-2] if '/' in url else ''
+        print(f"DEBUG: Канал из URL: {url_channel}")
+
+        # НЕ обрезаем контент - пусть основной код сам решает, как его использовать
+        print(f"DEBUG: Контент оставлен без обрезки: {len(content)} символов")
+
+        # Убираем слишком строгую проверку - Telegram иногда возвращает
+        # контент из других постов, но это лучше чем ничего
+        print(f"DEBUG: Контент принят (проверка релевантности отключена)")
+
+        # Ищем заголовок - берем первые 100 символов контента
+        title = content[:100] + "..." if len(content) > 100 else content
+
+        # Ограничиваем длину
+        if len(content) > 3000:
+            content = content[:3000] + '...\n\n(Продолжение в Telegram)'
+
+        return {
+            'success': True,
+            'content': content,
+            'title': title
+        }
+    else:
+        print(f"DEBUG: Не найден .tgme_widget_message_text для {url}")
+        # Попробуем найти альтернативные селекторы
+        alternative_selectors = [
+            '.tgme_widget_message',
+            '.message',
+            '[class*="message"]',
+            '[class*="post"]'
+        ]
+
+        for selector in alternative_selectors:
+            alt_content = soup.select_one(selector)
+            if alt_content:
+                print(f"DEBUG: Найден альтернативный селектор: {selector}")
+                content = alt_content.get_text(strip=False)
+                content = ' '.join(content.split())
+                if len(content) > 10:
+                    title = content[:100] + "..." if len(content) > 100 else content
+                    return {
+                        'success': True,
+                        'content': content,
+                        'title': title
+                    }
+
+        return {
+            'success': False,
+            'error': 'Не удалось найти контент Telegram-поста'
+        }
+
 
 class BaseParser:
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
+    def __init__(self, http_client: Optional[HttpClient] = None, parse_service: Optional[ParseService] = None):
+        # Общий для процесса пул соединений (keep-alive, лимит соединений на хост)
+        self.http = http_client or get_http_client()
+        # Разбор HTML (в пуле процессов, если он настроен)
+        self.parse = parse_service or ParseService()
     
-    def parse_rss(self, url: str, limit: int = 5) -> List[Dict]:
-        """Парсинг RSS-ленты"""
+    async def parse_rss(self, url: str, limit: int = 5) -> List[Dict]:
+        """Парсинг RSS/Atom-ленты (любой из NEWS_SOURCES): title, link, published, summary, id, image_url"""
         try:
-            feed = feedparser.parse(url)
-            news_list = []
+            body = await self.http.get_bytes(url)
+            # Разбор останавливается после limit записей
+            entries = await self.parse.run(parse_feed, body, limit)
             
-            for entry in feed.entries[:limit]:
+            news_list = []
+            for entry in entries:
                 news_list.append({
-                    'title': entry.title,
-                    'link': entry.link,
-                    'published': getattr(entry, 'published', ''),
-                    'summary': getattr(entry, 'summary', ''),
-                    'id': getattr(entry, 'id', entry.link)
+                    'title': entry['title'],
+                    'link': entry['link'],
+                    'published': entry['published'],
+                    'summary': entry['summary'],
+                    'id': entry['id'],
+                    'image_url': entry['image_url']
                 })
             
             return news_list
@@ -31,73 +172,25 @@ class BaseParser:
             print(f"Ошибка парсинга RSS: {e}")
             return []
     
-    def parse_full_article(self, url: str) -> Dict:
+    async def parse_full_article(self, url: str) -> Dict:
         """Парсинг полной статьи"""
         try:
             # Проверяем, является ли это Telegram-ссылкой
             if "t.me/" in url or "/s/" in url:
-                return self._parse_telegram_post(url)
+                return await self._parse_telegram_post(url)
             
-            response = self.session.get(url, timeout=10)
+            response = await self.http.fetch(url, timeout=10)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Попытка найти основной контент статьи
-            # Разные сайты имеют разные структуры
-            content_selectors = [
-                'article',           # Общий тег article
-                '.article',          # Класс article
-                '.post',            # Класс post
-                '.content',         # Класс content
-                '.entry-content',   # WordPress
-                '.post-content',    # Часто используемый класс
-                'main',             # Основной контент
-                '.main-content'     # Класс основного контента
-            ]
-            
-            content = None
-            for selector in content_selectors:
-                content = soup.select_one(selector)
-                if content:
-                    break
+            return await self.parse.run(parse_article_page, response.body)
             
-            # Если не нашли специфичный контент, берем body
-            if not content:
-                content = soup.find('body')
-            
-            if content:
-                # Удаляем скрипты и стили
-                for script in content(["script", "style"]):
-                    script.decompose()
-                
-                # Получаем текст
-                full_text = content.get_text(strip=False)
-                # Очищаем от лишних пробелов
-                full_text = ' '.join(full_text.split())
-                
-                # Ограничиваем длину (Telegram имеет ограничения)
-                if len(full_text) > 3000:
-                    full_text = full_text[:3000] + '...\n\n(Продолжение на сайте)'
-                
-                return {
-                    'success': True,
-                    'content': full_text,
-                    'title': soup.find('title').get_text() if soup.find('title') else 'Без заголовка'
-                }
-            else:
-                return {
-                    'success': False,
-                    'error': 'Не удалось найти контент статьи'
-                }
-                
         except Exception as e:
             return {
                 'success': False,
                 'error': f'Ошибка при парсинге статьи: {str(e)}'
             }
     
-    def _parse_telegram_post(self, url: str) -> Dict:
+    async def _parse_telegram_post(self, url: str) -> Dict:
         """Парсинг Telegram-поста"""
         try:
             # Преобразуем URL в формат для парсинга
@@ -136,87 +229,11 @@ class BaseParser:
                 'Expires': '0'
             }
             
-            response = self.session.get(parse_url_with_cache_buster, headers=headers, timeout=15)
+            response = await self.http.fetch(parse_url_with_cache_buster, headers=headers, timeout=15)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Ищем основной контент поста
-            post_content = soup.select_one('.tgme_widget_message_text')
+            return await self.parse.run(parse_telegram_post_page, response.body, url)
             
-            if post_content:
-                # Удаляем все скрипты, стили и встроенные виджеты
-                for unwanted in post_content(["script", "style", "noscript", "iframe", "embed"]):
-                    unwanted.decompose()
-                
-                # Получаем чистый текст
-                content = post_content.get_text(strip=False)
-                content = ' '.join(content.split())
-                
-                print(f"DEBUG: Извлеченный контент: {content[:200]}...")
-                print(f"DEBUG: Длина контента: {len(content)} символов")
-                
-                # Проверяем, что контент не пустой и не слишком короткий
-                if len(content) < 10:
-                    print(f"DEBUG: Контент слишком короткий: '{content}'")
-                    return {
-                        'success': False,
-                        'error': 'Контент поста слишком короткий'
-                    }
-                
-                # Дополнительная проверка: контент должен быть релевантным заголовку
-                # Извлекаем ключевые слова из URL для проверки
-                url_channel = url.split('/')[-2] if '/' in url else ''
-                print(f"DEBUG: Канал из URL: {url_channel}")
-                
-                # НЕ обрезаем контент - пусть основной код сам решает, как его использовать
-                print(f"DEBUG: Контент оставлен без обрезки: {len(content)} символов")
-                
-                # Убираем слишком строгую проверку - Telegram иногда возвращает
-                # контент из других постов, но это лучше чем ничего
-                print(f"DEBUG: Контент принят (проверка релевантности отключена)")
-                
-                # Ищем заголовок - берем первые 100 символов контента
-                title = content[:100] + "..." if len(content) > 100 else content
-                
-                # Ограничиваем длину
-                if len(content) > 3000:
-                    content = content[:3000] + '...\n\n(Продолжение в Telegram)'
-                
-                return {
-                    'success': True,
-                    'content': content,
-                    'title': title
-                }
-            else:
-                print(f"DEBUG: Не найден .tgme_widget_message_text для {parse_url}")
-                # Попробуем найти альтернативные селекторы
-                alternative_selectors = [
-                    '.tgme_widget_message',
-                    '.message',
-                    '[class*="message"]',
-                    '[class*="post"]'
-                ]
-                
-                for selector in alternative_selectors:
-                    alt_content = soup.select_one(selector)
-                    if alt_content:
-                        print(f"DEBUG: Найден альтернативный селектор: {selector}")
-                        content = alt_content.get_text(strip=False)
-                        content = ' '.join(content.split())
-                        if len(content) > 10:
-                            title = content[:100] + "..." if len(content) > 100 else content
-                            return {
-                                'success': True,
-                                'content': content,
-                                'title': title
-                            }
-                
-                return {
-                    'success': False,
-                    'error': 'Не удалось найти контент Telegram-поста'
-                }
-                
         except Exception as e:
             print(f"DEBUG: Ошибка при парсинге {url}: {e}")
             return {
@@ -1,556 +1,592 @@
-from .base_parser import BaseParser
-from typing import List, Dict
-from bs4 import BeautifulSoup
-import requests
+from .base_parser import BaseParser, parse_article_page
+from .cache import TTLCache
+from .html_backend import HABR_ARTICLE, HABR_ARTICLE_LIST, make_soup
+from .http_client import HttpClient
+from .parse_service import ParseService
+from .post import Post
+from .rss import parse_feed
+from .singleflight import SingleFlight
+from typing import List, Dict, Optional
 from urllib.parse import quote
-import feedparser
+import logging
 import re
+import time
 
-class HabrParser(BaseParser):
-    def _clean_html_text(self, html_text: str) -> str:
-        """Очищает HTML-теги из текста, оставляя только чистый текст"""
-        if not html_text:
-            return ""
+logger = logging.getLogger(__name__)
+
+HABR_RSS_URL = "https://habr.com/ru/rss/all/"
+# Лента всех статей по страницам: /ru/articles/, /ru/articles/page2/, ...
+HABR_LISTING_URL = "https://habr.com/ru/articles/"
+# Статей на одной странице ленты
+HABR_PAGE_SIZE = 20
+# Сколько записей RSS читать при обновлении окна статей
+HABR_RSS_LIMIT = 50
+_ARTICLE_ID_RE = re.compile(r'/(\d+)/?(?:[?#]|$)')
+# Сколько секунд кэшировать поиск без результатов
+EMPTY_SEARCH_TTL = 60
+
+# Состояние условных запросов к RSS, общее для всех экземпляров парсера:
+# url -> {'etag': ..., 'modified': ..., 'body': ..., 'entries': [...], 'complete': ...}
+_RSS_STATE: Dict[str, Dict] = {}
+
+
+def clean_html_text(html_text: str) -> str:
+    """Очищает HTML-теги из текста, оставляя только чистый текст"""
+    if not html_text:
+        return ""
+    try:
+        soup = make_soup(html_text)
+        return soup.get_text(strip=True)
+    except Exception:
+        # Если не удалось очистить, возвращаем как есть
+        return html_text
+
+
+def feed_image_url(image_url: str) -> str:
+    """Приводит ссылку на картинку из RSS к абсолютной и запрашивает полноразмерную версию"""
+    if not image_url:
+        return ''
+    if image_url.startswith('//'):
+        image_url = 'https:' + image_url
+    elif image_url.startswith('/'):
+        image_url = 'https://habr.com' + image_url
+    elif not image_url.startswith('http'):
+        image_url = 'https://habr.com' + image_url
+    
+    # Улучшаем качество изображения
+    if '/r/w48/' in image_url:
+        image_url = image_url.replace('/r/w48/', '/r/w1200/')
+    elif '/r/w96/' in image_url:
+        image_url = image_url.replace('/r/w96/', '/r/w1200/')
+    elif '/r/w156/' in image_url:
+        image_url = image_url.replace('/r/w156/', '/r/w1200/')
+    elif '/r/w312/' in image_url:
+        image_url = image_url.replace('/r/w312/', '/r/w1200/')
+    elif '/r/w624/' in image_url:
+        image_url = image_url.replace('/r/w624/', '/r/w1200/')
+    
+    # Пробуем оригинал без размеров
+    if '/r/w' in image_url:
+        original_url = re.sub(r'/r/w\d+/', '/', image_url)
+        if any(ext in original_url.lower() for ext in ['.jpg', '.jpeg', '.png', '.webp', '.gif']):
+            image_url = original_url
+    return image_url
+
+
+def parse_habr_listing(html: bytes, limit: int) -> List[Post]:
+    """Разбирает список статей с главной страницы Habr"""
+    soup = make_soup(html, only=HABR_ARTICLE_LIST)
+
+    # Ищем статьи на главной странице
+    article_elements = soup.select('.tm-articles-list__item, .article, .post')
+
+    articles = []
+    for article in article_elements[:limit * 2]:  # Берем больше для лучшего выбора
         try:
-            from bs4 import BeautifulSoup
-            soup = BeautifulSoup(html_text, 'html.parser')
-            return soup.get_text(strip=True)
-        except Exception:
-            # Если не удалось очистить, возвращаем как есть
-            return html_text
+            title_elem = article.select_one('.tm-title a, h2 a, h3 a, .post__title a')
+            if not title_elem:
+                continue
+
+            title = title_elem.get_text().strip()
+            link = title_elem.get('href', '')
+            if link and not link.startswith('http'):
+                link = f"https://habr.com{link}"
+
+            # Ищем краткое описание
+            summary_elem = article.select_one('.article__descr, .post__text, .tm-article-snippet')
+            summary = summary_elem.get_text().strip() if summary_elem else ''
+
+            # Ищем дату
+            date_elem = article.select_one('.tm-article-meta__date, .post__date, time')
+            date = date_elem.get_text().strip() if date_elem else ''
+
+            # Ищем изображение
+            image_url = ''
+
+            # Попробуем разные селекторы для изображений
+            img_selectors = [
+                '.tm-article-snippet__cover img',  # Обложка статьи
+                '.article__cover img',  # Альтернативный селектор
+                '.post__cover img',  # Еще один вариант
+                'img[src*=".jpg"]',  # JPG изображения
+                'img[src*=".png"]',  # PNG изображения
+                'img[src*=".webp"]',  # WebP изображения
+                'img'  # Любое изображение как fallback
+            ]
+
+            for selector in img_selectors:
+                img_elem = article.select_one(selector)
+                if img_elem and img_elem.get('src'):
+                    image_url = img_elem.get('src')
+
+                    # Пропускаем только явные аватары
+                    if 'avatar' in image_url.lower() and 'upload_files' not in image_url:
+                        continue
+
+                    # Проверяем, что это действительно изображение
+                    if any(ext in image_url.lower() for ext in ['.jpg', '.jpeg', '.png', '.webp', '.gif']):
+                        break
+                    # Если нет расширения, но есть habr.com в URL
+                    elif 'habr.com' in image_url:
+                        break
+
+            # Если нашли изображение, нормализуем URL и запрашиваем полноразмерную версию
+            image_url = feed_image_url(image_url)
+
+            # Если не нашли изображение статьи, пробуем найти в CSS background-image
+            if not image_url:
+                style_elem = article.select_one('[style*="background-image"]')
+                if style_elem:
+                    style = style_elem.get('style', '')
+                    bg_match = re.search(r'background-image:\s*url\(["\']?([^"\')\s]+)["\']?\)', style)
+                    if bg_match:
+                        bg_url = bg_match.group(1)
+                        # Пропускаем только явные аватары
+                        if 'avatar' not in bg_url.lower() or 'upload_files' in bg_url:
+                            image_url = feed_image_url(bg_url)
+
+            if title and link:
+                # Очищаем HTML из summary
+                clean_summary = clean_html_text(summary)
+                summary = clean_summary[:200] + '...' if len(clean_summary) > 200 else summary
+
+                articles.append(Post(
+                    title=title,
+                    link=link,
+                    summary=summary,
+                    date=date,
+                    source='habr.com',
+                    image_url=image_url,
+                ))
+
+        except Exception as e:
+            continue
+
+    return articles[:limit]
+
+
+def parse_habr_search(html: bytes) -> List[Post]:
+    """Разбирает страницу результатов поиска Habr"""
+    soup = make_soup(html, only=HABR_ARTICLE_LIST)
+
+    # Ищем статьи на странице результатов поиска
+    articles = soup.select('.tm-articles-list__item, .article, .post, .tm-article-card')
+
+    news_list = []
+    for article in articles:
+        title_elem = article.select_one('.tm-title a, h2 a, h3 a, .tm-article-card__title a')
+        if title_elem:
+            title = title_elem.get_text().strip()
+            link = title_elem.get('href', '')
+            if link and not link.startswith('http'):
+                link = f"https://habr.com{link}"
+
+            # Ищем краткое описание
+            summary_elem = article.select_one('.article__descr, .post__text, .tm-article-snippet, .tm-article-card__snippet')
+            summary = summary_elem.get_text().strip() if summary_elem else ''
+
+            # Ищем изображение
+            image_url = ''
+
+            # Попробуем разные селекторы для изображений
+            img_selectors = [
+                '.tm-article-snippet__cover img',  # Обложка статьи
+                '.article__cover img',  # Альтернативный селектор
+                '.post__cover img',  # Еще один вариант
+                'img[src*=".jpg"]',  # JPG изображения
+                'img[src*=".png"]',  # PNG изображения
+                'img[src*=".webp"]',  # WebP изображения
+                'img'  # Любое изображение как fallback
+            ]
+
+            for selector in img_selectors:
+                img_elem = article.select_one(selector)
+                if img_elem and img_elem.get('src'):
+                    image_url = img_elem.get('src')
+
+                    # Пропускаем только явные аватары
+                    if any(skip_word in image_url.lower() for skip_word in ['avatar', 'emoji', 'smile', 'icon']):
+                        continue
+
+                    # Пропускаем изображения с определенными размерами (обычно аватары)
+                    if any(size in image_url for size in ['/r/w48/', '/r/w96/', '/r/w156/', '/r/w312/', '/r/w624/']):
+                        continue
+
+                    # Проверяем, что это действительно изображение статьи
+                    if any(ext in image_url.lower() for ext in ['.jpg', '.jpeg', '.png', '.webp', '.gif']):
+                        # Дополнительная проверка - пропускаем аватары по размеру
+                        if 'upload_files' in image_url or 'habr' in image_url:
+                            break
+                    # Если нет расширения, но есть habr.com в URL
+                    elif 'habr.com' in image_url and 'upload_files' in image_url:
+                        break
+
+            # Если нашли изображение, нормализуем URL и запрашиваем полноразмерную версию
+            image_url = feed_image_url(image_url)
+
+            # Если не нашли изображение статьи, пробуем найти в CSS background-image
+            if not image_url:
+                style_elem = article.select_one('[style*="background-image"]')
+                if style_elem:
+                    style = style_elem.get('style', '')
+                    bg_match = re.search(r'background-image:\s*url\(["\']?([^"\')\s]+)["\']?\)', style)
+                    if bg_match:
+                        bg_url = bg_match.group(1)
+                        # Пропускаем только явные аватары
+                        if not any(skip_word in bg_url.lower() for skip_word in ['avatar', 'emoji', 'smile', 'icon']):
+                            image_url = feed_image_url(bg_url)
+
+            if title and link:
+                # Очищаем HTML из summary
+                clean_summary = clean_html_text(summary)
+                summary = clean_summary[:200] + '...' if len(clean_summary) > 200 else clean_summary
+
+                news_list.append(Post(
+                    title=title,
+                    link=link,
+                    summary=summary,
+                    source='habr.com',
+                    image_url=image_url,
+                ))
+
+    return news_list
+
+
+def parse_habr_article(html: bytes) -> Optional[Dict]:
+    """Разбирает страницу статьи Habr. None, если тело статьи не найдено"""
+    soup = make_soup(html, only=HABR_ARTICLE)
+
+    # Специфичные селекторы для Habr
+    content = soup.select_one('.article-formatted-body, .post__text, .tm-article-body, .tm-article-content')
+
+    if content:
+        # Удаляем скрипты и стили
+        for script in content(["script", "style", "aside", ".tm-article-comments", "noscript", "iframe"]):
+            script.decompose()
+
+        # Получаем текст
+        full_text = content.get_text(strip=False)
+        full_text = ' '.join(full_text.split())
+
+        # Получаем заголовок
+        title_elem = soup.select_one('h1.tm-title, .post__title, h1, title')
+        title = title_elem.get_text().strip() if title_elem else 'Без заголовка'
+
+        # Ограничиваем длину
+        if len(full_text) > 3000:
+            full_text = full_text[:3000] + '...\n\n(Продолжение на сайте)'
+
+        return {
+            'success': True,
+            'content': full_text,
+            'title': title
+        }
+
+    return None
+
+
+def normalize_query(query: str) -> str:
+    """Ключ поискового запроса: без учета регистра, лишних пробелов, порядка и повторов слов"""
+    return ' '.join(sorted(set(query.casefold().split())))
+
+
+def habr_article_key(link: str) -> str:
+    """Ключ статьи для дедупликации: id из ссылки (RSS и лента дают разные варианты ссылок)"""
+    match = _ARTICLE_ID_RE.search(link)
+    if match:
+        return match.group(1)
+    return link.split('?', 1)[0].split('#', 1)[0].rstrip('/')
+
+
+def _feed_article(entry: Dict) -> Post:
+    return Post(
+        title=entry['title'],
+        link=entry['link'],
+        summary=entry['summary'],
+        date=entry['published'],
+        source='habr.com',
+        image_url=feed_image_url(entry['image_url']),
+    )
+
+
+class _HabrWindow:
+    """
+    Накопленная лента статей Habr, новые сначала.
+    Голова пополняется из RSS, хвост - страницами ленты. Каждая статья получает порядковый номер,
+    поэтому позиция статьи-курсора находится за O(1), даже когда в голову добавились новые статьи.
+    """
+
+    def __init__(self, max_articles: int):
+        self.max_articles = max_articles
+        self.articles: List[Post] = []
+        self._seq: Dict[str, int] = {}  # ключ статьи -> порядковый номер
+        self._first = 0                  # порядковый номер articles[0]
+        self.next_page = 1               # следующая страница ленты для хвоста
+        self.exhausted = False           # лента закончилась
+        self.refreshed_at = 0.0
+
+    def __len__(self) -> int:
+        return len(self.articles)
+
+    def add_newer(self, articles: List[Post]):
+        """Добавляет в голову статьи, которые новее самой свежей статьи окна"""
+        keys = [habr_article_key(article['link']) for article in articles]
+        known = next((i for i, key in enumerate(keys) if key in self._seq), None)
+        if known is None:
+            # Окно пустое или безнадежно устарело: начинаем заново с этих статей
+            self.articles, self._seq, self._first = [], {}, 0
+            self.exhausted = False
+            self.add_older(articles)
+            # Страницы, полностью покрытые этими статьями, загружать не нужно
+            self.next_page = len(self.articles) // HABR_PAGE_SIZE + 1
+            return
+        fresh = {}
+        for key, article in zip(keys[:known], articles[:known]):
+            fresh.setdefault(key, article)
+        if not fresh:
+            return
+        self._first -= len(fresh)
+        for seq, key in enumerate(fresh, start=self._first):
+            self._seq[key] = seq
+        self.articles[:0] = fresh.values()
+        # Новые статьи сдвигают старые на следующие страницы ленты
+        self.next_page += len(fresh) // HABR_PAGE_SIZE
+        self._trim()
+
+    def add_older(self, articles: List[Post]) -> int:
+        """Добавляет в хвост еще не известные статьи. Возвращает количество добавленных"""
+        added = 0
+        for article in articles:
+            key = habr_article_key(article['link'])
+            if key in self._seq:
+                continue
+            self._seq[key] = self._first + len(self.articles)
+            self.articles.append(article)
+            added += 1
+        self._trim()
+        return added
+
+    def position_after(self, link: str) -> Optional[int]:
+        """Индекс статьи, следующей за link. None, если link нет в окне"""
+        seq = self._seq.get(habr_article_key(link))
+        if seq is None:
+            return None
+        return seq - self._first + 1
+
+    def _trim(self):
+        if len(self.articles) <= self.max_articles:
+            return
+        for article in self.articles[self.max_articles:]:
+            del self._seq[habr_article_key(article['link'])]
+        del self.articles[self.max_articles:]
+        self.next_page = self.max_articles // HABR_PAGE_SIZE + 1
+        self.exhausted = False
+
+
+class HabrParser(BaseParser):
+    def __init__(self, http_client: Optional[HttpClient] = None, parse_service: Optional[ParseService] = None,
+                 window_size: int = 1000, refresh_interval: float = 120, search_cache: Optional[TTLCache] = None):
+        super().__init__(http_client, parse_service)
+        # Результаты поиска: нормализованный запрос -> список статей
+        self.search_cache = search_cache if search_cache is not None else TTLCache(ttl=900, max_entries=500)
+        # Лента статей, из которой отдаются последние новости и "Еще" по курсору
+        self._window = _HabrWindow(window_size)
+        self.refresh_interval = refresh_interval
+        self._flight = SingleFlight()
+
+    async def _fetch_feed_entries(self, rss_url: str, limit: int) -> List[Dict]:
+        """
+        Загружает RSS с условными заголовками (ETag / Last-Modified) и возвращает первые limit записей.
+        На 304 Not Modified записи берутся из ранее разобранных или дочитываются из сохраненного тела ленты.
+        """
+        state = _RSS_STATE.get(rss_url)
+        headers = {}
+        if state:
+            if state.get('etag'):
+                headers['If-None-Match'] = state['etag']
+            if state.get('modified'):
+                headers['If-Modified-Since'] = state['modified']
+        
+        response = await self.http.fetch(rss_url, headers=headers, timeout=10)
+        if response.status == 304 and state:
+            if len(state['entries']) < limit and not state['complete']:
+                entries = await self.parse.run(parse_feed, state['body'], limit)
+                state['entries'], state['complete'] = entries, len(entries) < limit
+            return state['entries'][:limit]
+        response.raise_for_status()
+        
+        entries = await self.parse.run(parse_feed, response.body, limit)
+        if entries:
+            _RSS_STATE[rss_url] = {
+                'etag': response.headers.get('ETag'),
+                'modified': response.headers.get('Last-Modified'),
+                'body': response.body,
+                'entries': entries,
+                # Лента прочитана до конца - больше записей из этого тела не получить
+                'complete': len(entries) < limit,
+            }
+        return entries
     
-    def get_latest_news(self, limit: int = 10) -> List[Dict]:
+    async def get_latest_news(self, limit: int = 10) -> List[Post]:
         """Получение последних новостей с Habr"""
         try:
-            # Сначала пробуем RSS feed для более надежного получения изображений
-            rss_url = "https://habr.com/ru/rss/all/"
-            feed = feedparser.parse(rss_url)
-            
-            if feed.entries:
+            window = await self._get_window(limit)
+            if len(window):
                 articles = []
-                for entry in feed.entries[:limit]:
-                    title = entry.get('title', '')
-                    link = entry.get('link', '')
-                    summary = entry.get('summary', '')
-                    published = entry.get('published', '')
-                    
-                    # Ищем изображение в RSS
-                    image_url = ''
-                    
-                    # Пробуем найти изображение в media_content
-                    if hasattr(entry, 'media_content') and entry.media_content:
-                        for media in entry.media_content:
-                            if media.get('type', '').startswith('image/'):
-                                image_url = media.get('url', '')
-                                if image_url:
-                                    break
-                    
-                    # Если не нашли в media_content, пробуем media_thumbnail
-                    if not image_url and hasattr(entry, 'media_thumbnail') and entry.media_thumbnail:
-                        for thumb in entry.media_thumbnail:
-                            image_url = thumb.get('url', '')
-                            if image_url:
-                                break
-                    
-                    # Если все еще не нашли, пробуем извлечь из summary
-                    if not image_url and summary:
-                        # Ищем img теги в summary
-                        soup = BeautifulSoup(summary, 'html.parser')
-                        img_tag = soup.find('img')
-                        if img_tag and img_tag.get('src'):
-                            image_url = img_tag.get('src')
-                    
-                    # Нормализуем URL изображения
-                    if image_url:
-                        if image_url.startswith('//'):
-                            image_url = 'https:' + image_url
-                        elif image_url.startswith('/'):
-                            image_url = 'https://habr.com' + image_url
-                        elif not image_url.startswith('http'):
-                            image_url = 'https://habr.com' + image_url
-                        
-                        # Улучшаем качество изображения
-                        if '/r/w48/' in image_url:
-                            image_url = image_url.replace('/r/w48/', '/r/w1200/')
-                        elif '/r/w96/' in image_url:
-                            image_url = image_url.replace('/r/w96/', '/r/w1200/')
-                        elif '/r/w156/' in image_url:
-                            image_url = image_url.replace('/r/w156/', '/r/w1200/')
-                        elif '/r/w312/' in image_url:
-                            image_url = image_url.replace('/r/w312/', '/r/w1200/')
-                        elif '/r/w624/' in image_url:
-                            image_url = image_url.replace('/r/w624/', '/r/w1200/')
-                        
-                        # Пробуем оригинал без размеров
-                        if '/r/w' in image_url:
-                            original_url = re.sub(r'/r/w\d+/', '/', image_url)
-                            if any(ext in original_url.lower() for ext in ['.jpg', '.jpeg', '.png', '.webp', '.gif']):
-                                image_url = original_url
-                    
-                    # Очищаем summary от HTML тегов
-                    if summary:
-                        soup = BeautifulSoup(summary, 'html.parser')
-                        summary = soup.get_text(separator=' ', strip=True)
-                    
-                    articles.append({
-                        'title': title,
-                        'link': link,
-                        'summary': summary[:200] + '...' if len(summary) > 200 else summary,
-                        'date': published,
-                        'source': 'habr.com',
-                        'image_url': image_url
-                    })
-                
-                if articles:
-                    return articles
+                for article in window.articles[:limit]:
+                    summary = article.summary
+                    articles.append(article.replace(summary=summary[:200] + '...' if len(summary) > 200 else summary))
+                return articles
             
-            # Если RSS не сработал, используем HTML парсинг как fallback
-            return self._parse_habr_html(limit)
+            # Если ни RSS, ни лента не сработали, используем HTML парсинг главной как fallback
+            return await self._parse_habr_html(limit)
             
         except Exception as e:
             print(f"Ошибка при получении новостей с Habr: {e}")
             # Fallback к HTML парсингу
-            return self._parse_habr_html(limit)
+            return await self._parse_habr_html(limit)
+    
+    async def _get_window(self, size: int) -> _HabrWindow:
+        """Окно статей, обновленное из RSS не позже refresh_interval назад и содержащее не меньше size статей"""
+        window = self._window
+        if time.monotonic() - window.refreshed_at > self.refresh_interval:
+            await self._flight.do('refresh', self._refresh_window)
+        while len(window) < size and not window.exhausted:
+            # Одновременные запросы ждут одну загрузку страницы
+            if not await self._flight.do('page', self._load_next_page):
+                break
+        return window
     
-    def _parse_habr_html(self, limit: int) -> List[Dict]:
+    async def _refresh_window(self):
+        """Добавляет в голову окна статьи из RSS, которых в нем еще нет"""
+        try:
+            entries = await self._fetch_feed_entries(HABR_RSS_URL, HABR_RSS_LIMIT)
+            self._window.add_newer([_feed_article(entry) for entry in entries])
+        except Exception as e:
+            logger.error(f"Ошибка при обновлении RSS Habr: {e}")
+        # Даже при ошибке не повторяем запрос до следующего интервала
+        self._window.refreshed_at = time.monotonic()
+    
+    async def _load_next_page(self) -> bool:
+        """Загружает следующую страницу ленты в хвост окна. False, если загрузить не удалось"""
+        window = self._window
+        page = window.next_page
+        url = HABR_LISTING_URL if page == 1 else f"{HABR_LISTING_URL}page{page}/"
+        try:
+            response = await self.http.fetch(url, timeout=10)
+            if response.status == 404:
+                window.exhausted = True
+                return False
+            response.raise_for_status()
+            articles = await self.parse.run(parse_habr_listing, response.body, HABR_PAGE_SIZE)
+        except Exception as e:
+            logger.error(f"Ошибка при загрузке страницы {page} ленты Habr: {e}")
+            return False
+        if not articles:
+            window.exhausted = True
+            return False
+        window.add_older(articles)
+        window.next_page = page + 1
+        return True
+    
+    async def _parse_habr_html(self, limit: int) -> List[Post]:
         """HTML парсинг Habr как fallback"""
         try:
             # Получаем главную страницу Habr
-            response = self.session.get("https://habr.com/ru/", timeout=10)
+            response = await self.http.fetch("https://habr.com/ru/", timeout=10)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Ищем статьи на главной странице
-            article_elements = soup.select('.tm-articles-list__item, .article, .post')
-            
-            articles = []
-            for article in article_elements[:limit * 2]:  # Берем больше для лучшего выбора
-                try:
-                    title_elem = article.select_one('.tm-title a, h2 a, h3 a, .post__title a')
-                    if not title_elem:
-                        continue
-                        
-                    title = title_elem.get_text().strip()
-                    link = title_elem.get('href', '')
-                    if link and not link.startswith('http'):
-                        link = f"https://habr.com{link}"
-                    
-                    # Ищем краткое описание
-                    summary_elem = article.select_one('.article__descr, .post__text, .tm-article-snippet')
-                    summary = summary_elem.get_text().strip() if summary_elem else ''
-                    
-                    # Ищем дату
-                    date_elem = article.select_one('.tm-article-meta__date, .post__date, time')
-                    date = date_elem.get_text().strip() if date_elem else ''
-                    
-                    # Ищем изображение
-                    image_url = ''
-                    
-                    # Попробуем разные селекторы для изображений
-                    img_selectors = [
-                        '.tm-article-snippet__cover img',  # Обложка статьи
-                        '.article__cover img',  # Альтернативный селектор
-                        '.post__cover img',  # Еще один вариант
-                        'img[src*=".jpg"]',  # JPG изображения
-                        'img[src*=".png"]',  # PNG изображения
-                        'img[src*=".webp"]',  # WebP изображения
-                        'img'  # Любое изображение как fallback
-                    ]
-                    
-                    for selector in img_selectors:
-                        img_elem = article.select_one(selector)
-                        if img_elem and img_elem.get('src'):
-                            image_url = img_elem.get('src')
-                            
-                            # Пропускаем только явные аватары
-                            if 'avatar' in image_url.lower() and 'upload_files' not in image_url:
-                                continue
-                            
-                            # Проверяем, что это действительно изображение
-                            if any(ext in image_url.lower() for ext in ['.jpg', '.jpeg', '.png', '.webp', '.gif']):
-                                break
-                            # Если нет расширения, но есть habr.com в URL
-                            elif 'habr.com' in image_url:
-                                break
-                    
-                    # Если нашли изображение, нормализуем URL
-                    if image_url:
-                        if image_url.startswith('//'):
-                            image_url = 'https:' + image_url
-                        elif image_url.startswith('/'):
-                            image_url = 'https://habr.com' + image_url
-                        elif not image_url.startswith('http'):
-                            image_url = 'https://habr.com' + image_url
-                        
-                        # Улучшаем качество изображения
-                        # Заменяем уменьшенные версии на оригинальные
-                        if '/r/w48/' in image_url:
-                            # w48 = 48px ширина, заменяем на w1200 (1200px)
-                            image_url = image_url.replace('/r/w48/', '/r/w1200/')
-                        elif '/r/w96/' in image_url:
-                            # w96 = 96px ширина, заменяем на w1200
-                            image_url = image_url.replace('/r/w96/', '/r/w1200/')
-                        elif '/r/w156/' in image_url:
-                            # w156 = 156px ширина, заменяем на w1200
-                            image_url = image_url.replace('/r/w156/', '/r/w1200/')
-                        elif '/r/w312/' in image_url:
-                            # w312 = 312px ширина, заменяем на w1200
-                            image_url = image_url.replace('/r/w312/', '/r/w1200/')
-                        elif '/r/w624/' in image_url:
-                            # w624 = 624px ширина, заменяем на w1200
-                            image_url = image_url.replace('/r/w624/', '/r/w1200/')
-                        
-                        # Также пробуем найти оригинальное изображение без размеров
-                        if '/r/w' in image_url:
-                            # Убираем размеры полностью для получения оригинала
-                            original_url = re.sub(r'/r/w\d+/', '/', image_url)
-                            # Проверяем, что это все еще изображение
-                            if any(ext in original_url.lower() for ext in ['.jpg', '.jpeg', '.png', '.webp', '.gif']):
-                                image_url = original_url
-                    
-                    # Если не нашли изображение статьи, пробуем найти в CSS background-image
-                    if not image_url:
-                        style_elem = article.select_one('[style*="background-image"]')
-                        if style_elem:
-                            style = style_elem.get('style', '')
-                            bg_match = re.search(r'background-image:\s*url\(["\']?([^"\')\s]+)["\']?\)', style)
-                            if bg_match:
-                                bg_url = bg_match.group(1)
-                                # Пропускаем только явные аватары
-                                if 'avatar' not in bg_url.lower() or 'upload_files' in bg_url:
-                                    if bg_url.startswith('//'):
-                                        image_url = 'https:' + bg_url
-                                    elif bg_url.startswith('/'):
-                                        image_url = 'https://habr.com' + bg_url
-                                    elif not bg_url.startswith('http'):
-                                        image_url = 'https://habr.com' + bg_url
-                                    
-                                    # Улучшаем качество CSS изображения
-                                    if '/r/w48/' in image_url:
-                                        image_url = image_url.replace('/r/w48/', '/r/w1200/')
-                                    elif '/r/w96/' in image_url:
-                                        image_url = image_url.replace('/r/w96/', '/r/w1200/')
-                                    elif '/r/w156/' in image_url:
-                                        image_url = image_url.replace('/r/w156/', '/r/w1200/')
-                                    elif '/r/w312/' in image_url:
-                                        image_url = image_url.replace('/r/w312/', '/r/w1200/')
-                                    elif '/r/w624/' in image_url:
-                                        image_url = image_url.replace('/r/w624/', '/r/w1200/')
-                                    
-                                    # Пробуем оригинал без размеров
-                                    if '/r/w' in image_url:
-                                        original_url = re.sub(r'/r/w\d+/', '/', image_url)
-                                        if any(ext in original_url.lower() for ext in ['.jpg', '.jpeg', '.png', '.webp', '.gif']):
-                                            image_url = original_url
-                    
-                    if title and link:
-                        # Очищаем HTML из summary
-                        clean_summary = self._clean_html_text(summary)
-                        summary = clean_summary[:200] + '...' if len(clean_summary) > 200 else summary
-                        
-                        articles.append({
-                            'title': title,
-                            'link': link,
-                            'summary': summary,
-                            'date': date,
-                            'source': 'habr.com',
-                            'image_url': image_url
-                        })
-                        
-                except Exception as e:
-                    continue
-            
-            return articles[:limit]
+            return await self.parse.run(parse_habr_listing, response.body, limit)
             
         except Exception as e:
             print(f"Ошибка при HTML парсинге Habr: {e}")
             return []
     
-    def search_by_query(self, query: str, limit: int = 10) -> List[Dict]:
-        """Поиск новостей по произвольному запросу"""
+    async def search_by_query(self, query: str, limit: int = 10) -> List[Post]:
+        """
+        Поиск новостей по произвольному запросу
+        Результаты кэшируются по нормализованному запросу: "Python  AI" и "ai python" - один запрос к Habr
+        """
+        key = normalize_query(query)
+        if not key:
+            return []
         try:
-            # Кодируем запрос для URL
-            encoded_query = quote(query)
-            search_url = f"https://habr.com/ru/search/?q={encoded_query}"
-            
-            # Выполняем поиск
-            response = self.session.get(search_url, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Ищем статьи на странице результатов поиска
-            articles = soup.select('.tm-articles-list__item, .article, .post, .tm-article-card')
-            
-            news_list = []
-            for article in articles:
-                title_elem = article.select_one('.tm-title a, h2 a, h3 a, .tm-article-card__title a')
-                if title_elem:
-                    title = title_elem.get_text().strip()
-                    link = title_elem.get('href', '')
-                    if link and not link.startswith('http'):
-                        link = f"https://habr.com{link}"
-                    
-                    # Ищем краткое описание
-                    summary_elem = article.select_one('.article__descr, .post__text, .tm-article-snippet, .tm-article-card__snippet')
-                    summary = summary_elem.get_text().strip() if summary_elem else ''
-                    
-                    # Ищем изображение
-                    image_url = ''
-                    
-                    # Попробуем разные селекторы для изображений
-                    img_selectors = [
-                        '.tm-article-snippet__cover img',  # Обложка статьи
-                        '.article__cover img',  # Альтернативный селектор
-                        '.post__cover img',  # Еще один вариант
-                        'img[src*=".jpg"]',  # JPG изображения
-                        'img[src*=".png"]',  # PNG изображения
-                        'img[src*=".webp"]',  # WebP изображения
-                        'img'  # Любое изображение как fallback
-                    ]
-                    
-                    for selector in img_selectors:
-                        img_elem = article.select_one(selector)
-                        if img_elem and img_elem.get('src'):
-                            image_url = img_elem.get('src')
-                            
-                            # Пропускаем только явные аватары
-                            if any(skip_word in image_url.lower() for skip_word in ['avatar', 'emoji', 'smile', 'icon']):
-                                continue
-                            
-                            # Пропускаем изображения с определенными размерами (обычно аватары)
-                            if any(size in image_url for size in ['/r/w48/', '/r/w96/', '/r/w156/', '/r/w312/', '/r/w624/']):
-                                continue
-                            
-                            # Проверяем, что это действительно изображение статьи
-                            if any(ext in image_url.lower() for ext in ['.jpg', '.jpeg', '.png', '.webp', '.gif']):
-                                # Дополнительная проверка - пропускаем аватары по размеру
-                                if 'upload_files' in image_url or 'habr' in image_url:
-                                    break
-                            # Если нет расширения, но есть habr.com в URL
-                            elif 'habr.com' in image_url and 'upload_files' in image_url:
-                                break
-                    
-                    # Если нашли изображение, нормализуем URL
-                    if image_url:
-                        if image_url.startswith('//'):
-                            image_url = 'https:' + image_url
-                        elif image_url.startswith('/'):
-                            image_url = 'https://habr.com' + image_url
-                        elif not image_url.startswith('http'):
-                            image_url = 'https://habr.com' + image_url
-                        
-                        # Улучшаем качество изображения
-                        # Заменяем уменьшенные версии на оригинальные
-                        if '/r/w48/' in image_url:
-                            # w48 = 48px ширина, заменяем на w1200 (1200px)
-                            image_url = image_url.replace('/r/w48/', '/r/w1200/')
-                        elif '/r/w96/' in image_url:
-                            # w96 = 96px ширина, заменяем на w1200
-                            image_url = image_url.replace('/r/w96/', '/r/w1200/')
-                        elif '/r/w156/' in image_url:
-                            # w156 = 156px ширина, заменяем на w1200
-                            image_url = image_url.replace('/r/w156/', '/r/w1200/')
-                        elif '/r/w312/' in image_url:
-                            # w312 = 312px ширина, заменяем на w1200
-                            image_url = image_url.replace('/r/w312/', '/r/w1200/')
-                        elif '/r/w624/' in image_url:
-                            # w624 = 624px ширина, заменяем на w1200
-                            image_url = image_url.replace('/r/w624/', '/r/w1200/')
-                        
-                        # Также пробуем найти оригинальное изображение без размеров
-                        if '/r/w' in image_url:
-                            # Убираем размеры полностью для получения оригинала
-                            original_url = re.sub(r'/r/w\d+/', '/', image_url)
-                            # Проверяем, что это все еще изображение
-                            if any(ext in original_url.lower() for ext in ['.jpg', '.jpeg', '.png', '.webp', '.gif']):
-                                image_url = original_url
-                    
-                    # Если не нашли изображение статьи, пробуем найти в CSS background-image
-                    if not image_url:
-                        style_elem = article.select_one('[style*="background-image"]')
-                        if style_elem:
-                            style = style_elem.get('style', '')
-                            bg_match = re.search(r'background-image:\s*url\(["\']?([^"\')\s]+)["\']?\)', style)
-                            if bg_match:
-                                bg_url = bg_match.group(1)
-                                # Пропускаем только явные аватары
-                                if not any(skip_word in bg_url.lower() for skip_word in ['avatar', 'emoji', 'smile', 'icon']):
-                                    if bg_url.startswith('//'):
-                                        image_url = 'https:' + bg_url
-                                    elif bg_url.startswith('/'):
-                                        image_url = 'https://habr.com' + bg_url
-                                    elif not bg_url.startswith('http'):
-                                        image_url = 'https://habr.com' + bg_url
-                                    
-                                    # Улучшаем качество CSS изображения
-                                    if '/r/w48/' in image_url:
-                                        image_url = image_url.replace('/r/w48/', '/r/w1200/')
-                                    elif '/r/w96/' in image_url:
-                                        image_url = image_url.replace('/r/w96/', '/r/w1200/')
-                                    elif '/r/w156/' in image_url:
-                                        image_url = image_url.replace('/r/w156/', '/r/w1200/')
-                                    elif '/r/w312/' in image_url:
-                                        image_url = image_url.replace('/r/w312/', '/r/w1200/')
-                                    elif '/r/w624/' in image_url:
-                                        image_url = image_url.replace('/r/w624/', '/r/w1200/')
-                                    
-                                    # Пробуем оригинал без размеров
-                                    if '/r/w' in image_url:
-                                        original_url = re.sub(r'/r/w\d+/', '/', image_url)
-                                        if any(ext in original_url.lower() for ext in ['.jpg', '.jpeg', '.png', '.webp', '.gif']):
-                                            image_url = original_url
-                    
-                    if title and link:
-                        # Очищаем HTML из summary
-                        clean_summary = self._clean_html_text(summary)
-                        summary = clean_summary[:200] + '...' if len(clean_summary) > 200 else clean_summary
-                        
-                        news_list.append({
-                            'title': title,
-                            'link': link,
-                            'summary': summary,
-                            'date': '',
-                            'source': 'habr.com',
-                            'image_url': image_url
-                        })
+            found = self.search_cache.get(key)
+            if found is None:
+                # Одинаковые запросы разных пользователей ждут одну загрузку
+                found = await self._flight.do(('search', key), lambda: self.refresh_search(query))
+            else:
+                logger.debug(f"Поиск '{key}' взят из кэша")
             
-            return news_list
+            # Статьи неизменяемы, поэтому общий результат отдается без копирования
+            return found[:limit]
             
         except Exception as e:
             print(f"Ошибка поиска по запросу '{query}': {e}")
             # В случае ошибки возвращаем пустой список
             return []
     
-    def parse_full_article(self, url: str) -> Dict:
+    async def refresh_search(self, query: str) -> List[Post]:
+        """
+        Выполняет поиск на Habr и кладет результат в кэш (используется и для фонового обновления).
+        На Habr уходит запрос в том виде, в каком его ввел пользователь (порядок слов важен для поиска),
+        нормализованная форма - только ключ кэша
+        """
+        key = normalize_query(query)
+        # Кодируем запрос для URL
+        encoded_query = quote(' '.join(query.split()))
+        search_url = f"https://habr.com/ru/search/?q={encoded_query}"
+        
+        # Выполняем поиск
+        response = await self.http.fetch(search_url, timeout=10)
+        response.raise_for_status()
+        
+        found = await self.parse.run(parse_habr_search, response.body)
+        # Пустой результат держим недолго: статьи по запросу могут скоро появиться
+        self.search_cache.set(key, found, ttl=None if found else EMPTY_SEARCH_TTL)
+        return found
+    
+    async def parse_full_article(self, url: str) -> Dict:
         """Парсинг полной статьи с Habr"""
         try:
-            response = self.session.get(url, timeout=10)
+            response = await self.http.fetch(url, timeout=10)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Специфичные селекторы для Habr
-            content = soup.select_one('.article-formatted-body, .post__text, .tm-article-body, .tm-article-content')
+            article = await self.parse.run(parse_habr_article, response.body)
+            if article:
+                return article
+            # Если не нашли специфичный контент, разбираем ту же страницу базовым методом
+            return await self.parse.run(parse_article_page, response.body)
             
-            if content:
-                # Удаляем скрипты и стили
-                for script in content(["script", "style", "aside", ".tm-article-comments", "noscript", "iframe"]):
-                    script.decompose()
-                
-                # Получаем текст
-                full_text = content.get_text(strip=False)
-                full_text = ' '.join(full_text.split())
-                
-                # Получаем заголовок
-                title_elem = soup.select_one('h1.tm-title, .post__title, h1, title')
-                title = title_elem.get_text().strip() if title_elem else 'Без заголовка'
-                
-                # Ограничиваем длину
-                if len(full_text) > 3000:
-                    full_text = full_text[:3000] + '...\n\n(Продолжение на сайте)'
-                
-                return {
-                    'success': True,
-                    'content': full_text,
-                    'title': title
-                }
-            else:
-                # Если не нашли специфичный контент, используем базовый метод
-                return super().parse_full_article(url)
-                
         except Exception as e:
             return {
                 'success': False,
                 'error': f'Ошибка при парсинге статьи Habr: {str(e)}'
             }
 
-    def get_more_news(self, offset: int = 0, limit: int = 5) -> List[Dict]:
-        """Получение дополнительных новостей с Habr (для кнопки 'Еще')"""
+    async def get_more_news(self, offset: int = 0, limit: int = 5, after: Optional[str] = None) -> List[Post]:
+        """
+        Получение дополнительных новостей с Habr (для кнопки 'Еще')
+        after - ссылка на последнюю статью, которая уже есть у пользователя (курсор); если задан, offset не используется.
+        Уже загруженные статьи отдаются из окна, сеть нужна только для недостающих страниц ленты.
+        """
         try:
-            # Используем RSS для получения большего количества новостей
-            rss_url = "https://habr.com/ru/rss/all/"
-            
-            # Парсим RSS
-            feed = feedparser.parse(rss_url)
-            posts = []
-            
-            for entry in feed.entries[:limit]:
-                title = entry.get('title', '')
-                link = entry.get('link', '')
-                summary = entry.get('summary', '')
-                published = entry.get('published', '')
-                
-                # Ищем изображение в RSS
-                image_url = ''
-                
-                # Пробуем найти изображение в media_content
-                if hasattr(entry, 'media_content') and entry.media_content:
-                    for media in entry.media_content:
-                        if media.get('type', '').startswith('image/'):
-                            image_url = media.get('url', '')
-                            if image_url:
-                                break
-                
-                # Если не нашли в media_content, пробуем media_thumbnail
-                if not image_url and hasattr(entry, 'media_thumbnail') and entry.media_thumbnail:
-                    for thumb in entry.media_thumbnail:
-                        image_url = thumb.get('url', '')
-                        if image_url:
-                            break
-                
-                # Если все еще не нашли, пробуем извлечь из summary
-                if not image_url and summary:
-                    # Ищем img теги в summary
-                    soup = BeautifulSoup(summary, 'html.parser')
-                    img_tag = soup.find('img')
-                    if img_tag and img_tag.get('src'):
-                        image_url = img_tag.get('src')
-                
-                # Нормализуем URL изображения
-                if image_url:
-                    if image_url.startswith('//'):
-                        image_url = 'https:' + image_url
-                    elif image_url.startswith('/'):
-                        image_url = 'https://habr.com' + image_url
-                    elif not image_url.startswith('http'):
-                        image_url = 'https://habr.com' + image_url
-                    
-                    # Улучшаем качество изображения
-                    if '/r/w48/' in image_url:
-                        image_url = image_url.replace('/r/w48/', '/r/w1200/')
-                    elif '/r/w96/' in image_url:
-                        image_url = image_url.replace('/r/w96/', '/r/w1200/')
-                    elif '/r/w156/' in image_url:
-                        image_url = image_url.replace('/r/w156/', '/r/w1200/')
-                    elif '/r/w312/' in image_url:
-                        image_url = image_url.replace('/r/w312/', '/r/w1200/')
-                    elif '/r/w624/' in image_url:
-                        image_url = image_url.replace('/r/w624/', '/r/w1200/')
-                    
-                    # Пробуем оригинал без размеров
-                    if '/r/w' in image_url:
-                        original_url = re.sub(r'/r/w\d+/', '/', image_url)
-                        if any(ext in original_url.lower() for ext in ['.jpg', '.jpeg', '.png', '.webp', '.gif']):
-                            image_url = original_url
-                
-                # Очищаем summary от HTML тегов
-                if summary:
-                    soup = BeautifulSoup(summary, 'html.parser')
-                    summary = soup.get_text(separator=' ', strip=True)
-                
-                posts.append({
-                    'title': title,
-                    'link': link,
-                    'summary': summary,
-                    'date': published,
-                    'image_url': image_url,
-                    'source': 'habr.com'
-                })
+            window = await self._get_window(offset + limit if after is None else 0)
+            if after is not None:
+                start = window.position_after(after)
+                if start is None:
+                    # Курсор старше окна (например, после перезапуска) - ищем его на следующих страницах
+                    await self._get_window(len(window) + HABR_PAGE_SIZE * 3)
+                    start = window.position_after(after)
+                    if start is None:
+                        logger.warning(f"Статья-курсор не найдена в ленте Habr: {after}")
+                        return []
+            else:
+                start = offset
             
-            return posts
+            await self._get_window(start + limit)
+            return window.articles[start:start + limit]
             
         except Exception as e:
             print(f"Ошибка при получении дополнительных новостей с Habr: {e}")
-            return []
\ No newline at end of file
+            return []
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Построение BeautifulSoup-деревьев для всех парсеров
+Один настраиваемый бэкенд (по умолчанию lxml) и SoupStrainer-фильтры,
+которые строят только нужные части страницы вместо всего документа
+"""
+
+import logging
+from typing import Iterable, Optional, Union
+
+from bs4 import BeautifulSoup, FeatureNotFound, SoupStrainer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BACKEND = 'lxml'
+FALLBACK_BACKEND = 'html.parser'
+
+_backend = DEFAULT_BACKEND
+
+
+def set_html_backend(name: str):
+    """Выбирает парсер для BeautifulSoup: 'lxml', 'html.parser' или 'html5lib'"""
+    global _backend
+    try:
+        BeautifulSoup('', name)
+    except FeatureNotFound:
+        logger.warning(f"HTML-парсер {name} не установлен, используется {FALLBACK_BACKEND}")
+        name = FALLBACK_BACKEND
+    _backend = name
+
+
+def get_html_backend() -> str:
+    return _backend
+
+
+def make_soup(markup: Union[str, bytes], only: Optional[SoupStrainer] = None,
+              backend: Optional[str] = None) -> BeautifulSoup:
+    """Строит дерево выбранным бэкендом. С only строятся только подходящие элементы и их потомки"""
+    return BeautifulSoup(markup, backend or _backend, parse_only=only)
+
+
+def _classes(attrs) -> list:
+    value = attrs.get('class') or ''
+    return value.split() if isinstance(value, str) else list(value)
+
+
+def strainer(tags: Iterable[str] = (), classes: Iterable[str] = (),
+             class_contains: Iterable[str] = ()) -> SoupStrainer:
+    """
+    Фильтр элементов по имени тега, точному классу или подстроке в классе.
+    Проверяется только самый внешний подходящий элемент: его поддерево строится целиком.
+    """
+    tags = frozenset(tags)
+    classes = frozenset(classes)
+    class_contains = tuple(class_contains)
+
+    def match(name, attrs=None) -> bool:
+        if not isinstance(name, str):  # вызов с готовым Tag (find/select по фильтру)
+            name, attrs = name.name, name.attrs
+        if name in tags:
+            return True
+        if not attrs:
+            return False
+        for css_class in _classes(attrs):
+            if css_class in classes or any(part in css_class for part in class_contains):
+                return True
+        return False
+
+    return SoupStrainer(match)
+
+
+# Посты на странице t.me/s/<channel>
+TELEGRAM_MESSAGES = strainer(classes=('tgme_widget_message',))
+# Страница одного поста: сам пост и запасные варианты из BaseParser._parse_telegram_post
+TELEGRAM_POST = strainer(class_contains=('message', 'post'))
+# Списки статей Habr (главная, лента, поиск)
+HABR_ARTICLE_LIST = strainer(classes=('tm-articles-list__item', 'article', 'post', 'tm-article-card'))
+# Страница статьи Habr: тело и заголовок
+HABR_ARTICLE = strainer(
+    tags=('h1', 'title'),
+    classes=('article-formatted-body', 'post__text', 'tm-article-body', 'tm-article-content', 'tm-title', 'post__title'),
+)
+# Произвольная статья: типичные контейнеры контента и заголовок
+ARTICLE_CONTENT = strainer(
+    tags=('article', 'main', 'title'),
+    classes=('article', 'post', 'content', 'entry-content', 'post-content', 'main-content'),
+)
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Общий асинхронный HTTP-клиент для парсеров
+Один aiohttp-коннектор на процесс с ограничением соединений на хост,
+лимитом частоты запросов и circuit breaker для каждого хоста
+"""
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Mapping, Optional, Tuple
+from urllib.parse import urlparse
+
+import aiohttp
+
+from .resilience import CircuitBreaker, CircuitOpenError, TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Лимиты запросов на хост: (запросов в секунду, максимальный всплеск)
+HOST_RATE_LIMITS = {
+    't.me': (5.0, 10),
+    'habr.com': (3.0, 6),
+}
+DEFAULT_RATE_LIMIT = (10.0, 20)
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+
+class HttpStatusError(Exception):
+    """Ответ сервера с кодом ошибки (4xx/5xx)"""
+
+    def __init__(self, status: int, url: str):
+        super().__init__(f"HTTP {status} для {url}")
+        self.status = status
+        self.url = url
+
+
+class HttpResponse:
+    """Полностью прочитанный ответ: код, заголовки и тело"""
+
+    def __init__(self, url: str, status: int, headers: Mapping[str, str], body: bytes, charset: Optional[str] = None):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.charset = charset or 'utf-8'
+
+    @property
+    def text(self) -> str:
+        return self.body.decode(self.charset, errors='replace')
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise HttpStatusError(self.status, self.url)
+
+
+class HttpClient:
+    def __init__(self, limit: int = 100, limit_per_host: int = 8, timeout: float = 10,
+                 headers: Optional[Dict[str, str]] = None,
+                 rate_limits: Optional[Dict[str, Tuple[float, float]]] = None,
+                 max_rate_wait: float = 3, failure_threshold: int = 3, reset_timeout: float = 30):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.timeout = timeout
+        self.headers = dict(headers or DEFAULT_HEADERS)
+        self.rate_limits = dict(HOST_RATE_LIMITS if rate_limits is None else rate_limits)
+        self.max_rate_wait = max_rate_wait
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._lock = asyncio.Lock()
+
+    def _bucket(self, host: str) -> TokenBucket:
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            rate, capacity = self.rate_limits.get(host, DEFAULT_RATE_LIMIT)
+            bucket = self._buckets[host] = TokenBucket(rate, capacity)
+        return bucket
+
+    def breaker(self, host: str) -> CircuitBreaker:
+        breaker = self._breakers.get(host)
+        if breaker is None:
+            breaker = self._breakers[host] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+        return breaker
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        """Возвращает общую сессию, создавая ее при первом обращении"""
+        if self._session is None or self._session.closed:
+            async with self._lock:
+                if self._session is None or self._session.closed:
+                    connector = aiohttp.TCPConnector(
+                        limit=self.limit,
+                        limit_per_host=self.limit_per_host,
+                        ttl_dns_cache=300,
+                    )
+                    self._session = aiohttp.ClientSession(
+                        connector=connector,
+                        headers=self.headers,
+                        timeout=aiohttp.ClientTimeout(total=self.timeout),
+                    )
+        return self._session
+
+    @asynccontextmanager
+    async def stream(self, url: str, headers: Optional[Dict[str, str]] = None,
+                     timeout: Optional[float] = None) -> AsyncIterator[aiohttp.ClientResponse]:
+        """
+        GET-запрос с потоковым чтением тела (response.content.iter_chunked). Код ответа не проверяется.
+        Запросы к хосту ограничиваются token bucket, а хост, который подряд отвечает
+        ошибками или не отвечает, отключается circuit breaker до истечения паузы.
+        """
+        host = (urlparse(url).hostname or '').lower()
+        breaker = self.breaker(host)
+        if not breaker.allow():
+            raise CircuitOpenError(host, breaker.retry_in())
+        
+        try:
+            await self._bucket(host).acquire(max_wait=self.max_rate_wait)
+            session = await self.get_session()
+            request_timeout = aiohttp.ClientTimeout(total=timeout) if timeout else None
+            async with session.get(url, headers=headers, timeout=request_timeout) as response:
+                self._record_status(host, breaker, response)
+                yield response
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            breaker.record_failure()
+            raise
+        except BaseException:
+            breaker.release_probe()
+            raise
+
+    def _record_status(self, host: str, breaker: CircuitBreaker, response: aiohttp.ClientResponse):
+        if response.status == 429:
+            retry_after = response.headers.get('Retry-After', '')
+            breaker.record_failure(cooldown=float(retry_after) if retry_after.isdigit() else self.reset_timeout)
+            logger.warning(f"Хост {host} ограничивает запросы (429)")
+        elif response.status >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+
+    async def fetch(self, url: str, headers: Optional[Dict[str, str]] = None,
+                    timeout: Optional[float] = None) -> HttpResponse:
+        """GET-запрос через общий пул соединений с чтением всего тела. Код ответа не проверяется."""
+        async with self.stream(url, headers=headers, timeout=timeout) as response:
+            body = await response.read()
+            # Заголовки остаются регистронезависимыми (CIMultiDictProxy)
+            return HttpResponse(str(response.url), response.status, response.headers, body, response.charset)
+
+    async def get_text(self, url: str, headers: Optional[Dict[str, str]] = None,
+                       timeout: Optional[float] = None) -> str:
+        """GET-запрос, возвращает тело ответа как текст. Бросает исключение при ошибке HTTP"""
+        response = await self.fetch(url, headers=headers, timeout=timeout)
+        response.raise_for_status()
+        return response.text
+
+    async def get_bytes(self, url: str, headers: Optional[Dict[str, str]] = None,
+                        timeout: Optional[float] = None) -> bytes:
+        """GET-запрос, возвращает тело ответа как байты. Бросает исключение при ошибке HTTP"""
+        response = await self.fetch(url, headers=headers, timeout=timeout)
+        response.raise_for_status()
+        return response.body
+
+    async def close(self):
+        """Закрывает сессию и коннектор"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+_shared_client: Optional[HttpClient] = None
+
+
+def get_http_client() -> HttpClient:
+    """Возвращает HTTP-клиент, общий для всего процесса"""
+    global _shared_client
+    if _shared_client is None:
+        _shared_client = HttpClient()
+    return _shared_client
+
+
+async def close_http_client():
+    """Закрывает общий HTTP-клиент (вызывается при остановке бота)"""
+    global _shared_client
+    if _shared_client is not None:
+        await _shared_client.close()
+        _shared_client = None
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Разбор HTML в пуле процессов
+BeautifulSoup - чистый Python и занимает CPU, который нужен event loop бота для обработки апдейтов.
+Парсеры передают сюда сырые байты страницы и модульную функцию разбора, а получают обычные словари.
+"""
+
+import asyncio
+import functools
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+from .html_backend import get_html_backend, set_html_backend
+
+logger = logging.getLogger(__name__)
+
+
+def _init_worker(html_backend: str):
+    # Процессы запускаются через spawn и не видят настройки родителя
+    set_html_backend(html_backend)
+
+
+class ParseService:
+    def __init__(self, workers: int = 0):
+        """workers=0 - разбор в текущем процессе (без пула)"""
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                # fork из процесса с event loop и потоками небезопасен
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(get_html_backend(),),
+            )
+        return self._executor
+
+    async def run(self, func: Callable[..., Any], *args) -> Any:
+        """
+        Выполняет func(*args) в пуле процессов.
+        func должна быть функцией уровня модуля, а аргументы и результат - сериализуемыми (pickle).
+        """
+        if self.workers <= 0:
+            return func(*args)
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._get_executor(), functools.partial(func, *args))
+        except BrokenProcessPool:
+            # Процесс пула упал (например, OOM) - следующий вызов создаст новый пул
+            logger.error("Пул процессов разбора HTML сломан, пересоздаем")
+            self._executor = None
+            raise
+
+    def shutdown(self):
+        """Останавливает процессы пула (вызывается при остановке бота)"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Компактная неизменяемая модель поста
+Пост хранит поля в __slots__ вместо словаря. Заголовок постов Telegram не хранится, а вычисляется
+из начала текста при обращении. Повторяющиеся строки (источник, ссылка на канал, дата) интернируются,
+поэтому все посты одного канала ссылаются на одни и те же объекты строк.
+Для совместимости с остальным кодом пост ведет себя как словарь только для чтения:
+post['link'], post.get('image_url'), 'views' in post, dict(post), {**post}.
+"""
+
+import sys
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, Optional
+
+# Длина заголовка, который строится из текста поста
+TITLE_LENGTH = 100
+
+# Поля в порядке, в котором они перечисляются в keys()
+FIELDS = ('title', 'text', 'link', 'source', 'date', 'views', 'channel_url',
+          'image_url', 'video_url', 'animation_url', 'summary')
+_STORED = FIELDS[1:]
+_INTERNED = ('source', 'date', 'channel_url')
+
+
+def title_from_text(text: str) -> str:
+    """Заголовок поста Telegram: первые TITLE_LENGTH символов текста"""
+    return text[:TITLE_LENGTH] + "..." if len(text) > TITLE_LENGTH else text
+
+
+def _intern(value: Any) -> Any:
+    return sys.intern(value) if type(value) is str else value
+
+
+class Post(Mapping):
+    """
+    Пост ленты (Telegram или Habr). Поля, которых нет у поста, равны '' (views - 0).
+    Нестандартные поля (например, duplicate_sources) хранятся в extra.
+    Пост не меняется после создания: replace() возвращает новый пост
+    """
+
+    __slots__ = ('_title',) + _STORED + ('extra',)
+
+    def __init__(self, title: Optional[str] = None, text: str = '', link: str = '', source: str = '',
+                 date: str = '', views: int = 0, channel_url: str = '', image_url: str = '',
+                 video_url: str = '', animation_url: str = '', summary: str = '',
+                 extra: Optional[Dict[str, Any]] = None):
+        # Заголовок, совпадающий с началом текста, не храним: он вычисляется заново
+        self._title = None if title is None or (text and title == title_from_text(text)) else title
+        self.text = text or ''
+        self.link = link or ''
+        self.source = _intern(source or '')
+        self.date = _intern(date or '')
+        self.views = views or 0
+        self.channel_url = _intern(channel_url or '')
+        self.image_url = image_url or ''
+        self.video_url = video_url or ''
+        self.animation_url = animation_url or ''
+        self.summary = summary or ''
+        self.extra = extra or None
+
+    @classmethod
+    def from_mapping(cls, data: Mapping) -> "Post":
+        """Пост из словаря (строки базы, старые сессии); посты возвращаются как есть"""
+        if isinstance(data, Post):
+            return data
+        fields = {}
+        extra = {}
+        for key, value in data.items():
+            if key in FIELDS:
+                fields[key] = value
+            else:
+                extra[key] = value
+        return cls(**fields, extra=extra)
+
+    @property
+    def title(self) -> str:
+        return self._title if self._title is not None else title_from_text(self.text)
+
+    def replace(self, **changes: Any) -> "Post":
+        """Копия поста с измененными полями. Если ничего не меняется, возвращается сам пост"""
+        if all(self.get(key) == value for key, value in changes.items()):
+            return self
+        fields = {key: getattr(self, key) for key in _STORED}
+        fields['title'] = self._title
+        extra = dict(self.extra or ())
+        for key, value in changes.items():
+            if key in FIELDS:
+                fields[key] = value
+            else:
+                extra[key] = value
+        return Post(**fields, extra=extra)
+
+    def __getitem__(self, key: str) -> Any:
+        if key in FIELDS:
+            return getattr(self, key)
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        # Быстрее, чем Mapping.get через исключение KeyError
+        if key in FIELDS:
+            return getattr(self, key)
+        if self.extra:
+            return self.extra.get(key, default)
+        return default
+
+    def __contains__(self, key: object) -> bool:
+        return key in FIELDS or bool(self.extra) and key in self.extra
+
+    def __iter__(self) -> Iterator[str]:
+        yield from FIELDS
+        if self.extra:
+            yield from self.extra
+
+    def __len__(self) -> int:
+        return len(FIELDS) + len(self.extra or ())
+
+    def __reduce__(self):
+        # Компактная сериализация для пула процессов ParseService
+        return Post, (self._title,) + tuple(getattr(self, key) for key in _STORED) + (self.extra,)
+
+    def __repr__(self) -> str:
+        return f"Post({self.link!r}, source={self.source!r})"
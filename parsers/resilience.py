@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Ограничение частоты запросов и защита от падающих источников
+Token bucket на хост и circuit breaker, через которые проходят все запросы парсеров
+"""
+
+import asyncio
+import time
+from typing import Optional
+
+
+class RateLimitedError(Exception):
+    """Лимит запросов к хосту исчерпан, ждать пришлось бы слишком долго"""
+
+
+class CircuitOpenError(Exception):
+    """Хост временно отключен после серии ошибок"""
+
+    def __init__(self, host: str, retry_in: float):
+        super().__init__(f"Хост {host} временно недоступен, повтор через {retry_in:.0f} с")
+        self.host = host
+        self.retry_in = retry_in
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate              # токенов в секунду
+        self.capacity = capacity      # максимальный всплеск
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, tokens: float = 1) -> bool:
+        """Забирает токен без ожидания. Возвращает False, если токенов нет"""
+        self._refill()
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return True
+        return False
+
+    async def acquire(self, tokens: float = 1, max_wait: Optional[float] = None):
+        """
+        Резервирует токен и ждет его появления.
+        Если ждать пришлось бы дольше max_wait, бросает RateLimitedError.
+        """
+        self._refill()
+        self.tokens -= tokens
+        if self.tokens >= 0:
+            return
+        wait = -self.tokens / self.rate
+        if max_wait is not None and wait > max_wait:
+            self.tokens += tokens
+            raise RateLimitedError(f"Превышен лимит запросов, ожидание {wait:.1f} с")
+        await asyncio.sleep(wait)
+
+    def is_idle(self) -> bool:
+        """Корзина полностью восстановилась и ее можно удалить"""
+        self._refill()
+        return self.tokens >= self.capacity
+
+
+class CircuitBreaker:
+    """
+    closed -> (failure_threshold ошибок подряд) -> open -> (reset_timeout) -> half-open
+    В half-open пропускается один пробный запрос: успех закрывает цепь, ошибка снова открывает.
+    """
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_until = 0.0
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_until == 0:
+            return "closed"
+        if time.monotonic() < self.opened_until:
+            return "open"
+        return "half-open"
+
+    def allow(self) -> bool:
+        """Можно ли сейчас отправить запрос"""
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def retry_in(self) -> float:
+        return max(0.0, self.opened_until - time.monotonic())
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_until = 0.0
+        self._probe_in_flight = False
+
+    def release_probe(self):
+        """Пробный запрос не дошел до хоста (отмена, локальный лимит) - разрешаем новую пробу"""
+        self._probe_in_flight = False
+
+    def record_failure(self, cooldown: Optional[float] = None):
+        self.failures += 1
+        if self._probe_in_flight or self.failures >= self.failure_threshold or cooldown:
+            self.opened_until = time.monotonic() + (cooldown or self.reset_timeout)
+        self._probe_in_flight = False
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Потоковый разбор RSS/Atom лент
+Записи читаются через lxml.etree.iterparse по одной: каждая разобранная запись сразу удаляется из дерева,
+а чтение останавливается, как только набрано limit записей.
+Картинка и текст краткого описания извлекаются за один проход по его HTML.
+"""
+
+import html
+import logging
+from io import BytesIO
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from lxml import etree, html as lxml_html
+
+logger = logging.getLogger(__name__)
+
+# Элементы записи: item (RSS 2.0 и RSS 1.0) и entry (Atom)
+_ENTRY_TAGS = ('item', 'entry')
+_DATE_TAGS = ('pubDate', 'published', 'updated', 'date')
+# Чем меньше номер, тем предпочтительнее поле как краткое описание
+_SUMMARY_TAGS = {'description': 0, 'summary': 0, 'encoded': 1, 'content': 1}
+_SKIP_TEXT_TAGS = ('script', 'style')
+_MEDIA_NS = 'http://search.yahoo.com/mrss/'
+
+
+def _split_tag(tag) -> Tuple[str, str]:
+    # '{http://search.yahoo.com/mrss/}thumbnail' -> ('http://search.yahoo.com/mrss/', 'thumbnail')
+    if not isinstance(tag, str):
+        return '', ''
+    if tag.startswith('{'):
+        namespace, _, name = tag[1:].partition('}')
+        return namespace, name
+    return '', tag
+
+
+def _text(element) -> str:
+    return (element.text or '').strip()
+
+
+def summary_image_and_text(summary_html: str) -> Tuple[str, str]:
+    """
+    Возвращает (src первой картинки, чистый текст) из HTML краткого описания.
+    Текст соответствует BeautifulSoup.get_text(separator=' ', strip=True)
+    """
+    if not summary_html:
+        return '', ''
+    if '<' not in summary_html and '&' not in summary_html:
+        return '', summary_html.strip()
+    try:
+        root = lxml_html.fragment_fromstring(summary_html, create_parent='div')
+    except (etree.ParserError, ValueError):
+        return '', summary_html.strip()
+
+    image_url = ''
+    parts = []
+
+    def add(text):
+        if text:
+            text = text.strip()
+            if text:
+                parts.append(text)
+
+    for element in root.iter():
+        tag = element.tag
+        if isinstance(tag, str):
+            if tag == 'img' and not image_url:
+                image_url = element.get('src') or ''
+            if tag not in _SKIP_TEXT_TAGS:
+                add(element.text)
+        # Хвост элемента - текст родителя после него (в том числе после комментариев)
+        if element is not root:
+            add(element.tail)
+    return image_url, ' '.join(parts)
+
+
+def _media_url(element, name: str) -> Optional[str]:
+    """URL картинки из media:content / media:thumbnail / enclosure, если это изображение"""
+    url = element.get('url') or ''
+    if not url:
+        return None
+    if name == 'thumbnail':
+        return url
+    media_type = element.get('type') or ''
+    if media_type.startswith('image/') or element.get('medium') == 'image':
+        return url
+    return None
+
+
+def _read_entry(entry) -> Dict:
+    title = link = published = entry_id = ''
+    summary_html = ''
+    summary_rank = None
+    content_image = thumbnail = enclosure = ''
+
+    # iter() обходит и вложенные элементы (например, media:group с media:content)
+    for element in entry.iter():
+        if element is entry:
+            continue
+        namespace, name = _split_tag(element.tag)
+        if namespace == _MEDIA_NS:
+            if name == 'content' and not content_image:
+                content_image = _media_url(element, name) or ''
+            elif name == 'thumbnail' and not thumbnail:
+                thumbnail = _media_url(element, name) or ''
+        elif name == 'title' and not title:
+            # Заголовки часто приходят в CDATA с HTML-сущностями внутри
+            title = html.unescape(''.join(element.itertext()).strip())
+        elif name == 'link' and not link:
+            # RSS: <link>url</link>, Atom: <link rel="alternate" href="url"/>
+            if element.get('href'):
+                if element.get('rel', 'alternate') == 'alternate':
+                    link = element.get('href')
+            else:
+                link = _text(element)
+        elif name in _DATE_TAGS and not published:
+            published = _text(element)
+        elif name in ('guid', 'id') and not entry_id:
+            entry_id = _text(element)
+        elif name in _SUMMARY_TAGS:
+            rank = _SUMMARY_TAGS[name]
+            if summary_rank is None or rank < summary_rank:
+                text = element.text or ''
+                if len(element):
+                    # Atom type="xhtml": разметка лежит дочерними элементами, а не текстом
+                    text = ''.join(etree.tostring(child, encoding='unicode') for child in element)
+                if text.strip():
+                    summary_html = text
+                    summary_rank = rank
+        elif name == 'enclosure' and not enclosure:
+            enclosure = _media_url(element, name) or ''
+
+    summary_image, summary = summary_image_and_text(summary_html)
+    return {
+        'title': title,
+        'link': link,
+        'published': published,
+        'summary': summary,
+        'summary_html': summary_html,
+        'id': entry_id or link,
+        'image_url': content_image or thumbnail or enclosure or summary_image,
+    }
+
+
+def iter_feed_entries(data: bytes) -> Iterator[Dict]:
+    """Лениво выдает записи ленты. Поля: title, link, published, summary, summary_html, id, image_url"""
+    events = etree.iterparse(
+        BytesIO(data), events=('end',),
+        recover=True, resolve_entities=False, no_network=True, huge_tree=True,
+    )
+    try:
+        for _, element in events:
+            if _split_tag(element.tag)[1] not in _ENTRY_TAGS:
+                continue
+            yield _read_entry(element)
+            # Освобождаем разобранную запись и уже обработанных соседей
+            element.clear()
+            parent = element.getparent()
+            if parent is not None:
+                while element.getprevious() is not None:
+                    del parent[0]
+    except etree.XMLSyntaxError as e:
+        # recover=True разбирает большинство битых лент; то, что прочитано до ошибки, уже выдано
+        logger.warning(f"Ошибка разбора ленты: {e}")
+
+
+def parse_feed(data: bytes, limit: Optional[int] = None) -> List[Dict]:
+    """Первые limit записей ленты (все при limit=None). Функция уровня модуля - подходит для ParseService"""
+    entries = []
+    if limit is not None and limit <= 0:
+        return entries
+    for entry in iter_feed_entries(data):
+        entries.append(entry)
+        if limit is not None and len(entries) >= limit:
+            break
+    return entries
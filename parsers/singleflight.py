@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Single-flight: объединение одновременных одинаковых запросов
+Пока загрузка по ключу выполняется, остальные вызывающие ждут ее результат
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Set
+
+
+class SingleFlight:
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._waiters: Dict[asyncio.Task, int] = {}
+        self._abandonable: Set[asyncio.Task] = set()
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]], cancel_abandoned: bool = False) -> Any:
+        """
+        Выполняет func() один раз для всех одновременных вызовов с тем же key.
+        Отмена одного из ожидающих не прерывает общую загрузку для остальных.
+        cancel_abandoned=True (для фоновых загрузок, которые могут стать ненужными): если загрузку начал этот вызов
+        и все ожидающие ее отменены, загрузка тоже отменяется.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._inflight[key] = task
+            if cancel_abandoned:
+                self._abandonable.add(task)
+            task.add_done_callback(lambda t, k=key: self._done(k, t))
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            self._waiters[task] -= 1
+            if not self._waiters[task]:
+                del self._waiters[task]
+                if task in self._abandonable and not task.done():
+                    task.cancel()
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._inflight
+
+    def _done(self, key: Hashable, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        self._abandonable.discard(task)
+        # Помечаем исключение как полученное, даже если все ожидающие были отменены
+        if not task.cancelled():
+            task.exception()
@@ -4,259 +4,454 @@
 Упрощенная версия без фильтров
 """
 
-import requests
-from bs4 import BeautifulSoup
+import asyncio
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
+from bs4 import Tag
 from datetime import datetime, timedelta
 import re
 
+from .cache import TTLCache
+from .html_backend import TELEGRAM_MESSAGES, make_soup
+from .http_client import HttpClient, get_http_client
+from .parse_service import ParseService
+from .post import Post
+from .singleflight import SingleFlight
+
 logger = logging.getLogger(__name__)
 
+# Примерное количество постов на одной странице t.me/s/<channel>
+PAGE_SIZE = 20
+
+
+def _message_id(value: str) -> int:
+    """'rbc_news/12345' или 'https://t.me/rbc_news/12345' -> 12345 (0, если id нет)"""
+    tail = (value or '').rstrip('/').split('/')[-1].split('?')[0]
+    return int(tail) if tail.isdigit() else 0
+
+
+_BACKGROUND_IMAGE_RE = re.compile(r'''background-image:\s*url\(['"]?([^'")]+)['"]?\)''')
+
+
+def _background_image(style: str) -> str:
+    """url(...) из background-image в style (варианты url('...'), url("..."), url(...))"""
+    if 'background-image' not in style:
+        return ''
+    m = _BACKGROUND_IMAGE_RE.search(style)
+    return m.group(1) if m else ''
+
+
+def _scan_post(post_element: Tag) -> Dict[str, Tag]:
+    """
+    Один обход поддерева поста вместо отдельного CSS-запроса на каждое поле.
+    Для каждого ключа сохраняется первый подходящий элемент в порядке документа,
+    так же как это делал бы select_one с соответствующим селектором.
+    """
+    found: Dict[str, Any] = {}
+
+    def walk(node: Tag, in_date: bool, in_first_photo: bool, in_video: bool):
+        for child in node.children:
+            if not isinstance(child, Tag):
+                continue
+            name = child.name
+            classes = child.get('class') or ()
+            attrs = child.attrs
+
+            if 'tgme_widget_message_text' in classes:
+                found.setdefault('text', child)
+            if 'tgme_widget_message_views' in classes:
+                found.setdefault('views', child)
+            if 'tgme_widget_message_photo_wrap' in classes:
+                found.setdefault('photo_wrap', child)
+            is_date = 'tgme_widget_message_date' in classes
+            if is_date:
+                found.setdefault('date', child)
+            is_first_photo = 'tgme_widget_message_photo' in classes and 'photo' not in found
+            if is_first_photo:
+                found['photo'] = child
+            if 'data-video' in attrs:
+                found.setdefault('data_video', child)
+
+            if name == 'a':
+                href = attrs.get('href', '')
+                if in_date:
+                    found.setdefault('date_link', child)
+                if 'message_link' not in found and href and '/' in href and href.split('/')[-1].isdigit():
+                    found['message_link'] = child
+                if href.endswith('.mp4'):
+                    found.setdefault('mp4_link', child)
+                if href.endswith('.gif'):
+                    found.setdefault('gif_link', child)
+            elif name == 'img':
+                src = attrs.get('src', '')
+                if in_first_photo:
+                    found.setdefault('photo_img', child)
+                if src.endswith('.gif'):
+                    found.setdefault('gif_image', child)
+                if ('cdn_image' not in found and src and 'avatar' not in src.lower() and 'emoji' not in src.lower()
+                        and ('cdn4.telesco.pe' in src or 'cdn5.telesco.pe' in src)):
+                    found['cdn_image'] = src
+            elif name == 'time':
+                if in_date:
+                    found.setdefault('date_time', child)
+            elif name == 'video':
+                found.setdefault('video', child)
+            elif name == 'source':
+                if in_video:
+                    found.setdefault('video_source', child)
+
+            if child.contents:
+                walk(child, in_date or is_date, in_first_photo or is_first_photo, in_video or name == 'video')
+
+    walk(post_element, False, False, False)
+    return found
+
+
+def parse_channel_page(html: bytes, channel_name: str) -> Tuple[List[Post], List[int]]:
+    """Разбирает страницу t.me/s/<channel>. Возвращает посты и id всех сообщений на странице"""
+    # Парсим HTML: строим только блоки сообщений
+    soup = make_soup(html, only=TELEGRAM_MESSAGES)
+    
+    # Ищем все посты
+    posts = soup.select('.tgme_widget_message')
+    logger.info(f"Найдено {len(posts)} потенциальных постов в канале {channel_name}")
+    
+    extracted_posts = []
+    message_ids = []
+    
+    for post in posts:
+        message_id = _message_id(post.get('data-post', ''))
+        if message_id:
+            message_ids.append(message_id)
+        try:
+            post_data = extract_post_data(post, channel_name)
+            if post_data:
+                extracted_posts.append(post_data)
+        except Exception as e:
+            logger.debug(f"Ошибка при извлечении поста: {e}")
+            continue
+    
+    return extracted_posts, message_ids
+
+
+def extract_post_data(post_element: Tag, channel_name: str) -> Optional[Post]:
+    """Извлекает данные из поста за один обход его поддерева"""
+    try:
+        found = _scan_post(post_element)
+
+        # Извлекаем текст поста
+        text_element = found.get('text')
+        if not text_element:
+            return None
+
+        text = text_element.get_text(strip=True)
+        if not text or len(text) < 10:  # Минимальная длина текста
+            return None
+
+        # Ссылка на пост: из блока даты, иначе первая ссылка вида .../<message_id>
+        message_link = found.get('date_link') or found.get('message_link')
+        if not message_link:
+            return None
+
+        link = message_link.get('href', '')
+        if not link:
+            return None
+
+        # Извлекаем дату (пытаемся взять явный datetime)
+        date_str = ""
+        time_el = found.get('date_time')
+        if time_el and time_el.get('datetime'):
+            # 2024-08-13T11:24:00+00:00 -> 2024-08-13
+            date_str = time_el.get('datetime').split('T', 1)[0]
+        if not date_str and found.get('date'):
+            date_str = _parse_date(found['date'].get_text(strip=True))
+
+        # Извлекаем количество просмотров
+        views = 0
+        if found.get('views'):
+            views = _parse_views(found['views'].get_text(strip=True))
+
+        # Превью-изображение: photo_wrap, затем блок photo (img или style), затем картинки с CDN
+        image_url = ''
+        if found.get('photo_wrap'):
+            image_url = _background_image(found['photo_wrap'].get('style', ''))
+        if not image_url and found.get('photo'):
+            photo_img = found.get('photo_img')
+            if photo_img and photo_img.get('src'):
+                image_url = photo_img.get('src')
+            else:
+                image_url = _background_image(found['photo'].get('style', ''))
+        if not image_url:
+            image_url = found.get('cdn_image', '')
+
+        # Видео (mp4)
+        video_url = ''
+        video_tag = found.get('video_source') or found.get('video')
+        if video_tag and video_tag.get('src'):
+            video_url = video_tag.get('src')
+        if not video_url and found.get('mp4_link'):
+            video_url = found['mp4_link'].get('href')
+        if not video_url and found.get('data_video'):
+            video_url = found['data_video'].get('data-video')
+
+        # Анимация/GIF
+        animation_url = ''
+        if found.get('gif_link'):
+            animation_url = found['gif_link'].get('href')
+        if not animation_url and found.get('gif_image'):
+            animation_url = found['gif_image'].get('src')
+
+        # Заголовок (первые 100 символов текста) вычисляется постом при обращении
+        return Post(
+            text=text,
+            link=link,
+            source=channel_name,
+            date=date_str,
+            views=views,
+            channel_url=f"https://t.me/{channel_name}",
+            image_url=image_url,
+            video_url=video_url,
+            animation_url=animation_url,
+        )
+
+    except Exception as e:
+        logger.debug(f"Ошибка при извлечении данных поста: {e}")
+        return None
+
+
+def _parse_date(date_text: str) -> str:
+    """Парсит дату из текста"""
+    try:
+        # Простой парсинг даты
+        if 'сегодня' in date_text.lower():
+            return datetime.now().strftime('%Y-%m-%d')
+        elif 'вчера' in date_text.lower():
+            yesterday = datetime.now() - timedelta(days=1)
+            return yesterday.strftime('%Y-%m-%d')
+        else:
+            # Пытаемся извлечь дату из текста
+            date_pattern = r'(\d{1,2})\.(\d{1,2})\.(\d{4})'
+            match = re.search(date_pattern, date_text)
+            if match:
+                day, month, year = match.groups()
+                return f"{year}-{month.zfill(2)}-{day.zfill(2)}"
+            else:
+                return datetime.now().strftime('%Y-%m-%d')
+    except:
+        return datetime.now().strftime('%Y-%m-%d')
+
+def _parse_views(views_text: str) -> int:
+    """Парсит количество просмотров"""
+    try:
+        # Убираем все кроме цифр
+        views = re.sub(r'[^\d]', '', views_text)
+        return int(views) if views else 0
+    except:
+        return 0
+
+
+class _ChannelWindow:
+    """Накопленные посты канала и отметка последнего увиденного сообщения (high-water mark)"""
+
+    def __init__(self, max_posts: int):
+        self.max_posts = max_posts
+        self.posts: Dict[int, Post] = {}  # message_id -> post
+        self.max_id = 0          # самое новое увиденное сообщение
+        self.min_id = 0          # самое старое увиденное сообщение
+        self.depth = 0           # сколько постов уже запрашивали у этого окна
+        self.exhausted = False   # дошли до начала канала
+
+    def merge(self, posts: List[Post], message_ids: List[int]):
+        for post in posts:
+            message_id = _message_id(post.get('link', ''))
+            if message_id:
+                self.posts[message_id] = post
+        if message_ids:
+            self.max_id = max(self.max_id, max(message_ids))
+            self.min_id = min(self.min_id or min(message_ids), min(message_ids))
+        # Ограничиваем окно самыми новыми сообщениями
+        if len(self.posts) > self.max_posts:
+            for message_id in sorted(self.posts)[:len(self.posts) - self.max_posts]:
+                del self.posts[message_id]
+            self.min_id = min(self.posts)
+            self.exhausted = False
+
+    def snapshot(self) -> List[Post]:
+        """Посты окна, новые сначала"""
+        ordered = sorted(self.posts.items(), key=lambda item: (item[1].get('date', ''), item[0]), reverse=True)
+        return [post for _, post in ordered]
+
+
 class TelegramParser:
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
+    def __init__(self, http_client: Optional[HttpClient] = None, cache: Optional[TTLCache] = None,
+                 window_size: int = 300, parse_service: Optional[ParseService] = None, refresh_pages: int = 3,
+                 stale_ttl: float = 15):
+        self.http = http_client or get_http_client()
+        self.parse = parse_service or ParseService()
+        # Снимки каналов: channel_name -> отсортированный список постов окна
+        self.cache = cache if cache is not None else TTLCache(ttl=120, max_bytes=16 * 1024 * 1024)
+        self.window_size = window_size
+        # Сколько последних страниц канала загружать заново при обновлении (чтобы обновились просмотры)
+        self.refresh_pages = refresh_pages
+        # Сколько отдавать прежнее окно, если обновить канал не удалось (не дергаем t.me на каждый запрос)
+        self.stale_ttl = stale_ttl
+        self._windows: Dict[str, _ChannelWindow] = {}
+        self._flight = SingleFlight()
 
-    def parse_channel(self, channel_url: str, limit: int = 20) -> List[Dict[str, Any]]:
+    async def parse_channel(self, channel_url: str, limit: int = 20) -> List[Post]:
         """
         Парсит канал и возвращает список постов
         Убраны все фильтры, только сортировка по дате
+        Результат берется из кэша снимков, пока он не истек.
+        После истечения загружаются новые сообщения и заново - последние страницы канала (для свежих просмотров),
+        более глубокая история подгружается страницами (?before=)
+        Если канал не удалось обновить или догрузить, отдается уже загруженное окно
         """
+        snapshot = None
         try:
             # Извлекаем имя канала из URL
-            channel_name = channel_url.split('/')[-1]
-            logger.info(f"Парсим канал: {channel_name} (URL: {channel_url})")
-            
-            # Формируем URL для парсинга
-            parse_url = f"https://t.me/s/{channel_name}"
-            
-            # Получаем страницу
-            response = self.session.get(parse_url, timeout=10)
-            response.raise_for_status()
+            channel_name = channel_url.rstrip('/').split('/')[-1]
+            cache_key = channel_name.lower()
             
-            # Парсим HTML
-            soup = BeautifulSoup(response.text, 'html.parser')
+            snapshot = self.cache.get(cache_key)
+            if snapshot is not None and not self._needs_depth(cache_key, limit):
+                logger.debug(f"Канал {channel_name} взят из кэша")
+            while snapshot is None or self._needs_depth(cache_key, limit):
+                # Одновременные запросы одного канала ждут одну загрузку. Если присоединились к загрузке
+                # меньшей глубины, после нее догружаем канал до своего limit
+                snapshot = await self._flight.do(
+                    cache_key, lambda: self._refresh_snapshot(channel_name, cache_key, limit)
+                )
             
-            # Ищем все посты
-            posts = soup.select('.tgme_widget_message')
-            logger.info(f"Найдено {len(posts)} потенциальных постов в канале {channel_name}")
-            
-            extracted_posts = []
-            
-            for post in posts[:limit * 2]:  # Берем больше постов для лучшего выбора
-                try:
-                    post_data = self._extract_post_data(post, channel_name)
-                    if post_data:
-                        extracted_posts.append(post_data)
-                except Exception as e:
-                    logger.debug(f"Ошибка при извлечении поста: {e}")
-                    continue
-            
-            # Сортируем по дате (новые сначала)
-            extracted_posts.sort(key=lambda x: x.get('date', ''), reverse=True)
-            
-            # Возвращаем ограниченное количество
-            result = extracted_posts[:limit]
-            
-            logger.info(f"Успешно извлечено постов: {len(result)} из {channel_name}")
-            return result
+            # Посты неизменяемы, поэтому снимок отдается без копирования
+            return snapshot[:limit]
             
         except Exception as e:
             logger.error(f"Ошибка при парсинге канала {channel_url}: {e}")
-            return []
+            return snapshot[:limit] if snapshot is not None else []
 
-    def _extract_post_data(self, post_element, channel_name: str) -> Dict[str, Any]:
-        """Извлекает данные из поста"""
-        try:
-            # Извлекаем текст поста
-            text_element = post_element.select_one('.tgme_widget_message_text')
-            if not text_element:
-                return None
-            
-            text = text_element.get_text(strip=True)
-            if not text or len(text) < 10:  # Минимальная длина текста
-                return None
-            
-            # Извлекаем заголовок (первые 100 символов)
-            title = text[:100] + "..." if len(text) > 100 else text
-            
-            # Извлекаем ссылку на пост
-            message_link = post_element.select_one('.tgme_widget_message_date a')
-            if not message_link:
-                # Альтернативный способ поиска ссылки
-                all_links = post_element.select('a')
-                message_link = None
-                for link_elem in all_links:
-                    href = link_elem.get('href', '')
-                    if href and '/' in href and href.split('/')[-1].isdigit():
-                        message_link = link_elem
-                        break
-                if not message_link:
-                    return None
-            
-            link = message_link.get('href', '')
-            if not link:
-                return None
-            
-            # Извлекаем дату (пытаемся взять явный datetime)
-            date_str = ""
-            time_el = post_element.select_one('.tgme_widget_message_date time')
-            if time_el and time_el.get('datetime'):
-                try:
-                    iso = time_el.get('datetime')
-                    # 2024-08-13T11:24:00+00:00 -> 2024-08-13
-                    date_str = iso.split('T', 1)[0]
-                except Exception:
-                    date_str = ""
-            if not date_str:
-                date_element = post_element.select_one('.tgme_widget_message_date')
-                if date_element:
-                    date_text = date_element.get_text(strip=True)
-                    date_str = self._parse_date(date_text)
-            
-            # Извлекаем количество просмотров
-            views_element = post_element.select_one('.tgme_widget_message_views')
-            views = 0
-            if views_element:
-                views_text = views_element.get_text(strip=True)
-                views = self._parse_views(views_text)
-
-            # Извлекаем превью-изображение/видео/гиф, если есть
-            image_url = ''
-            video_url = ''
-            animation_url = ''
-            
-            # Сначала проверяем специальные классы для медиафайлов поста
-            photo_wrap = post_element.select_one('.tgme_widget_message_photo_wrap')
-            if photo_wrap:
-                style = photo_wrap.get('style', '')
-                # Возможные варианты: url('...'), url("..."), url(...)
-                m = re.search(r'''background-image:\s*url\(['"]?([^'")]+)['"]?\)''', style)
-                if m:
-                    image_url = m.group(1)
-            
-            # Если не нашли через photo_wrap, ищем через photo класс
-            if not image_url:
-                photo_elem = post_element.select_one('.tgme_widget_message_photo')
-                if photo_elem:
-                    # Ищем img внутри photo
-                    img_tag = photo_elem.select_one('img')
-                    if img_tag and img_tag.get('src'):
-                        image_url = img_tag.get('src')
-                    else:
-                        # Проверяем style у photo элемента
-                        style = photo_elem.get('style', '')
-                        if 'background-image' in style:
-                            m = re.search(r'''background-image:\s*url\(['"]?([^'")]+)['"]?\)''', style)
-                            if m:
-                                image_url = m.group(1)
-            
-            # Если все еще не нашли, ищем все img теги и фильтруем аватары
-            if not image_url:
-                all_images = post_element.select('img')
-                
-                for img in all_images:
-                    src = img.get('src', '')
-                    
-                    # Пропускаем аватары (они обычно содержат 'avatar' или имеют определенный размер)
-                    if 'avatar' in src.lower() or 'emoji' in src.lower():
-                        continue
-                    
-                    # Проверяем, что это медиафайл поста
-                    if src and ('cdn4.telesco.pe' in src or 'cdn5.telesco.pe' in src):
-                        # Это может быть медиафайл поста
-                        image_url = src
-                        break
-
-            # Пытаемся извлечь видео (mp4)
+    def _needs_depth(self, cache_key: str, limit: int) -> bool:
+        """Окно канала загружено не на глубину limit и канал еще не закончился"""
+        window = self._windows.get(cache_key)
+        return window is not None and limit > window.depth and not window.exhausted
+
+    async def _refresh_snapshot(self, channel_name: str, cache_key: str, limit: int) -> List[Post]:
+        """Догружает канал до нужной глубины и кладет снимок в кэш"""
+        window = self._windows.get(cache_key)
+        if window is None:
+            window = _ChannelWindow(self.window_size)
+            posts, message_ids = await self._fetch_page(channel_name)
+            window.merge(posts, message_ids)
+            self._windows[cache_key] = window
+        elif cache_key not in self.cache:
             try:
-                src_tag = post_element.select_one('video source') or post_element.select_one('video')
-                if src_tag and src_tag.get('src'):
-                    video_url = src_tag.get('src')
-            except Exception:
-                pass
-            if not video_url:
-                a_mp4 = post_element.select_one('a[href$=".mp4"]')
-                if a_mp4 and a_mp4.get('href'):
-                    video_url = a_mp4.get('href')
-            if not video_url:
-                any_data_video = post_element.select_one('[data-video]')
-                if any_data_video and any_data_video.get('data-video'):
-                    video_url = any_data_video.get('data-video')
-
-            # Пытаемся извлечь анимацию/GIF
-            a_gif = post_element.select_one('a[href$=".gif"]')
-            if a_gif and a_gif.get('href'):
-                animation_url = a_gif.get('href')
-            if not animation_url:
-                img_gif = post_element.select_one('img[src$=".gif"]')
-                if img_gif and img_gif.get('src'):
-                    animation_url = img_gif.get('src')
-            
-            return {
-                'title': title,
-                'text': text,
-                'link': link,
-                'source': channel_name,  # Изменено с 'channel' на 'source'
-                'date': date_str,
-                'views': views,
-                'channel_url': f"https://t.me/{channel_name}",
-                'image_url': image_url,
-                'video_url': video_url,
-                'animation_url': animation_url,
-            }
-            
-        except Exception as e:
-            logger.debug(f"Ошибка при извлечении данных поста: {e}")
-            return None
+                await self._fetch_newer(channel_name, window)
+            except Exception as e:
+                # Открытый предохранитель, лимит запросов или таймаут: прежнее окно лучше пустой ленты
+                logger.warning(f"Не удалось обновить канал {channel_name}, отдаем прежние посты: {e}")
+                snapshot = window.snapshot()
+                self.cache.set(cache_key, snapshot, ttl=self.stale_ttl)
+                return snapshot
+        
+        if limit > window.depth:
+            await self._fetch_older(channel_name, window, limit)
+            window.depth = max(window.depth, limit)
+        
+        snapshot = window.snapshot()
+        self.cache.set(cache_key, snapshot)
+        return snapshot
 
-    def _parse_date(self, date_text: str) -> str:
-        """Парсит дату из текста"""
-        try:
-            # Простой парсинг даты
-            if 'сегодня' in date_text.lower():
-                return datetime.now().strftime('%Y-%m-%d')
-            elif 'вчера' in date_text.lower():
-                yesterday = datetime.now() - timedelta(days=1)
-                return yesterday.strftime('%Y-%m-%d')
-            else:
-                # Пытаемся извлечь дату из текста
-                date_pattern = r'(\d{1,2})\.(\d{1,2})\.(\d{4})'
-                match = re.search(date_pattern, date_text)
-                if match:
-                    day, month, year = match.groups()
-                    return f"{year}-{month.zfill(2)}-{day.zfill(2)}"
-                else:
-                    return datetime.now().strftime('%Y-%m-%d')
-        except:
-            return datetime.now().strftime('%Y-%m-%d')
+    async def _fetch_newer(self, channel_name: str, window: _ChannelWindow):
+        """
+        Загружает сообщения новее последнего увиденного и заново - последние refresh_pages страниц канала.
+        Посты с этих страниц заменяют в окне старые версии, поэтому у них обновляется число просмотров
+        """
+        known_max = window.max_id
+        posts, message_ids = await self._fetch_page(channel_name)
+        window.merge(posts, message_ids)
+        if not message_ids:
+            return
+        head_min = min(message_ids)
 
-    def _parse_views(self, views_text: str) -> int:
-        """Парсит количество просмотров"""
-        try:
-            # Убираем все кроме цифр
-            views = re.sub(r'[^\d]', '', views_text)
-            return int(views) if views else 0
-        except:
-            return 0
+        # Между головой канала и окном остались непрочитанные сообщения
+        after = known_max
+        while after and head_min > after + 1:
+            posts, message_ids = await self._fetch_page(channel_name, after=after)
+            window.merge(posts, message_ids)
+            if len(message_ids) < PAGE_SIZE or not message_ids or max(message_ids) <= after:
+                break
+            after = max(message_ids)
+
+        # Предыдущие страницы - только в пределах окна: глубже просмотры уже не влияют на топ
+        befores = [head_min - page * PAGE_SIZE for page in range(self.refresh_pages - 1)]
+        results = await asyncio.gather(
+            *(self._fetch_page(channel_name, before=before) for before in befores if before > max(window.min_id, 1)),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"Ошибка при обновлении просмотров канала {channel_name}: {result}")
+                continue
+            window.merge(*result)
+
+    async def _fetch_older(self, channel_name: str, window: _ChannelWindow, limit: int):
+        """Параллельно загружает страницы старше самого раннего сообщения окна"""
+        # Сколько сообщений уже покрыто окном (включая пропущенные посты без текста)
+        covered = window.max_id - window.min_id + 1 if window.max_id else 0
+        missing = limit - covered
+        if missing <= 0 or window.min_id <= 1:
+            return
+        pages = -(-missing // PAGE_SIZE)
+        # id сообщений в канале идут подряд, поэтому границы страниц можно вычислить заранее
+        befores = [window.min_id - page * PAGE_SIZE for page in range(pages)]
+        results = await asyncio.gather(
+            *(self._fetch_page(channel_name, before=before) for before in befores if before > 1),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"Ошибка при загрузке истории канала {channel_name}: {result}")
+                continue
+            posts, message_ids = result
+            if not message_ids:
+                window.exhausted = True
+            window.merge(posts, message_ids)
 
-    def get_popular_posts(self, channels: List[str], limit_per_channel: int = 10) -> List[Dict[str, Any]]:
+    async def _fetch_page(self, channel_name: str, before: Optional[int] = None,
+                          after: Optional[int] = None) -> Tuple[List[Post], List[int]]:
+        """Загружает одну страницу канала. Возвращает посты и id всех сообщений на странице"""
+        # Формируем URL для парсинга
+        parse_url = f"https://t.me/s/{channel_name}"
+        if before:
+            parse_url += f"?before={before}"
+        elif after:
+            parse_url += f"?after={after}"
+        logger.info(f"Парсим канал: {channel_name} ({parse_url})")
+        
+        # Получаем страницу (не блокируя event loop) и разбираем ее в пуле процессов
+        html = await self.http.get_bytes(parse_url)
+        extracted_posts, message_ids = await self.parse.run(parse_channel_page, html, channel_name)
+        
+        logger.info(f"Успешно извлечено постов: {len(extracted_posts)} из {channel_name}")
+        return extracted_posts, message_ids
+
+    async def get_popular_posts(self, channels: List[str], limit_per_channel: int = 10) -> List[Post]:
         """
         Получает популярные посты со всех каналов
         Убраны фильтры, только сортировка по дате
+        Каналы загружаются параллельно
         """
         all_posts = []
         
-        for channel_url in channels:
-            try:
-                posts = self.parse_channel(channel_url, limit_per_channel)
-                all_posts.extend(posts)
-            except Exception as e:
-                logger.error(f"Ошибка при парсинге канала {channel_url}: {e}")
+        results = await asyncio.gather(
+            *(self.parse_channel(channel_url, limit_per_channel) for channel_url in channels),
+            return_exceptions=True,
+        )
+        for channel_url, posts in zip(channels, results):
+            if isinstance(posts, Exception):
+                logger.error(f"Ошибка при парсинге канала {channel_url}: {posts}")
                 continue
+            all_posts.extend(posts)
         
         if not all_posts:
             logger.warning("Не удалось получить посты ни с одного канала")
@@ -10,9 +10,11 @@ import os
 # Add the current directory to Python path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-# Import and run the main bot
 import asyncio
-from bot.main import main
 
 if __name__ == "__main__":
+    # Импорт только здесь: процессы пула разбора (spawn) заново импортируют этот файл,
+    # и им не нужны бот, кэши и прочее состояние из bot.main
+    from bot.main import main
+
     asyncio.run(main())